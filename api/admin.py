@@ -0,0 +1,117 @@
+import json
+import math
+import secrets
+import time
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from sqlalchemy import bindparam, func, select
+from models.submissions import Submission, Team
+from db import get_db
+from core.scoring import reload_reference, score_batch
+from core.cache import leaderboard_cache
+from core.score_cache import score_cache
+from core.events import score_events, ScoreEvent
+from core.submission_queue import COMPLETED
+
+router = APIRouter()
+
+import logging
+logger = logging.getLogger(__name__)
+
+def require_admin(x_admin_key: str = Header(..., alias="X-Admin-Key")):
+    """Reject requests that don't carry the configured admin key"""
+    from config import settings
+    expected = settings.ADMIN_KEY or settings.SECRET_KEY
+    if not secrets.compare_digest(x_admin_key.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin credentials")
+
+@router.post("/reload-reference", response_model=dict, dependencies=[Depends(require_admin)])
+def reload_reference_benchmark(force: bool = True):
+    """Recompile perfect_evaluation.json without restarting the workers"""
+    try:
+        reference = reload_reference(force=force)
+    except ValueError as e:
+        # The previous reference stays active
+        raise HTTPException(status_code=422, detail=str(e))
+    score_cache.invalidate()
+    logger.info("Reference benchmark reloaded by admin", extra={"digest": reference.digest})
+    return {"status": "success", "digest": reference.digest, "mtime": reference.mtime}
+
+@router.post("/rescore", response_model=dict, dependencies=[Depends(require_admin)])
+def rescore_submissions(
+    chunk_size: int = Query(1000, ge=1, le=10000),
+    db = Depends(get_db),
+):
+    """
+    Re-score every completed submission against the current reference
+    benchmark. Queued and failed ones are left to the queue workers.
+    """
+    submissions = Submission.__table__
+    teams = Team.__table__
+    update_scores = submissions.update()\
+        .where(submissions.c.id == bindparam("_id"))\
+        .values(score=bindparam("_score"))
+
+    start = time.perf_counter()
+    processed = updated = failed = 0
+    last_id = 0
+    try:
+        while True:
+            rows = db.execute(
+                select(submissions.c.id, submissions.c.metrics, submissions.c.score)
+                .where(submissions.c.id > last_id)
+                .where(submissions.c.status == COMPLETED)
+                .order_by(submissions.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            metrics = []
+            for row in rows:
+                try:
+                    metrics.append(json.loads(row.metrics))
+                except (TypeError, ValueError):
+                    metrics.append({})
+            scores = score_batch(metrics)
+
+            changes = []
+            for row, score in zip(rows, scores):
+                if math.isnan(score):
+                    failed += 1
+                elif score != row.score:
+                    changes.append({"_id": row.id, "_score": score})
+            if changes:
+                db.execute(update_scores, changes)
+            db.commit()
+            processed += len(rows)
+            updated += len(changes)
+
+        # Recompute every team's best score in one statement
+        db.execute(
+            teams.update().values(
+                best_score=select(func.max(submissions.c.score))
+                .where(submissions.c.team_key == teams.c.team_key)
+                .where(submissions.c.status == COMPLETED)
+                .scalar_subquery()
+            )
+        )
+        db.commit()
+        leaderboard_cache.invalidate()
+        score_events.publish(ScoreEvent(team_key=None))
+    except Exception:
+        db.rollback()
+        logger.error("Rescore job failed", exc_info=True)
+        raise HTTPException(status_code=500, detail="Rescore failed; scores committed so far are kept")
+
+    elapsed = time.perf_counter() - start
+    result = {
+        "status": "success",
+        "processed": processed,
+        "updated": updated,
+        "failed": failed,
+        "elapsed_sec": round(elapsed, 3),
+        "rows_per_sec": round(processed / elapsed, 1) if elapsed > 0 else None,
+    }
+    logger.info("Rescore job finished", extra=result)
+    return result
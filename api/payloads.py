@@ -0,0 +1,103 @@
+"""
+Single-pass decoding of submission payloads.
+
+A body is either a bare MetricsPayload (the original format) or a
+CombinedMetricsPayload with business_metrics/performance_metrics. The
+format is picked from the top-level keys, so each body is validated
+against exactly one model, straight from the request bytes, with a
+TypeAdapter built once at import. The stored JSON is produced by the same
+validated models, so nothing goes through .dict() and json.dumps.
+"""
+from typing import Annotated, Any, Dict, NamedTuple, Optional, Union
+from fastapi.exceptions import RequestValidationError
+from pydantic import Discriminator, Tag, TypeAdapter, ValidationError
+from api.models import MetricsPayload, CombinedMetricsPayload, PerformanceMetrics
+from core.score_cache import payload_digest
+
+COMBINED = "combined"
+LEGACY = "legacy"
+
+
+def payload_format(value: Any) -> str:
+    if isinstance(value, dict):
+        return COMBINED if "business_metrics" in value else LEGACY
+    return COMBINED if isinstance(value, CombinedMetricsPayload) else LEGACY
+
+
+SubmissionPayload = Annotated[
+    Union[Annotated[CombinedMetricsPayload, Tag(COMBINED)], Annotated[MetricsPayload, Tag(LEGACY)]],
+    Discriminator(payload_format),
+]
+
+submission_adapter = TypeAdapter(SubmissionPayload)
+metrics_adapter = TypeAdapter(MetricsPayload)
+performance_adapter = TypeAdapter(PerformanceMetrics)
+
+
+class DecodedSubmission(NamedTuple):
+    metrics: MetricsPayload
+    perf_metrics: Optional[PerformanceMetrics]
+    metrics_dict: Dict[str, Any]  # what the scorer takes
+    metrics_json: str  # Submission.metrics
+    perf_json: Optional[str]  # Submission.performance_metrics
+    digest: str  # score cache key of metrics_json
+
+
+def _decoded(payload) -> DecodedSubmission:
+    if isinstance(payload, CombinedMetricsPayload):
+        metrics, perf_metrics = payload.business_metrics, payload.performance_metrics
+    else:
+        metrics, perf_metrics = payload, None
+    metrics_json = metrics_adapter.dump_json(metrics).decode()
+    return DecodedSubmission(
+        metrics,
+        perf_metrics,
+        metrics_adapter.dump_python(metrics),
+        metrics_json,
+        performance_adapter.dump_json(perf_metrics).decode() if perf_metrics is not None else None,
+        payload_digest(metrics_json),
+    )
+
+
+def decode_submission(body: bytes) -> DecodedSubmission:
+    """
+    Parse and validate a /submit body in one pass. Errors are raised as
+    RequestValidationError, so clients get the same 422 as for any other
+    invalid body.
+    """
+    try:
+        return _decoded(submission_adapter.validate_json(body))
+    except ValidationError as e:
+        raise RequestValidationError(
+            [dict(error, loc=("body",) + tuple(error["loc"][1:])) for error in e.errors(include_url=False)]
+        )
+
+
+def decode_item(item: Any) -> DecodedSubmission:
+    """decode_submission() for an already-parsed batch item; raises ValidationError"""
+    return _decoded(submission_adapter.validate_python(item))
+
+
+def _inline_defs(schema: dict) -> dict:
+    """The JSON schema with its $defs references inlined, for embedding in the OpenAPI document"""
+    defs = schema.pop("$defs", {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(value) for value in node]
+        return node
+
+    return resolve(schema)
+
+
+# The body is read as bytes, so FastAPI can't derive its schema; document it explicitly
+SUBMISSION_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": _inline_defs(submission_adapter.json_schema())}},
+    }
+}
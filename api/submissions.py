@@ -1,251 +1,521 @@
-from fastapi import APIRouter, HTTPException, Body, Depends, Header, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import ValidationError
-from fastapi.responses import JSONResponse
 from datetime import datetime
 import json
-from typing import Union, Optional
-from sqlalchemy import func, select
-from sqlalchemy.exc import OperationalError
-from models.submissions import Submission, Team, get_db
-from core.scoring import calculate_score
-from api.models import MetricsPayload, CombinedMetricsPayload
+import math
+from typing import Dict, List, Tuple, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from models.submissions import Submission, perf_columns
+from db import get_db, replica_router, run_read, read_session
+from core.scoring import score_batch_with_digest
+from core.executor import scoring_executor, ScoringBusy, ScoringTimeout
+from core.leaderboard import build_leaderboard
+from core.cache import leaderboard_cache
+from core.score_cache import score_cache
+from core.codec import encode_json, decode_json
+from core.submission_queue import QUEUED, COMPLETED, enqueue_submission
+from core.team_metrics import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, team_query, aggregates_query,
+    percentile_query, page_query, metric_row, format_team_metrics,
+)
+from core.events import score_events, ScoreEvent
+from core.auth import team_key_cache, mask_team_key
+from core.idempotency import IDEMPOTENCY_HEADER, IdempotentRequest
+from core.logs import Lazy
+from core.quota import reserve_submission, reserve_submissions, submissions_left, record_score, QuotaExceeded, UnknownTeam
+from api.payloads import SUBMISSION_OPENAPI, decode_submission, decode_item
 
 router = APIRouter()
 
+INVALID_TEAM_DETAIL = "Invalid team credentials. Please verify your team key and try again."
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH_SIZE = 500
+
 import logging
 logger = logging.getLogger(__name__)
 
-@router.post("/submit", response_model=dict)
+def check_team_key(authorization: str, settings) -> Optional[bool]:
+    """Reject malformed, known-bad or throttled keys; returns the cached validity (None if unknown)"""
+    # Validate team key format
+    if not authorization.startswith(settings.TEAM_KEY_PREFIX):
+        raise HTTPException(
+            status_code=401,
+            detail=f"Key must start with {settings.TEAM_KEY_PREFIX}"
+        )
+
+    # Reject known-bad keys (and floods of unknown ones) before touching the database
+    known = team_key_cache.lookup(authorization)
+    if known is False:
+        raise HTTPException(status_code=403, detail=INVALID_TEAM_DETAIL)
+    if known is None and not team_key_cache.allow_unknown():
+        logger.warning("Invalid team key lookups throttled")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many invalid team key attempts. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+    return known
+
+def quota_error(e: Exception, authorization: str, settings) -> HTTPException:
+    """Translate a failed quota reservation into the HTTP error returned to the team"""
+    if isinstance(e, UnknownTeam):
+        team_key_cache.remember(authorization, False)
+        logger.error(f"Invalid team key attempt: {mask_team_key(authorization)}")
+        return HTTPException(status_code=403, detail=INVALID_TEAM_DETAIL)
+    # Whichever reservation failed, the count is at the limit
+    team_key_cache.remember(authorization, True, settings.SUBMISSIONS_PER_TEAM)
+    logger.warning(f"Team {mask_team_key(authorization)} reached submission limit ({settings.SUBMISSIONS_PER_TEAM})")
+    return HTTPException(
+        status_code=429,
+        detail=f"You've reached the maximum allowed submissions ({settings.SUBMISSIONS_PER_TEAM}). Please wait for the next round."
+    )
+
+def check_quota(authorization: str, settings):
+    """
+    Turn away a team whose cached count is already at the limit before its
+    submission is scored. The reservation after scoring still decides for
+    everything this lets through.
+    """
+    if team_key_cache.submissions_used(authorization) >= settings.SUBMISSIONS_PER_TEAM:
+        raise quota_error(QuotaExceeded(authorization), authorization, settings)
+
+def submit_error(e: Exception) -> HTTPException:
+    """Map an unexpected exception from the submit path to an HTTP error"""
+    if isinstance(e, ScoringBusy):
+        logger.warning("Scoring queue full, rejecting submission")
+        return HTTPException(
+            status_code=503,
+            detail="Scoring is busy. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+    if isinstance(e, ScoringTimeout):
+        logger.error("Scoring timed out")
+        return HTTPException(
+            status_code=504,
+            detail="Scoring took too long. Please try again later."
+        )
+    if isinstance(e, OperationalError):
+        logger.error(f"Database error submitting metrics: {str(e)}", exc_info=True)
+        return HTTPException(
+            status_code=503,
+            detail="Service temporarily unavailable. Please try again later."
+        )
+    if isinstance(e, ValidationError):
+        logger.error(f"Validation error in metrics payload: {str(e)}", exc_info=True)
+        return HTTPException(
+            status_code=400,
+            detail="Invalid metrics data format. Please check your submission."
+        )
+    if isinstance(e, json.JSONDecodeError):
+        logger.error(f"JSON decode error: {str(e)}", exc_info=True)
+        return HTTPException(
+            status_code=400,
+            detail="Invalid data format. Please check your submission."
+        )
+    logger.error(f"Unexpected error submitting metrics: {str(e)}", exc_info=True)
+    return HTTPException(
+        status_code=500,
+        detail="An unexpected error occurred. Our team has been notified."
+    )
+
+async def raw_body(request: Request) -> bytes:
+    return await request.body()
+
+@router.post("/submit", response_model=dict, openapi_extra=SUBMISSION_OPENAPI)
 def submit_metrics(
-    background_tasks: BackgroundTasks,
     authorization: str = Header(..., alias="Authorization"),
-    payload: Union[MetricsPayload, CombinedMetricsPayload] = Body(...),
+    body: bytes = Depends(raw_body),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     db = Depends(get_db),
 ):
-    # Handle both old and new payload formats
-    if isinstance(payload, CombinedMetricsPayload):
-        metrics = payload.business_metrics
-        perf_metrics = payload.performance_metrics
-    else:
-        metrics = payload
-        perf_metrics = None
+    decoded = decode_submission(body)
+    metrics, perf_metrics = decoded.metrics, decoded.perf_metrics
+    idempotent = None
     try:
-        logger.info(f"Submission request from {authorization}")
-        logger.debug(f"Full payload: {payload.json()}")
-        logger.debug(f"Business metrics: {metrics}")
-        if perf_metrics:
-            logger.debug(f"Performance metrics: {perf_metrics}")
+        logger.info("Submission request from %s", mask_team_key(authorization))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full payload: %s", Lazy(body.decode))
+            logger.debug("Business metrics: %s", metrics)
+            if perf_metrics:
+                logger.debug("Performance metrics: %s", perf_metrics)
         from config import settings
-        
-        # Validate team key format
-        if not authorization.startswith(settings.TEAM_KEY_PREFIX):
-            raise HTTPException(
-                status_code=401,
-                detail=f"Key must start with {settings.TEAM_KEY_PREFIX}"
-            )
-        
-        # Debug log team key and existing teams
-        logger.debug(f"Checking team key: {authorization}")
-        result = db.execute(select(Team))
-        all_teams = result.scalars().all()
-        logger.debug(f"Existing teams: {[t.team_key for t in all_teams]}")
-        
-        # Check team exists and validate
-        result = db.execute(
-            select(Team).where(Team.team_key == authorization)
-        )
-        team = result.scalar_one_or_none()
-        if not team:
-            logger.error(f"Invalid team key attempt: {authorization}. Existing teams: {[t.team_key for t in all_teams]}")
-            raise HTTPException(
-                status_code=403,
-                detail="Invalid team credentials. Please verify your team key and try again."
-            )
-            
-        # Check submission limit
-        if team.submission_count >= settings.SUBMISSIONS_PER_TEAM:
-            logger.warning(f"Team {authorization} reached submission limit ({settings.SUBMISSIONS_PER_TEAM})")
-            raise HTTPException(
-                status_code=429,
-                detail=f"You've reached the maximum allowed submissions ({settings.SUBMISSIONS_PER_TEAM}). Please wait for the next round."
-            )
 
-        # Convert metrics to dict and calculate score
-        metrics_dict = metrics.dict()
-        score = calculate_score(metrics_dict)
+        known = check_team_key(authorization, settings)
+
+        # A retry of a submission that already went through gets its response back
+        if idempotency_key is not None:
+            idempotent = IdempotentRequest(authorization, idempotency_key, body, settings.IDEMPOTENCY_TTL)
+            replay = idempotent.find(db)
+            if replay is not None:
+                return replay
+
+        check_quota(authorization, settings)
+
+        # Score before opening the write transaction so row locks are held briefly
+        # (in queued mode the workers score it after the request returns)
+        queued = settings.SUBMIT_QUEUED
+        score = None if queued else scoring_executor.score(decoded.metrics_dict, decoded.digest)
+        now = datetime.now()
+
+        # Take a quota slot atomically (locks the team row first)
+        try:
+            submission_count = reserve_submission(
+                db, authorization, settings.SUBMISSIONS_PER_TEAM, known_team=bool(known)
+            )
+        except (UnknownTeam, QuotaExceeded) as e:
+            raise quota_error(e, authorization, settings)
+        team_key_cache.remember(authorization, True, submission_count)
 
         # Create submission record
         submission = Submission(
             team_key=authorization,
-            metrics=json.dumps(metrics_dict),
+            metrics=decoded.metrics_json,
             score=score,
-            status='completed',
-            timestamp=datetime.now(),
-            performance_metrics=perf_metrics.json() if perf_metrics else None
+            status=QUEUED if queued else COMPLETED,
+            timestamp=now,
+            performance_metrics=decoded.perf_json,
+            **perf_columns(perf_metrics)
         )
         db.add(submission)
 
+        if queued:
+            db.flush()
+            submission_id = submission.id
+            response = queued_response(submission_id, settings.SUBMISSIONS_PER_TEAM - submission_count)
+            if idempotent is not None:
+                idempotent.remember(db, response.status_code, response.body)
+            db.commit()
+            replica_router.note_write(authorization)
+            enqueue_submission(submission_id, authorization, submission.metrics)
+            return response
+
         # Update team counters
-        team.submission_count = (team.submission_count or 0) + 1
-        team.last_submission = datetime.now()
-        if not team.best_score or score > team.best_score:
-            team.best_score = score
+        record_score(db, authorization, score, now)
 
-        db.commit()
-        
-        # Broadcast updated scores to all WebSocket clients
-        if background_tasks:
-            from main import broadcast_scores
-            background_tasks.add_task(broadcast_scores, db)
-            
-        return {
+        response = {
             "status": "success", 
             "score": score,
-            "submissions_remaining": settings.SUBMISSIONS_PER_TEAM - team.submission_count
+            "submissions_remaining": settings.SUBMISSIONS_PER_TEAM - submission_count
         }
+        if idempotent is not None:
+            idempotent.remember(db, 200, encode_json(response))
 
-    except OperationalError as e:
+        db.commit()
+        leaderboard_cache.invalidate()
+        replica_router.note_write(authorization)
+
+        # Let the WebSocket broadcaster pick up the change off the request path
+        score_events.publish(ScoreEvent(authorization, score, now.isoformat()))
+
+        return response
+
+    except HTTPException:
         db.rollback()
-        logger.error(f"Database error submitting metrics: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=503,
-            detail="Service temporarily unavailable. Please try again later."
-        )
-    except ValidationError as e:
+        raise
+    except IntegrityError as e:
         db.rollback()
-        logger.error(f"Validation error in metrics payload: {str(e)}", exc_info=True)
+        if idempotent is None:
+            raise submit_error(e)
+        # A concurrent request with the same key committed first
+        return idempotent.after_conflict(db)
+    except Exception as e:
+        db.rollback()
+        raise submit_error(e)
+    finally:
+        db.close()
+
+def queued_response(submission_id: int, submissions_remaining: int) -> JSONResponse:
+    return JSONResponse(status_code=202, content={
+        "status": QUEUED,
+        "submission_id": submission_id,
+        "submissions_remaining": submissions_remaining
+    })
+
+def submission_status_query(submission_id: int, team_key: str):
+    return select(Submission.id, Submission.status, Submission.score, Submission.timestamp)\
+        .where(Submission.id == submission_id)\
+        .where(Submission.team_key == team_key)
+
+def submission_status(row) -> dict:
+    if row is None:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return {
+        "submission_id": row.id,
+        "status": row.status,
+        "score": row.score,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None
+    }
+
+@router.get("/submissions/{submission_id}", response_model=dict)
+def get_submission(
+    submission_id: int,
+    authorization: str = Header(..., alias="Authorization"),
+    db = Depends(get_db),
+):
+    """Status (queued, completed or failed) and score of one of the calling team's submissions"""
+    try:
+        return submission_status(db.execute(submission_status_query(submission_id, authorization)).first())
+    finally:
+        db.close()
+
+def parse_batch(body: bytes, content_type: str, max_items: int) -> List:
+    """Raw items of a /submit/batch body: a JSON array, or NDJSON with one payload per line"""
+    try:
+        if "ndjson" in content_type or not body.lstrip().startswith(b"["):
+            items = [decode_json(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = decode_json(body)
+    except ValueError as e:
+        logger.error(f"JSON decode error in batch: {str(e)}")
         raise HTTPException(
             status_code=400,
-            detail="Invalid metrics data format. Please check your submission."
+            detail="Invalid data format. Please check your submission."
         )
-    except json.JSONDecodeError as e:
-        db.rollback()
-        logger.error(f"JSON decode error: {str(e)}", exc_info=True)
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="Expected a non-empty array of submissions")
+    if len(items) > max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may contain at most {max_items} submissions"
+        )
+    return items
+
+def decode_batch(items: List, remaining: int) -> Tuple[List[Optional[dict]], List[tuple]]:
+    """
+    Per-item results (filled in for invalid items only) and (index,
+    DecodedSubmission) for the rest. Valid items beyond the team's
+    `remaining` quota are rejected here, so they are never scored.
+    """
+    results: List[Optional[dict]] = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        try:
+            decoded = decode_item(item)
+        except ValidationError:
+            results[i] = {"index": i, "status": "invalid", "detail": "Invalid metrics data format"}
+            continue
+        if len(valid) < remaining:
+            valid.append((i, decoded))
+        else:
+            results[i] = {"index": i, "status": "rejected", "detail": "Submission limit reached"}
+    return results, valid
+
+def batch_timeout(metrics_list: List[Dict]) -> float:
+    return scoring_executor.timeout * max(1, len(metrics_list))
+
+def prepare_batch(items: List, remaining: int) -> Tuple[List[Optional[dict]], List[tuple]]:
+    """
+    Validate and score a batch in one pass of the batch scorer, scoring at
+    most `remaining` (the team's quota left) valid items.
+
+    Returns the per-item results (filled in for invalid and over-quota items
+    only) and (index, DecodedSubmission, score) for every item that can be
+    stored, in request order.
+    """
+    results, valid = decode_batch(items, remaining)
+    scores = score_cache.score_many(
+        [decoded.digest for _, decoded in valid],
+        [decoded.metrics_dict for _, decoded in valid],
+        lambda metrics_list: scoring_executor.run(
+            score_batch_with_digest, metrics_list, timeout=batch_timeout(metrics_list)
+        ),
+    )
+    return scored_batch(results, valid, scores)
+
+async def prepare_batch_async(items: List, remaining: int) -> Tuple[List[Optional[dict]], List[tuple]]:
+    """prepare_batch() awaiting the scoring executor instead of blocking the event loop"""
+    results, valid = decode_batch(items, remaining)
+    scores = await score_cache.score_many_async(
+        [decoded.digest for _, decoded in valid],
+        [decoded.metrics_dict for _, decoded in valid],
+        lambda metrics_list: scoring_executor.run_async(
+            score_batch_with_digest, metrics_list, timeout=batch_timeout(metrics_list)
+        ),
+    )
+    return scored_batch(results, valid, scores)
+
+def scored_batch(results: List[Optional[dict]], valid: List[tuple],
+                 scores: List[float]) -> Tuple[List[Optional[dict]], List[tuple]]:
+    scored = []
+    for (i, decoded), score in zip(valid, scores):
+        if math.isnan(score):
+            results[i] = {"index": i, "status": "invalid", "detail": "Invalid metrics format"}
+            continue
+        scored.append((i, decoded, score))
+
+    if not scored:
         raise HTTPException(
             status_code=400,
-            detail="Invalid data format. Please check your submission."
+            detail={"message": "No valid submissions in batch", "results": results}
+        )
+    return results, scored
+
+def batch_rows(team_key: str, accepted: List[tuple], now: datetime) -> List[dict]:
+    """Submission rows for one bulk INSERT"""
+    return [
+        dict(
+            team_key=team_key,
+            metrics=decoded.metrics_json,
+            score=score,
+            status=COMPLETED,
+            timestamp=now,
+            performance_metrics=decoded.perf_json,
+            **perf_columns(decoded.perf_metrics)
         )
+        for _, decoded, score in accepted
+    ]
+
+def batch_response(results: List[Optional[dict]], scored: List[tuple], granted: int,
+                   submission_count: int, settings) -> dict:
+    for i, _, score in scored[:granted]:
+        results[i] = {"index": i, "status": "accepted", "score": score}
+    for i, _, _ in scored[granted:]:
+        results[i] = {"index": i, "status": "rejected", "detail": "Submission limit reached"}
+    return {
+        "status": "success" if granted == len(results) else "partial",
+        "accepted": granted,
+        "rejected": len(results) - granted,
+        "submissions_remaining": settings.SUBMISSIONS_PER_TEAM - submission_count,
+        "results": results
+    }
+
+@router.post("/submit/batch", response_model=dict)
+def submit_batch(
+    request: Request,
+    authorization: str = Header(..., alias="Authorization"),
+    body: bytes = Depends(raw_body),
+    db = Depends(get_db),
+):
+    """
+    Store many submissions for one team in a single transaction: one batch
+    scoring pass, one quota reservation, one bulk INSERT, one team update
+    and one broadcast. Items beyond the remaining quota are rejected, and
+    are cut before scoring.
+    """
+    try:
+        from config import settings
+
+        check_team_key(authorization, settings)
+        check_quota(authorization, settings)
+        items = parse_batch(body, request.headers.get("content-type", ""), settings.SUBMIT_BATCH_MAX_ITEMS)
+        try:
+            remaining = submissions_left(db, authorization, settings.SUBMISSIONS_PER_TEAM)
+        except (UnknownTeam, QuotaExceeded) as e:
+            raise quota_error(e, authorization, settings)
+        results, scored = prepare_batch(items, remaining)
+        logger.info("Batch submission of %d from %s", len(items), mask_team_key(authorization))
+        now = datetime.now()
+
+        try:
+            granted, submission_count = reserve_submissions(
+                db, authorization, settings.SUBMISSIONS_PER_TEAM, len(scored)
+            )
+        except (UnknownTeam, QuotaExceeded) as e:
+            raise quota_error(e, authorization, settings)
+        team_key_cache.remember(authorization, True, submission_count)
+
+        accepted = scored[:granted]
+        db.execute(insert(Submission), batch_rows(authorization, accepted, now))
+        best = max(score for _, _, score in accepted)
+        record_score(db, authorization, best, now)
+
+        db.commit()
+        leaderboard_cache.invalidate()
+        replica_router.note_write(authorization)
+        score_events.publish(ScoreEvent(authorization, best, now.isoformat()))
+
+        return batch_response(results, scored, granted, submission_count, settings)
+
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Unexpected error submitting metrics: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail="An unexpected error occurred. Our team has been notified."
-        )
+        raise submit_error(e)
     finally:
         db.close()
 
+def parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def wants_ndjson(request: Request, format: Optional[str]) -> bool:
+    if format is not None:
+        return format == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def check_team_metrics(team, totals):
+    """Errors for a team whose metrics can't be reported"""
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not totals.submissions:
+        raise HTTPException(status_code=404, detail="No submissions found")
+    if not totals.with_metrics:
+        raise HTTPException(status_code=404, detail="No metrics available")
+    if not team.team_name:
+        raise HTTPException(
+            status_code=500, 
+            detail="Team name missing in database"
+        )
+
 @router.get("/team-metrics/{team_key}", response_model=dict)
-def get_team_metrics(team_key: str, db = Depends(get_db)):
+def get_team_metrics(
+    team_key: str,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Submissions per page"),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="ndjson streams one submission per line"),
+):
     """Get performance metrics for a specific team"""
-    try:
-        # Get team info
-        team = db.query(Team).filter_by(team_key=team_key).first()
-        if not team:
+    after = parse_cursor(cursor)
+    if wants_ndjson(request, format):
+        if not run_read(lambda db: db.execute(team_query(team_key)).first(), team_key):
             raise HTTPException(status_code=404, detail="Team not found")
+        return StreamingResponse(
+            stream_team_metrics(team_key, after, limit), media_type=NDJSON_MEDIA_TYPE
+        )
+    limit = limit or DEFAULT_PAGE_SIZE
+    return leaderboard_cache.respond(
+        request,
+        f"team-metrics/{team_key}?cursor={cursor or ''}&limit={limit}",
+        lambda: run_read(lambda db: _build_team_metrics(db, team_key, after, limit), team_key),
+        max_lag=replica_router.staleness,
+    )
 
-        # Get all submissions with performance metrics
-        submissions = db.query(Submission)\
-            .filter_by(team_key=team_key)\
-            .order_by(Submission.timestamp.asc())\
-            .all()
-
-        if not submissions:
-            raise HTTPException(status_code=404, detail="No submissions found")
-
-        # Calculate averages
-        cpu_total = 0
-        mem_total = 0
-        score_total = 0
-        valid_subs = 0
-
-        metrics = []
-        for sub in submissions:
-            if not sub.performance_metrics:
-                continue
-                
-            perf_metrics = json.loads(sub.performance_metrics)
-            metrics.append({
-                "timestamp": sub.timestamp.isoformat(),
-                "score": sub.score,
-                "cpu_avg": perf_metrics.get("cpu_avg", 0),
-                "mem_avg": perf_metrics.get("mem_avg", 0),
-                "processing_sec": perf_metrics.get("processing_sec", 0)
-            })
-
-            cpu_total += perf_metrics.get("cpu_avg", 0)
-            mem_total += perf_metrics.get("mem_avg", 0)
-            score_total += sub.score
-            valid_subs += 1
-
-        if valid_subs == 0:
-            raise HTTPException(status_code=404, detail="No metrics available")
-
-        if not team.team_name:
-            raise HTTPException(
-                status_code=500, 
-                detail="Team name missing in database"
-            )
-
-        return {
-            "team_key": team_key,
-            "team_name": team.team_name,
-            "metrics": metrics,
-            "overall_avg": {
-                "cpu": round(cpu_total / valid_subs, 1),
-                "memory": round(mem_total / valid_subs),
-                "score": round(score_total / valid_subs, 1)
-            }
-        }
+def _build_team_metrics(db, team_key: str, after, limit: int) -> dict:
+    """One page of GET /api/team-metrics/{team_key}, with aggregates computed in SQL"""
+    team = db.execute(team_query(team_key)).first()
+    totals = db.execute(aggregates_query(team_key)).one()
+    check_team_metrics(team, totals)
+    percentiles = db.execute(percentile_query(team_key, totals.with_metrics)).one()
+    rows = db.execute(page_query(team_key, after, limit + 1)).all()
+    return format_team_metrics(team, totals, percentiles, rows, limit)
 
-    finally:
-        db.close()
+def stream_team_metrics(team_key: str, after, limit: Optional[int]):
+    """NDJSON lines straight off a streaming cursor, on a session owned by the response"""
+    with read_session(team_key) as db:
+        result = db.execute(
+            page_query(team_key, after, limit).execution_options(stream_results=True)
+        )
+        for rows in result.partitions(NDJSON_BATCH_SIZE):
+            yield b"".join(encode_json(metric_row(row)) + b"\n" for row in rows)
 
 @router.get("/scores", response_model=list)
-def get_scores(db = Depends(get_db)):
-    try:
-        # Get all teams regardless of submissions
-        teams = db.query(Team).order_by(Team.team_name).all()
-        response = []
-        
-        for team in teams:
-            # Get all submissions for this team
-            submissions = db.query(Submission)\
-                .filter_by(team_key=team.team_key)\
-                .order_by(Submission.timestamp.desc())\
-                .all()
-                
-            # Get best score
-            best_score = db.query(func.max(Submission.score))\
-                .filter_by(team_key=team.team_key)\
-                .scalar()
-                
-            # Build scores array
-            scores = []
-            trend = []
-            for sub in submissions:
-                scores.append({
-                    "value": sub.score,
-                    "is_best": sub.score == best_score,
-                    "id": str(sub.id),
-                    "timestamp": sub.timestamp.isoformat()
-                })
-                trend.append(sub.score)
-                
-            response.append({
-                "team_key": team.team_key,
-                "team_name": team.team_name,
-                "avatar": team.avatar if hasattr(team, 'avatar') else team.team_key[0],
-                "scores": scores,
-                "best_score": best_score,
-                "trend": trend,
-                "latest_score": submissions[0].score if submissions else None,
-                "status": submissions[0].status if submissions else None,
-                "has_submissions": len(submissions) > 0
-            })
-            
-        # Sort by best score descending
-        response.sort(key=lambda x: x["best_score"] or 0, reverse=True)
-        return JSONResponse(content=response)
-    finally:
-        db.close()
+def get_scores(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Max submissions listed per team"),
+    since: Optional[datetime] = Query(None, description="Only list submissions at or after this time"),
+    authorization: Optional[str] = Header(None, alias="Authorization", description="Team key; a team that just submitted reads its own write"),
+):
+    return leaderboard_cache.respond(
+        request,
+        f"scores?limit={limit}&since={since.isoformat() if since else ''}",
+        lambda: run_read(lambda db: build_leaderboard(db, limit=limit, since=since), authorization),
+        max_lag=replica_router.staleness,
+    )
@@ -0,0 +1,243 @@
+"""
+Async variants of the submission endpoints, served instead of
+api.submissions when settings.DB_ASYNC is enabled. They share validation,
+scoring, caching and response shapes with the sync handlers; only the
+database round trips are awaited instead of holding a threadpool worker.
+"""
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from models.submissions import Submission, perf_columns
+from db import get_async_db, replica_router, run_read_async, read_session_async
+from core.executor import scoring_executor
+from core.leaderboard import build_leaderboard_async
+from core.cache import leaderboard_cache
+from core.codec import encode_json
+from core.team_metrics import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, team_query, aggregates_query,
+    percentile_query, page_query, metric_row, format_team_metrics,
+)
+from core.events import score_events, ScoreEvent
+from core.submission_queue import QUEUED, COMPLETED, enqueue_submission
+from core.auth import team_key_cache, mask_team_key
+from core.idempotency import IDEMPOTENCY_HEADER, IdempotentRequest
+from core.logs import Lazy
+from core.quota import reserve_submission_async, reserve_submissions_async, submissions_left_async, record_score_async, QuotaExceeded, UnknownTeam
+from api.payloads import SUBMISSION_OPENAPI, decode_submission
+from api.submissions import (
+    raw_body, check_team_key, check_quota, quota_error, submit_error,
+    queued_response, submission_status_query, submission_status,
+    parse_batch, prepare_batch_async, batch_rows, batch_response,
+    parse_cursor, wants_ndjson, check_team_metrics, NDJSON_MEDIA_TYPE, NDJSON_BATCH_SIZE,
+)
+
+router = APIRouter()
+
+import logging
+logger = logging.getLogger(__name__)
+
+@router.post("/submit", response_model=dict, openapi_extra=SUBMISSION_OPENAPI)
+async def submit_metrics(
+    authorization: str = Header(..., alias="Authorization"),
+    body: bytes = Depends(raw_body),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db = Depends(get_async_db),
+):
+    decoded = decode_submission(body)
+    idempotent = None
+    try:
+        logger.info("Submission request from %s", mask_team_key(authorization))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full payload: %s", Lazy(body.decode))
+        from config import settings
+
+        known = check_team_key(authorization, settings)
+
+        if idempotency_key is not None:
+            idempotent = IdempotentRequest(authorization, idempotency_key, body, settings.IDEMPOTENCY_TTL)
+            replay = await idempotent.find_async(db)
+            if replay is not None:
+                return replay
+
+        check_quota(authorization, settings)
+
+        queued = settings.SUBMIT_QUEUED
+        score = None if queued else await scoring_executor.score_async(decoded.metrics_dict, decoded.digest)
+        now = datetime.now()
+
+        try:
+            submission_count = await reserve_submission_async(
+                db, authorization, settings.SUBMISSIONS_PER_TEAM, known_team=bool(known)
+            )
+        except (UnknownTeam, QuotaExceeded) as e:
+            raise quota_error(e, authorization, settings)
+        team_key_cache.remember(authorization, True, submission_count)
+
+        submission = Submission(
+            team_key=authorization,
+            metrics=decoded.metrics_json,
+            score=score,
+            status=QUEUED if queued else COMPLETED,
+            timestamp=now,
+            performance_metrics=decoded.perf_json,
+            **perf_columns(decoded.perf_metrics)
+        )
+        db.add(submission)
+
+        if queued:
+            await db.flush()
+            response = queued_response(submission.id, settings.SUBMISSIONS_PER_TEAM - submission_count)
+            if idempotent is not None:
+                idempotent.remember(db, response.status_code, response.body)
+            await db.commit()
+            replica_router.note_write(authorization)
+            # A SQLite write (with a busy timeout), so not on the event loop
+            await run_in_threadpool(enqueue_submission, submission.id, authorization, submission.metrics)
+            return response
+
+        await record_score_async(db, authorization, score, now)
+
+        response = {
+            "status": "success",
+            "score": score,
+            "submissions_remaining": settings.SUBMISSIONS_PER_TEAM - submission_count
+        }
+        if idempotent is not None:
+            idempotent.remember(db, 200, encode_json(response))
+
+        await db.commit()
+        await leaderboard_cache.invalidate_async()
+        replica_router.note_write(authorization)
+        score_events.publish(ScoreEvent(authorization, score, now.isoformat()))
+
+        return response
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        if idempotent is None:
+            raise submit_error(e)
+        return await idempotent.after_conflict_async(db)
+    except Exception as e:
+        await db.rollback()
+        raise submit_error(e)
+
+@router.get("/submissions/{submission_id}", response_model=dict)
+async def get_submission(
+    submission_id: int,
+    authorization: str = Header(..., alias="Authorization"),
+    db = Depends(get_async_db),
+):
+    """Status (queued, completed or failed) and score of one of the calling team's submissions"""
+    result = await db.execute(submission_status_query(submission_id, authorization))
+    return submission_status(result.first())
+
+@router.post("/submit/batch", response_model=dict)
+async def submit_batch(
+    request: Request,
+    authorization: str = Header(..., alias="Authorization"),
+    db = Depends(get_async_db),
+):
+    """Store many submissions for one team in a single transaction"""
+    try:
+        from config import settings
+
+        check_team_key(authorization, settings)
+        check_quota(authorization, settings)
+        items = parse_batch(await request.body(), request.headers.get("content-type", ""), settings.SUBMIT_BATCH_MAX_ITEMS)
+        try:
+            remaining = await submissions_left_async(db, authorization, settings.SUBMISSIONS_PER_TEAM)
+        except (UnknownTeam, QuotaExceeded) as e:
+            raise quota_error(e, authorization, settings)
+        results, scored = await prepare_batch_async(items, remaining)
+        logger.info("Batch submission of %d from %s", len(items), mask_team_key(authorization))
+        now = datetime.now()
+
+        try:
+            granted, submission_count = await reserve_submissions_async(
+                db, authorization, settings.SUBMISSIONS_PER_TEAM, len(scored)
+            )
+        except (UnknownTeam, QuotaExceeded) as e:
+            raise quota_error(e, authorization, settings)
+        team_key_cache.remember(authorization, True, submission_count)
+
+        accepted = scored[:granted]
+        await db.execute(insert(Submission), batch_rows(authorization, accepted, now))
+        best = max(score for _, _, score in accepted)
+        await record_score_async(db, authorization, best, now)
+
+        await db.commit()
+        await leaderboard_cache.invalidate_async()
+        replica_router.note_write(authorization)
+        score_events.publish(ScoreEvent(authorization, best, now.isoformat()))
+
+        return batch_response(results, scored, granted, submission_count, settings)
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise submit_error(e)
+
+@router.get("/team-metrics/{team_key}", response_model=dict)
+async def get_team_metrics(
+    team_key: str,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Submissions per page"),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="ndjson streams one submission per line"),
+):
+    """Get performance metrics for a specific team"""
+    after = parse_cursor(cursor)
+    if wants_ndjson(request, format):
+        async def team_exists(db):
+            return (await db.execute(team_query(team_key))).first()
+
+        if not await run_read_async(team_exists, team_key):
+            raise HTTPException(status_code=404, detail="Team not found")
+        return StreamingResponse(
+            stream_team_metrics(team_key, after, limit), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    limit = limit or DEFAULT_PAGE_SIZE
+
+    async def build(db):
+        team = (await db.execute(team_query(team_key))).first()
+        totals = (await db.execute(aggregates_query(team_key))).one()
+        check_team_metrics(team, totals)
+        percentiles = (await db.execute(percentile_query(team_key, totals.with_metrics))).one()
+        rows = (await db.execute(page_query(team_key, after, limit + 1))).all()
+        return format_team_metrics(team, totals, percentiles, rows, limit)
+
+    return await leaderboard_cache.respond_async(
+        request, f"team-metrics/{team_key}?cursor={cursor or ''}&limit={limit}",
+        lambda: run_read_async(build, team_key), max_lag=replica_router.staleness,
+    )
+
+async def stream_team_metrics(team_key: str, after, limit: Optional[int]):
+    """NDJSON lines from a server-side cursor, on a session owned by the response"""
+    async with read_session_async(team_key) as db:
+        result = await db.stream(page_query(team_key, after, limit))
+        async for rows in result.partitions(NDJSON_BATCH_SIZE):
+            yield b"".join(encode_json(metric_row(row)) + b"\n" for row in rows)
+
+@router.get("/scores", response_model=list)
+async def get_scores(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Max submissions listed per team"),
+    since: Optional[datetime] = Query(None, description="Only list submissions at or after this time"),
+    authorization: Optional[str] = Header(None, alias="Authorization", description="Team key; a team that just submitted reads its own write"),
+):
+    return await leaderboard_cache.respond_async(
+        request,
+        f"scores?limit={limit}&since={since.isoformat() if since else ''}",
+        lambda: run_read_async(lambda db: build_leaderboard_async(db, limit=limit, since=since), authorization),
+        max_lag=replica_router.staleness,
+    )
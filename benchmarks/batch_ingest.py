@@ -0,0 +1,81 @@
+"""
+Throughput of /api/submit/batch against one /api/submit call per payload.
+
+Stores the same number of submissions both ways, for one team each, and
+reports rows per second. Runs against a throwaway SQLite database unless
+DATABASE_URL is already set.
+
+    python -m benchmarks.batch_ingest --submissions 2000 --batch-size 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from benchmarks.common import use_sqlite, sample_payload, seed_teams
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--submissions", type=int, default=2000, help="payloads stored per mode")
+    parser.add_argument("--batch-size", type=int, default=500, help="payloads per /submit/batch request")
+    parser.add_argument("--ndjson", action="store_true", help="send batches as NDJSON instead of a JSON array")
+    args = parser.parse_args(argv)
+
+    use_sqlite("batch_ingest")
+    os.environ["SUBMISSIONS_PER_TEAM"] = str(args.submissions)
+    os.environ["SUBMIT_BATCH_MAX_ITEMS"] = str(max(args.batch_size, 1))
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from models.submissions import Submission
+    from db import SessionLocal
+    from api.submissions import router
+
+    loop_key, batch_key = seed_teams(2, label="ingest")
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    payload = sample_payload()
+
+    with TestClient(app) as client:
+        start = time.perf_counter()
+        for _ in range(args.submissions):
+            response = client.post("/api/submit", json=payload, headers={"Authorization": loop_key})
+            assert response.status_code == 200, response.text
+        loop_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(0, args.submissions, args.batch_size):
+            items = [payload] * min(args.batch_size, args.submissions - offset)
+            if args.ndjson:
+                response = client.post(
+                    "/api/submit/batch",
+                    content="\n".join(json.dumps(item) for item in items),
+                    headers={"Authorization": batch_key, "Content-Type": "application/x-ndjson"},
+                )
+            else:
+                response = client.post("/api/submit/batch", json=items, headers={"Authorization": batch_key})
+            assert response.status_code == 200, response.text
+        batch_elapsed = time.perf_counter() - start
+
+    session = SessionLocal()
+    stored = {
+        key: session.query(Submission).filter(Submission.team_key == key).count()
+        for key in (loop_key, batch_key)
+    }
+    session.close()
+
+    report = {
+        "submissions": args.submissions,
+        "batch_size": args.batch_size,
+        "loop_rows_per_sec": round(args.submissions / loop_elapsed, 1),
+        "batch_rows_per_sec": round(args.submissions / batch_elapsed, 1),
+        "speedup": round(loop_elapsed / batch_elapsed, 1),
+        "stored": {"loop": stored[loop_key], "batch": stored[batch_key]},
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if stored[loop_key] == stored[batch_key] == args.submissions else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Shared helpers for the benchmark scripts"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).parent.parent
+
+
+def use_sqlite(name: str) -> str:
+    """Point DATABASE_URL at a throwaway SQLite file unless one is already configured"""
+    if "DATABASE_URL" not in os.environ:
+        db_path = Path(tempfile.mkdtemp()) / f"{name}.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    return os.environ["DATABASE_URL"]
+
+
+def sample_payload() -> dict:
+    """A valid CombinedMetricsPayload built from the reference benchmark"""
+    perfect = json.loads((ROOT / 'perfect_evaluation.json').read_text())
+    return {
+        "business_metrics": {
+            "top_5_customers_by_total_spend": perfect['top_5_customers_by_total_spend'],
+            "top_5_products_by_revenue": [
+                dict(p, product_id=str(p['product_id'])) for p in perfect['top_5_products_by_revenue']
+            ],
+            "shipping_performance_by_carrier": [
+                dict(s, delayed_shipments=0, undelivered_shipments=0)
+                for s in perfect['shipping_performance_by_carrier']
+            ],
+            "return_reason_analysis": [
+                dict(r, total_refund_amount=r['average_refund_amount'])
+                for r in perfect['return_reason_analysis']
+            ],
+        },
+        "performance_metrics": {
+            "duration_sec": 1.0, "cpu_avg": 50.0, "memory_avg": 256.0,
+            "sample_count": 10, "status": "success"
+        }
+    }
+
+
+def seed_teams(count: int, label: str = "bench") -> List[str]:
+    """Recreate the schema and insert `count` teams; returns their keys"""
+    from config import settings
+    from models.submissions import Base, Team
+    from db import SessionLocal, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    keys = [f"{settings.TEAM_KEY_PREFIX}{label}{i:04d}" for i in range(count)]
+    session = SessionLocal()
+    session.add_all([
+        Team(team_key=key, team_name=f"Team {i}", avatar=key[len(settings.TEAM_KEY_PREFIX)], submission_count=0)
+        for i, key in enumerate(keys)
+    ])
+    session.commit()
+    session.close()
+    return keys
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,157 @@
+"""
+Synthetic data at any scale: datasets shaped like sample_data/, and
+teams with submission history for load tests.
+
+    python -m benchmarks.datagen --orders 10000000 --out /tmp/dataset
+    python -m benchmarks.datagen --teams 500 --history 10
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+CARRIERS = ['UPS', 'USPS', 'FedEx', 'DHL', 'BlueDart']
+SHIPMENT_STATUSES = ['delivered', 'processing', 'shipped', 'in transit']
+RETURN_REASONS = ['defective', 'changed mind', 'wrong item', 'damaged', 'late delivery']
+CATEGORIES = ['Groceries', 'Electronics', 'Clothing', 'Books', 'Toys']
+WORDS = ['Good', 'The', 'Four', 'Blue', 'Prime', 'Nova', 'Swift', 'Lumen', 'Atlas', 'Echo']
+
+
+def write_dataset(out_dir: Path, orders: int, customers: Optional[int] = None,
+                  products: Optional[int] = None, fmt: str = "ndjson", seed: int = 0) -> Dict[str, int]:
+    """
+    Write orders/customers/products/shipments/returns into out_dir as NDJSON
+    (or JSON arrays with fmt="json"). Shipments cover half the orders and
+    returns a twentieth. Returns the row count per file.
+    """
+    rng = random.Random(seed)
+    customers = customers or max(5, orders // 20)
+    products = products or max(5, min(orders // 10, 10000))
+    counts = {
+        'customers': customers,
+        'products': products,
+        'orders': orders,
+        'shipments': orders // 2,
+        'returns': max(1, orders // 20),
+    }
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suffix = '.ndjson' if fmt == 'ndjson' else '.json'
+
+    def rows(name):
+        if name == 'customers':
+            for i in range(customers):
+                yield json.dumps({"id": f"cust{i}", "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                                  "email": f"cust{i}@example.com"})
+        elif name == 'products':
+            for i in range(products):
+                yield json.dumps({"id": i, "name": f"{rng.choice(WORDS)} {i}", "category": rng.choice(CATEGORIES),
+                                  "price": round(rng.uniform(1, 500), 2), "stock": rng.randint(0, 100)})
+        elif name == 'orders':
+            randrange = rng.randrange
+            for i in range(orders):
+                yield (f'{{"id": "order{i}", "customer_id": "cust{randrange(customers)}", '
+                       f'"product_id": {randrange(products)}, "quantity": {randrange(1, 10)}, "date": "2025-03-17"}}')
+        elif name == 'shipments':
+            for i in range(counts['shipments']):
+                yield (f'{{"id": "ship{i}", "order_id": "order{i}", "carrier": "{rng.choice(CARRIERS)}", '
+                       f'"status": "{rng.choice(SHIPMENT_STATUSES)}"}}')
+        else:
+            for i in range(counts['returns']):
+                yield (f'{{"id": "ret{i}", "order_id": "order{i}", "product_id": {rng.randrange(products)}, '
+                       f'"reason": "{rng.choice(RETURN_REASONS)}", "refund": {round(rng.uniform(1, 500), 2)}}}')
+
+    for name in counts:
+        with open(out_dir / f"{name}{suffix}", 'w') as f:
+            if fmt == 'ndjson':
+                for row in rows(name):
+                    f.write(row)
+                    f.write('\n')
+            else:
+                f.write('[\n')
+                for i, row in enumerate(rows(name)):
+                    f.write(',\n' if i else '')
+                    f.write(row)
+                f.write('\n]\n')
+    return counts
+
+
+def seed_workload(teams: int, history: int = 0, label: str = "load", seed: int = 0) -> List[str]:
+    """
+    Recreate the schema in DATABASE_URL with `teams` teams, each with
+    `history` past submissions (random scores over the last day), and
+    return the team keys. Unlike create_team_keys.create_teams there is no
+    upper bound on the team count, and keys are deterministic for a label.
+    """
+    from sqlalchemy import insert
+    from models.submissions import Submission, Team
+    from db import SessionLocal
+    from benchmarks.common import sample_payload, seed_teams
+
+    keys = seed_teams(teams, label=label)
+    if not history:
+        return keys
+
+    rng = random.Random(seed)
+    metrics = json.dumps(sample_payload()["business_metrics"])
+    now = datetime.now()
+    session = SessionLocal()
+    try:
+        for key in keys:
+            rows = [
+                {
+                    "team_key": key, "metrics": metrics, "score": round(rng.uniform(0, 100), 2), "status": "completed",
+                    "timestamp": now - timedelta(seconds=rng.randrange(86400)),
+                    "duration_sec": round(rng.uniform(0.5, 30), 2), "cpu_avg": round(rng.uniform(5, 95), 1),
+                    "memory_avg": round(rng.uniform(64, 2048), 1), "sample_count": rng.randrange(1, 50),
+                    "perf_status": "success",
+                }
+                for _ in range(history)
+            ]
+            session.execute(insert(Submission), rows)
+            session.query(Team).filter(Team.team_key == key).update({
+                Team.submission_count: history,
+                Team.best_score: max(row["score"] for row in rows),
+                Team.last_submission: max(row["timestamp"] for row in rows),
+            })
+        session.commit()
+    finally:
+        session.close()
+    return keys
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", type=Path, help="write a dataset here")
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson")
+    parser.add_argument("--teams", type=int, help="seed DATABASE_URL with this many teams")
+    parser.add_argument("--history", type=int, default=0, help="past submissions per seeded team")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.out is None and args.teams is None:
+        parser.error("nothing to do: pass --out and/or --teams")
+
+    report = {}
+    start = time.perf_counter()
+    if args.out is not None:
+        report["dataset"] = {
+            "out": str(args.out),
+            "rows": write_dataset(args.out, args.orders, args.customers, args.products, args.format, args.seed),
+        }
+    if args.teams is not None:
+        from config import settings
+        keys = seed_workload(args.teams, args.history, seed=args.seed)
+        report["workload"] = {"database": settings.DATABASE_URL, "teams": len(keys), "submissions": len(keys) * args.history}
+    report["elapsed_sec"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Compare latency and throughput of the sync and async database paths.
+
+Drives /api/submit, /api/scores and /api/team-metrics in-process over
+ASGI at increasing concurrency, once with the sync router (threadpool +
+SessionLocal) and once with the async router (AsyncSession), and reports
+p50/p99 latency, RPS and the best RPS reached. SQLite/aiosqlite stand in
+for MySQL unless DATABASE_URL is set. Needs httpx.
+
+    python -m benchmarks.db_latency --requests 400 --concurrency 1 8 32 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from benchmarks.common import use_sqlite, sample_payload, seed_teams, percentile
+
+
+async def run_level(client, keys, payload, requests: int, concurrency: int) -> dict:
+    """Fire `requests` mixed calls with `concurrency` in flight; one in five is a submit"""
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            key = keys[i % len(keys)]
+            start = time.perf_counter()
+            if i % 5 == 0:
+                response = await client.post("/api/submit", json=payload, headers={"Authorization": key})
+            elif i % 5 in (1, 2):
+                response = await client.get("/api/scores", params={"limit": 5})
+            else:
+                response = await client.get(f"/api/team-metrics/{key}")
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "rps": round(requests / elapsed, 1),
+        "errors": errors,
+    }
+
+
+async def run_mode(mode: str, args) -> dict:
+    import httpx
+    from fastapi import FastAPI
+    if mode == "async":
+        from api.submissions_async import router
+    else:
+        from api.submissions import router
+
+    keys = seed_teams(args.teams, label=mode)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    payload = sample_payload()
+
+    levels = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Seed one submission per team so team-metrics has rows to read
+        for key in keys:
+            await client.post("/api/submit", json=payload, headers={"Authorization": key})
+        for concurrency in args.concurrency:
+            levels.append(await run_level(client, keys, payload, args.requests, concurrency))
+    return {"mode": mode, "levels": levels, "max_rps": max(level["rps"] for level in levels)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=400, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    args = parser.parse_args(argv)
+
+    use_sqlite("db_latency")
+    # Measure the database path, not the leaderboard cache, and never run out of quota
+    os.environ.setdefault("LEADERBOARD_CACHE_BACKEND", "none")
+    os.environ.setdefault("SUBMISSIONS_PER_TEAM", "1000000")
+
+    results = [asyncio.run(run_mode(mode, args)) for mode in args.modes]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
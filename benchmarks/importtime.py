@@ -0,0 +1,147 @@
+"""
+Import-time budget for the app, from a `python -X importtime` digest.
+
+Imports --module (default: main) in fresh interpreters --runs times and
+keeps the fastest run. The digest shows the total, the self time summed
+per top-level package, and the slowest of this repo's own modules. With
+--boot it also times the app lifespan's startup (connection check, schema,
+reference, workers) in the same fresh-interpreter way. Exits 1 when the
+import exceeds --budget-ms or the boot exceeds --boot-budget-ms, so CI
+can run it as a startup regression test.
+
+    python -m benchmarks.importtime --budget-ms 900
+    DB_CREATE_SCHEMA=false python -m benchmarks.importtime --boot --boot-budget-ms 300
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+from benchmarks.common import ROOT
+
+RESULT_PREFIX = "BOOT_RESULT "
+
+BOOT_PROBE = f"""
+import asyncio, time
+import main
+
+async def boot():
+    start = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        print({RESULT_PREFIX!r} + repr(time.perf_counter() - start))
+
+asyncio.run(boot())
+"""
+
+# Top-level packages that belong to this repository
+LOCAL_PACKAGES = {"main", "api", "core", "db", "models", "config", "migrations"}
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """Rows of `-X importtime` output ("import time: self | cumulative | name")"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            records.append(ImportRecord(
+                name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2
+            ))
+        except ValueError:
+            continue  # the header row
+    return records
+
+
+def probe_env() -> Dict[str, str]:
+    return dict(
+        os.environ,
+        DATABASE_URL=os.environ.get("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/importtime.db"),
+        SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+        LOG_LEVEL="CRITICAL",
+    )
+
+
+def profile(module: str) -> List[ImportRecord]:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=probe_env(), capture_output=True, text=True,
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{output.stderr[-2000:]}")
+    return parse_importtime(output.stderr)
+
+
+def boot_ms() -> float:
+    """Milliseconds from entering the app lifespan to serving, in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", BOOT_PROBE], cwd=ROOT, env=probe_env(), capture_output=True, text=True
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return round(float(line[len(RESULT_PREFIX):]) * 1000, 1)
+    raise RuntimeError(f"Boot probe failed:\n{output.stderr[-2000:]}")
+
+
+def digest(records: List[ImportRecord], module: str, top: int) -> Dict:
+    by_package: Dict[str, int] = defaultdict(int)
+    for record in records:
+        by_package[record.module.split(".")[0]] += record.self_us
+    local = [r for r in records if r.module.split(".")[0] in LOCAL_PACKAGES]
+    total = next((r.cumulative_us for r in reversed(records) if r.module == module and r.depth == 0),
+                 sum(r.self_us for r in records))
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+        "local_modules_ms": {
+            r.module: {"self": round(r.self_us / 1000, 1), "cumulative": round(r.cumulative_us / 1000, 1)}
+            for r in sorted(local, key=lambda r: r.cumulative_us, reverse=True)[:top]
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters; the fastest is reported")
+    parser.add_argument("--top", type=int, default=15, help="rows per digest section")
+    parser.add_argument("--budget-ms", type=float, help="fail when the import takes longer than this")
+    parser.add_argument("--boot", action="store_true", help="also time the lifespan startup of main.app")
+    parser.add_argument("--boot-budget-ms", type=float, help="fail when the lifespan startup takes longer than this")
+    args = parser.parse_args(argv)
+
+    runs = [digest(profile(args.module), args.module, args.top) for _ in range(args.runs)]
+    report = min(runs, key=lambda run: run["total_ms"])
+    report["runs_ms"] = [run["total_ms"] for run in runs]
+    within_budget = True
+    if args.budget_ms is not None:
+        report["budget_ms"] = args.budget_ms
+        within_budget = report["total_ms"] <= args.budget_ms
+    if args.boot or args.boot_budget_ms is not None:
+        boots = [boot_ms() for _ in range(args.runs)]
+        report["boot_ms"] = min(boots)
+        report["boot_runs_ms"] = boots
+        if args.boot_budget_ms is not None:
+            report["boot_budget_ms"] = args.boot_budget_ms
+            within_budget = within_budget and report["boot_ms"] <= args.boot_budget_ms
+    report["within_budget"] = within_budget
+    print(json.dumps(report, indent=2))
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
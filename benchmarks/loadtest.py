@@ -0,0 +1,379 @@
+"""
+Event-day load test: submits, leaderboard polls and WebSocket viewers at once.
+
+Seeds a database with --teams teams (plus optional submission history),
+then runs three kinds of async clients together until --submissions
+submits have been sent:
+
+  * submitters: --concurrency workers POSTing /api/submit for random teams
+  * pollers: --pollers loops GETting /api/scores every --poll-interval
+  * viewers: --viewers connections to /ws/scores, counting the pushes
+
+By default the full app from main.py runs in-process (lifespan included)
+on a throwaway SQLite database, so this works offline. With --url the
+requests go to a running server instead; it must use the database the
+seeding step writes to (DATABASE_URL), or pass --no-seed if the teams
+were seeded earlier with the same --teams. WebSocket viewers against
+--url need the `websockets` package.
+
+The report has p50/p95/p99 latency, RPS and error rate per endpoint, is
+written to --out as JSON (with the git commit) and can be compared with
+an earlier report via --compare. p99_ok_ms covers only the 2xx responses,
+so shed requests (429/503, counted under statuses) don't flatter it; an
+in-process run also reports what admission control turned away.
+
+    python -m benchmarks.loadtest --teams 500 --submissions 5000 --viewers 50 --out before.json
+    python -m benchmarks.loadtest --teams 500 --submissions 5000 --viewers 50 --compare before.json
+
+Overload (far more submits in flight than the pool has connections),
+with and without admission control; --retries makes turned-away submits
+come back after Retry-After like a well-behaved client:
+
+    DB_POOL_SIZE=4 DB_MAX_OVERFLOW=0 ADMISSION_ENABLED=false \
+        python -m benchmarks.loadtest --concurrency 150 --retries 20 --submissions 3000 --out unguarded.json
+    DB_POOL_SIZE=4 DB_MAX_OVERFLOW=0 ADMISSION_SUBMIT_CONCURRENCY=3 ADMISSION_READ_CONCURRENCY=1 \
+        python -m benchmarks.loadtest --concurrency 150 --retries 20 --submissions 3000 --compare unguarded.json
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from benchmarks.common import ROOT, use_sqlite, sample_payload, percentile
+
+# Endpoint stats that --compare reports, with the direction that is better
+COMPARED = (("p50_ms", -1), ("p95_ms", -1), ("p99_ms", -1), ("p99_ok_ms", -1), ("rps", 1), ("error_rate", -1))
+
+
+class EndpointStats:
+    """Latencies and status codes of one endpoint"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.ok_latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def observe(self, seconds: float, status: int):
+        self.latencies.append(seconds)
+        self.statuses[str(status)] += 1
+        if status >= 400:
+            self.errors += 1
+        else:
+            self.ok_latencies.append(seconds)
+
+    def failed(self, seconds: float, error: Exception):
+        self.latencies.append(seconds)
+        self.statuses[type(error).__name__] += 1
+        self.errors += 1
+
+    def report(self, elapsed: float) -> dict:
+        requests = len(self.latencies)
+        return {
+            "requests": requests,
+            "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+            "max_ms": round(max(self.latencies, default=0.0) * 1000, 2),
+            "p99_ok_ms": round(percentile(self.ok_latencies, 99) * 1000, 2),
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "statuses": dict(self.statuses),
+        }
+
+
+class ASGIWebSocket:
+    """Minimal in-process WebSocket client speaking ASGI directly to the app"""
+
+    def __init__(self, app, path: str, query: str = ""):
+        self.app = app
+        self.path = path
+        self.query = query
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": self.path, "raw_path": self.path.encode(), "query_string": self.query.encode(),
+            "root_path": "", "headers": [(b"host", b"loadtest")], "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80), "subprotocols": [],
+        }
+        self._to_app.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(scope, self._to_app.get, self._from_app.put))
+        message = await self._from_app.get()
+        if message["type"] != "websocket.accept":
+            raise ConnectionError(f"WebSocket rejected: {message}")
+
+    async def recv(self) -> str:
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            raise ConnectionError(f"WebSocket closed by server ({message.get('code')})")
+        return message.get("text") or message.get("bytes", b"").decode()
+
+    async def close(self):
+        self._to_app.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            await asyncio.wait([self._task], timeout=5)
+
+
+class RemoteWebSocket:
+    """WebSocket viewer against a running server, via the optional `websockets` package"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._conn = None
+
+    async def connect(self):
+        import websockets
+        self._conn = await websockets.connect(self.url, max_size=None)
+
+    async def recv(self) -> str:
+        return await self._conn.recv()
+
+    async def close(self):
+        await self._conn.close()
+
+
+def submission_payloads(count: int, rng: random.Random) -> List[dict]:
+    """A pool of valid payloads with different scores, so the leaderboard keeps moving"""
+    base = sample_payload()
+    payloads = []
+    for _ in range(count):
+        payload = copy.deepcopy(base)
+        business = payload["business_metrics"]
+        for key in ("top_5_customers_by_total_spend", "top_5_products_by_revenue"):
+            business[key] = business[key][:rng.randint(1, len(business[key]))]
+        payload["performance_metrics"]["duration_sec"] = round(rng.uniform(0.5, 30), 2)
+        payloads.append(payload)
+    return payloads
+
+
+async def run_load(client, open_viewer, keys: List[str], args) -> dict:
+    rng = random.Random(args.seed)
+    payloads = submission_payloads(32, rng)
+    stats = {"submit": EndpointStats(), "scores": EndpointStats()}
+    connect_latencies: List[float] = []
+    viewer_messages: List[int] = []
+    viewer_errors = Counter()
+    done = asyncio.Event()
+    remaining = iter(range(args.submissions))
+
+    async def submitter():
+        for _ in remaining:
+            key = rng.choice(keys)
+            payload = rng.choice(payloads)
+            for attempt in range(args.retries + 1):
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/submit", json=payload, headers={"Authorization": key})
+                except Exception as e:
+                    stats["submit"].failed(time.perf_counter() - start, e)
+                    break
+                stats["submit"].observe(time.perf_counter() - start, response.status_code)
+                retry_after = response.headers.get("retry-after")
+                if retry_after is None or attempt == args.retries:
+                    break
+                # Honour Retry-After, spread out so the retries don't come back in one wave
+                await asyncio.sleep(float(retry_after) * rng.uniform(0.5, 1.5))
+
+    async def poller():
+        # Stagger the loops so polls don't arrive in lockstep
+        await asyncio.sleep(rng.uniform(0, args.poll_interval))
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                response = await client.get("/api/scores", params={"limit": args.poll_limit})
+            except Exception as e:
+                stats["scores"].failed(time.perf_counter() - start, e)
+            else:
+                stats["scores"].observe(time.perf_counter() - start, response.status_code)
+            try:
+                await asyncio.wait_for(done.wait(), args.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def viewer():
+        websocket = open_viewer()
+        start = time.perf_counter()
+        try:
+            await websocket.connect()
+        except Exception as e:
+            viewer_errors[type(e).__name__] += 1
+            return
+        connect_latencies.append(time.perf_counter() - start)
+        received = 0
+        receiving = asyncio.ensure_future(websocket.recv())
+        stopping = asyncio.ensure_future(done.wait())
+        try:
+            while True:
+                await asyncio.wait([receiving, stopping], return_when=asyncio.FIRST_COMPLETED)
+                if not receiving.done():
+                    break
+                try:
+                    receiving.result()
+                except Exception as e:
+                    viewer_errors[type(e).__name__] += 1
+                    break
+                received += 1
+                receiving = asyncio.ensure_future(websocket.recv())
+        finally:
+            receiving.cancel()
+            stopping.cancel()
+            viewer_messages.append(received)
+            await websocket.close()
+
+    viewers = [asyncio.create_task(viewer()) for _ in range(args.viewers)]
+    pollers = [asyncio.create_task(poller()) for _ in range(args.pollers)]
+    start = time.perf_counter()
+    await asyncio.gather(*(submitter() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    # Let the last debounced broadcast reach the viewers
+    await asyncio.sleep(args.drain)
+    done.set()
+    await asyncio.gather(*pollers, *viewers)
+
+    return {
+        "elapsed_sec": round(elapsed, 2),
+        "endpoints": {name: endpoint.report(elapsed) for name, endpoint in stats.items()},
+        "websocket": {
+            "viewers": args.viewers,
+            "connected": len(connect_latencies),
+            "connect_p50_ms": round(percentile(connect_latencies, 50) * 1000, 2),
+            "connect_p95_ms": round(percentile(connect_latencies, 95) * 1000, 2),
+            "messages": sum(viewer_messages),
+            "messages_per_viewer_min": min(viewer_messages, default=0),
+            "messages_per_viewer_max": max(viewer_messages, default=0),
+            "errors": dict(viewer_errors),
+        },
+    }
+
+
+async def run_in_process(keys: List[str], args) -> dict:
+    import httpx
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            query = "protocol=delta" if args.ws_protocol == "delta" else ""
+            result = await run_load(client, lambda: ASGIWebSocket(app, "/ws/scores", query), keys, args)
+    from core.admission import admission
+    result["admission"] = admission.stats()
+    return result
+
+
+async def run_remote(keys: List[str], args) -> dict:
+    import httpx
+
+    ws_url = args.url.replace("http", "ws", 1).rstrip("/") + "/ws/scores"
+    if args.ws_protocol == "delta":
+        ws_url += "?protocol=delta"
+    limits = httpx.Limits(max_connections=args.concurrency + args.pollers)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await run_load(client, lambda: RemoteWebSocket(ws_url), keys, args)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict) -> Dict[str, dict]:
+    """Per-endpoint change of the headline numbers relative to an earlier report"""
+    changes = {}
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        changes[name] = {}
+        for stat, better in COMPARED:
+            old, new = before.get(stat, 0.0), current[stat]
+            changes[name][stat] = {
+                "before": old,
+                "after": new,
+                "change_pct": round((new - old) / old * 100, 1) if old else None,
+                "better": (new - old) * better > 0,
+            }
+    return changes
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--history", type=int, default=0, help="past submissions seeded per team")
+    parser.add_argument("--submissions", type=int, default=5000, help="submits sent during the run")
+    parser.add_argument("--concurrency", type=int, default=32, help="submits in flight")
+    parser.add_argument("--retries", type=int, default=0, help="times a submit turned away with Retry-After is retried")
+    parser.add_argument("--pollers", type=int, default=20, help="leaderboard polling loops")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between polls per loop")
+    parser.add_argument("--poll-limit", type=int, default=50, help="limit passed to /api/scores")
+    parser.add_argument("--viewers", type=int, default=50, help="WebSocket connections")
+    parser.add_argument("--ws-protocol", choices=["legacy", "delta"], default="legacy")
+    parser.add_argument("--drain", type=float, default=1.0, help="seconds viewers keep listening after the last submit")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout")
+    parser.add_argument("--url", help="base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--no-seed", action="store_true", help="reuse teams seeded by an earlier run")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    database = use_sqlite("loadtest")
+    if args.url is None:
+        # Measure the app, not the quota or the log volume; failures still show up in the status counts
+        os.environ.setdefault("SUBMISSIONS_PER_TEAM", str(args.submissions + args.history + 1))
+        os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+    from benchmarks.datagen import seed_workload
+
+    seed_start = time.perf_counter()
+    if args.no_seed:
+        from config import settings
+        keys = [f"{settings.TEAM_KEY_PREFIX}load{i:04d}" for i in range(args.teams)]
+    else:
+        keys = seed_workload(args.teams, args.history, seed=args.seed)
+    seed_elapsed = time.perf_counter() - seed_start
+
+    runner = run_remote if args.url else run_in_process
+    result = asyncio.run(runner(keys, args))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.url or "in-process",
+        "database": database.split("://", 1)[0],
+        "config": {
+            key: getattr(args, key) for key in (
+                "teams", "history", "submissions", "concurrency", "retries", "pollers", "poll_interval",
+                "poll_limit", "viewers", "ws_protocol",
+            )
+        },
+        "seed_sec": round(seed_elapsed, 2),
+        **result,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["compare"] = compare(report, json.load(f))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Per-request logging overhead of the submit path, before and after the
+queued log pipeline.
+
+Replays the log calls /api/submit makes (one INFO line, plus the payload
+dumps at DEBUG) --requests times on the calling thread and reports the
+microseconds per request the caller spent in logging:
+
+  legacy   f-string messages, JSON handler writing on the calling thread
+           (the original configure_logging)
+  sync     lazy %-style messages, same synchronous handler
+  queued   lazy messages handed to the listener thread (LOG_QUEUED)
+  sampled  queued, with LOG_SAMPLE_RATES keeping --sample-rate of the lines
+
+--sink-latency-us makes every write to the log stream sleep that long,
+standing in for a slow stdout pipe or log shipper; the synchronous
+pipelines pay it per line, the queued ones don't. For queued runs the
+time to drain the queue afterwards and any dropped records are reported
+too.
+
+    python -m benchmarks.logging_overhead --requests 20000 --sink-latency-us 50
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Callable, Dict
+from benchmarks.common import sample_payload
+from core.logs import Lazy
+
+LOGGER_NAME = "bench.submissions"
+LEVELS = ("WARNING", "INFO", "DEBUG")
+
+
+class Sink:
+    """Log stream that discards lines, optionally after a delay per write"""
+
+    def __init__(self, latency_us: float = 0.0):
+        self.latency = latency_us / 1e6
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        self.lines += 1
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def legacy_calls(logger, payload, metrics, perf_metrics, key):
+    # What submit_metrics did before: messages built before the level check
+    logger.info(f"Submission request from {key[:7]}...")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Full payload: {payload.json()}")
+        logger.debug(f"Business metrics: {metrics}")
+        if perf_metrics:
+            logger.debug(f"Performance metrics: {perf_metrics}")
+
+
+def lazy_calls(logger, payload, metrics, perf_metrics, key):
+    logger.info("Submission request from %s", key[:7] + "...")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Full payload: %s", Lazy(payload.json))
+        logger.debug("Business metrics: %s", metrics)
+        if perf_metrics:
+            logger.debug("Performance metrics: %s", perf_metrics)
+
+
+def run(calls: Callable, level: str, use_queue: bool, sample_rate: float, args) -> Dict:
+    from api.models import CombinedMetricsPayload
+    from core import logs
+
+    payload = CombinedMetricsPayload(**sample_payload())
+    sink = Sink(args.sink_latency_us)
+    pipeline = logs.configure(
+        level,
+        use_queue=use_queue,
+        queue_size=args.queue_size,
+        sample_rates={LOGGER_NAME: sample_rate} if sample_rate < 1.0 else None,
+        stream=sink,
+    )
+    logger = logging.getLogger(LOGGER_NAME)
+    key = "TM-" + "b" * 32
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        calls(logger, payload, payload.business_metrics, payload.performance_metrics, key)
+    elapsed = time.perf_counter() - start
+    stats = pipeline.stats()
+
+    drain_start = time.perf_counter()
+    pipeline.stop()
+    result = {
+        "us_per_request": round(elapsed / args.requests * 1e6, 2),
+        "lines_written": sink.lines,
+    }
+    if use_queue:
+        result["drain_ms"] = round((time.perf_counter() - drain_start) * 1000, 1)
+        result["dropped"] = stats["dropped"]
+    if sample_rate < 1.0:
+        result["sampled_out"] = stats["sampled_out"]
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sink-latency-us", type=float, default=0.0, help="delay per write to the log stream")
+    parser.add_argument("--queue-size", type=int, default=10000, help="LOG_QUEUE_SIZE for the queued runs")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="fraction kept in the sampled runs")
+    args = parser.parse_args(argv)
+
+    variants = {
+        "legacy": (legacy_calls, False, 1.0),
+        "sync": (lazy_calls, False, 1.0),
+        "queued": (lazy_calls, True, 1.0),
+        "sampled": (lazy_calls, True, args.sample_rate),
+    }
+    report = {
+        level: {name: run(calls, level, use_queue, rate, args) for name, (calls, use_queue, rate) in variants.items()}
+        for level in LEVELS
+    }
+    logging.getLogger().handlers.clear()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
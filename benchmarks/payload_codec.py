@@ -0,0 +1,107 @@
+"""
+CPU cost per /api/submit of turning the request body into stored columns
+and the response into bytes, before and after the single-pass decoder.
+
+  legacy  json.loads, validation against Union[MetricsPayload,
+          CombinedMetricsPayload] (tried member by member, as FastAPI's Body
+          did), .dict() for the scorer, json.dumps/.json() for the stored
+          columns, JSONResponse rendering
+  fast    decode_submission() (one validate_json against the model picked
+          by the top-level keys, columns dumped by pydantic-core) and
+          FastJSONResponse rendering
+
+Both formats are measured: the combined payload and the legacy bare
+MetricsPayload, which the old union tried second. Scoring and the database
+are left out; they are the same in both paths.
+
+    python -m benchmarks.payload_codec --iterations 20000
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict, Union
+from benchmarks.common import use_sqlite, sample_payload
+
+RESPONSE = {
+    "status": "success",
+    "message": "Submission recorded successfully",
+    "score": 87.5,
+    "submissions_remaining": 42,
+    "performance_metrics": {"duration_sec": 1.0, "cpu_avg": 50.0, "memory_avg": 256.0},
+}
+
+
+def legacy_path(body: bytes):
+    from pydantic import TypeAdapter
+    from fastapi.responses import JSONResponse
+    from api.models import MetricsPayload, CombinedMetricsPayload
+
+    adapter = TypeAdapter(Union[MetricsPayload, CombinedMetricsPayload])
+    response = JSONResponse(None)
+
+    def submit():
+        payload = adapter.validate_python(json.loads(body))
+        if isinstance(payload, CombinedMetricsPayload):
+            metrics, perf_metrics = payload.business_metrics, payload.performance_metrics
+        else:
+            metrics, perf_metrics = payload, None
+        metrics_dict = metrics.dict()
+        stored = (json.dumps(metrics_dict), perf_metrics.json() if perf_metrics else None)
+        return stored, response.render(RESPONSE)
+
+    return submit
+
+
+def fast_path(body: bytes):
+    from core.codec import FastJSONResponse
+    from api.payloads import decode_submission
+
+    response = FastJSONResponse(None)
+
+    def submit():
+        decoded = decode_submission(body)
+        return (decoded.metrics_json, decoded.perf_json), response.render(RESPONSE)
+
+    return submit
+
+
+def measure(submit: Callable, iterations: int) -> float:
+    for _ in range(min(iterations, 200)):
+        submit()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        submit()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args(argv)
+    use_sqlite("payload_codec")  # the app modules read config.settings on import
+
+    import warnings
+    warnings.simplefilter("ignore")  # .dict()/.json() deprecation noise from the legacy path
+
+    combined = sample_payload()
+    bodies = {
+        "combined": json.dumps(combined).encode(),
+        "legacy_format": json.dumps(combined["business_metrics"]).encode(),
+    }
+    report: Dict[str, Dict] = {}
+    for name, body in bodies.items():
+        legacy_us = measure(legacy_path(body), args.iterations)
+        fast_us = measure(fast_path(body), args.iterations)
+        report[name] = {
+            "body_bytes": len(body),
+            "legacy_us": round(legacy_us, 2),
+            "fast_us": round(fast_us, 2),
+            "speedup": round(legacy_us / fast_us, 2),
+        }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Concurrency stress test for submission quota enforcement.
+
+Fires many parallel /api/submit requests at a handful of teams and checks
+that no team is admitted past SUBMISSIONS_PER_TEAM. Runs against a
+throwaway SQLite database unless DATABASE_URL is already set. The same
+check runs under pytest, at a smaller scale, in tests/test_quota_concurrency.py.
+
+    python -m benchmarks.quota_stress --clients 64 --teams 5 --attempts 40
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import use_sqlite, sample_payload, seed_teams
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=64, help="parallel client threads")
+    parser.add_argument("--teams", type=int, default=5)
+    parser.add_argument("--attempts", type=int, default=40, help="submits per team")
+    args = parser.parse_args(argv)
+
+    use_sqlite("quota_stress")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from config import settings
+    from models.submissions import Team
+    from db import SessionLocal
+    from api.submissions import router
+
+    keys = seed_teams(args.teams, label="stress")
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    payload = sample_payload()
+    jobs = [key for key in keys for _ in range(args.attempts)]
+
+    with TestClient(app) as client:
+        def submit(key):
+            return key, client.post("/api/submit", json=payload, headers={"Authorization": key}).status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            results = list(pool.map(submit, jobs))
+        elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for _, status in results)
+    admitted = Counter(key for key, status in results if status == 200)
+    session = SessionLocal()
+    stored = {t.team_key: t.submission_count for t in session.query(Team).filter(Team.team_key.in_(keys))}
+    session.close()
+
+    limit = settings.SUBMISSIONS_PER_TEAM
+    over = {k: n for k, n in admitted.items() if n > limit}
+    mismatched = {k: (admitted.get(k, 0), stored[k]) for k in keys if stored[k] != admitted.get(k, 0)}
+    report = {
+        "clients": args.clients,
+        "requests": len(jobs),
+        "elapsed_sec": round(elapsed, 3),
+        "submits_per_sec": round(len(jobs) / elapsed, 1),
+        "statuses": dict(statuses),
+        "over_admitted": over,
+        "counter_mismatch": mismatched,
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if over or mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Reference generation throughput on a synthetic dataset.
+
+Generates (or reuses) a dataset with --rows orders, builds the reference
+with core.reference_builder for each worker count, and optionally with the
+original load-everything approach for comparison. Reports seconds, orders
+per second and peak RSS per run, and whether all runs agree.
+
+    python -m benchmarks.reference_generation --rows 10000000 --workers 1,4
+"""
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from benchmarks.datagen import write_dataset
+
+
+def legacy_build(data_dir: Path) -> dict:
+    """The pre-streaming create_perfect_evaluation approach: everything in memory, two passes, full sorts"""
+    def load(name):
+        path = data_dir / f"{name}.ndjson"
+        if path.exists():
+            with open(path) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        with open(data_dir / f"{name}.json") as f:
+            return json.load(f)
+
+    orders, customers, products = load('orders'), load('customers'), load('products')
+    product_map = {p['id']: p for p in products}
+    customer_map = {c['id']: c for c in customers}
+    customer_spends = defaultdict(float)
+    for order in orders:
+        customer_spends[order['customer_id']] += order['quantity'] * product_map[order['product_id']]['price']
+    product_revenues = defaultdict(float)
+    for order in orders:
+        product_revenues[order['product_id']] += order['quantity'] * product_map[order['product_id']]['price']
+    top_customers = sorted(customer_spends.items(), key=lambda x: x[1], reverse=True)[:5]
+    top_products = sorted(product_revenues.items(), key=lambda x: x[1], reverse=True)[:5]
+    return {
+        'top_5_customers_by_total_spend': [
+            {'customer_id': c, 'customer_name': customer_map[c]['name'], 'total_spent': round(s, 2)}
+            for c, s in top_customers
+        ],
+        'top_5_products_by_revenue': [
+            {'product_id': p, 'product_name': product_map[p]['name'], 'total_revenue': round(r, 2)}
+            for p, r in top_products
+        ],
+    }
+
+
+def _measure(fn, *args) -> tuple:
+    """Run fn in a fresh process so peak RSS belongs to this run alone"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_call, fn, args).result()
+
+
+def _call(fn, args):
+    """Runs in the measuring process; peak RSS includes any pool workers fn starts"""
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return result, elapsed, peak_kb
+
+
+def _ranked(reference: dict) -> dict:
+    """The parts every implementation produces, for comparing runs"""
+    return {key: reference[key] for key in ('top_5_customers_by_total_spend', 'top_5_products_by_revenue')}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000_000, help="orders in the synthetic dataset")
+    parser.add_argument("--workers", default="1,4", help="comma-separated worker counts to try")
+    parser.add_argument("--data-dir", type=Path, help="reuse (or create) the dataset here")
+    parser.add_argument("--legacy", action="store_true", help="also time the original in-memory approach")
+    args = parser.parse_args(argv)
+
+    from core.reference_builder import build_reference
+
+    data_dir = args.data_dir or Path(tempfile.mkdtemp()) / "dataset"
+    report = {"rows": args.rows, "data_dir": str(data_dir), "runs": []}
+    if not (data_dir / "orders.ndjson").exists():
+        start = time.perf_counter()
+        write_dataset(data_dir, args.rows)
+        report["generate_sec"] = round(time.perf_counter() - start, 2)
+
+    results = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        reference, elapsed, peak_kb = _measure(build_reference, data_dir, workers)
+        results.append(_ranked(reference))
+        report["runs"].append({
+            "impl": "streaming", "workers": workers, "elapsed_sec": round(elapsed, 2),
+            "orders_per_sec": round(args.rows / elapsed), "peak_rss_mb": round(peak_kb / 1024, 1),
+        })
+    if args.legacy:
+        reference, elapsed, peak_kb = _measure(legacy_build, data_dir)
+        results.append(_ranked(reference))
+        report["runs"].append({
+            "impl": "legacy", "workers": 1, "elapsed_sec": round(elapsed, 2),
+            "orders_per_sec": round(args.rows / elapsed), "peak_rss_mb": round(peak_kb / 1024, 1),
+        })
+
+    report["consistent"] = all(result == results[0] for result in results)
+    print(json.dumps(report, indent=2))
+    return 0 if report["consistent"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Startup cost of the app: import time, engines, connections opened, boot time.
+
+Each measurement runs in a fresh interpreter against a throwaway SQLite
+database: `import main` is timed --imports times (median reported), then
+one process boots the app, serves --requests submits and leaderboard
+reads from --concurrency threads, and reports how many engines exist, how
+many DBAPI connections were opened and the request rate. With --ref the
+same probe runs on a git worktree of that commit for comparison.
+
+    python -m benchmarks.startup --ref HEAD~1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+from benchmarks.common import ROOT
+
+RESULT_PREFIX = "STARTUP_RESULT "
+
+IMPORT_PROBE = f"""
+import time
+start = time.perf_counter()
+import main
+print({RESULT_PREFIX!r} + repr(time.perf_counter() - start))
+"""
+
+# Only touches names every revision of main.py has (app, SessionLocal)
+BOOT_PROBE = f"""
+import gc, json, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+opened = []
+event.listen(Pool, "connect", lambda *args: opened.append(1))
+
+import main
+from fastapi.testclient import TestClient
+from models.submissions import Team
+from benchmarks.common import sample_payload
+
+requests, concurrency = int(sys.argv[1]), int(sys.argv[2])
+start = time.perf_counter()
+with TestClient(main.app) as client:
+    boot_sec = time.perf_counter() - start
+    session = main.SessionLocal()
+    keys = [f"TM-startup{{i:03d}}" for i in range(concurrency)]
+    session.add_all([Team(team_key=key, team_name=key, avatar="s", submission_count=0) for key in keys])
+    session.commit()
+    session.close()
+    payload = sample_payload()
+
+    def call(i):
+        if i % 2:
+            return client.get("/api/scores").status_code
+        return client.post("/api/submit", json=payload, headers={{"Authorization": keys[i % len(keys)]}}).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        statuses = list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+
+print({RESULT_PREFIX!r} + json.dumps({{
+    "engines": sum(isinstance(obj, Engine) for obj in gc.get_objects()),
+    "connections_opened": len(opened),
+    "boot_sec": round(boot_sec, 3),
+    "requests_per_sec": round(requests / elapsed, 1),
+    "errors": sum(status >= 400 for status in statuses),
+}}))
+"""
+
+
+def run_probe(tree: Path, code: str, *args) -> str:
+    db_path = Path(tempfile.mkdtemp()) / "startup.db"
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+        LOG_LEVEL="CRITICAL",
+        SUBMISSIONS_PER_TEAM="1000000",
+    )
+    # The tree under test must win over this checkout on sys.path
+    env.pop("PYTHONPATH", None)
+    output = subprocess.run(
+        [sys.executable, "-c", code, *map(str, args)], cwd=tree, env=env, capture_output=True, text=True
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return line[len(RESULT_PREFIX):]
+    raise RuntimeError(f"Probe failed in {tree}:\n{output.stderr[-2000:]}")
+
+
+def measure(tree: Path, args) -> dict:
+    imports = [float(run_probe(tree, IMPORT_PROBE)) for _ in range(args.imports)]
+    result = {"import_sec_median": round(statistics.median(imports), 3), "import_sec_min": round(min(imports), 3)}
+    result.update(json.loads(run_probe(tree, BOOT_PROBE, args.requests, args.concurrency)))
+    return result
+
+
+def measure_ref(ref: str, args) -> dict:
+    worktree = Path(tempfile.mkdtemp()) / "tree"
+    subprocess.run(["git", "worktree", "add", "--detach", str(worktree), ref], cwd=ROOT, check=True, capture_output=True)
+    try:
+        return measure(worktree, args)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", str(worktree)], cwd=ROOT, capture_output=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--imports", type=int, default=5, help="fresh interpreters timing `import main`")
+    parser.add_argument("--requests", type=int, default=200, help="requests served after boot")
+    parser.add_argument("--concurrency", type=int, default=16, help="threads sending requests")
+    parser.add_argument("--ref", help="git commit to compare against, e.g. HEAD~1")
+    args = parser.parse_args(argv)
+
+    report = {"current": measure(ROOT, args)}
+    baseline: Optional[dict] = measure_ref(args.ref, args) if args.ref else None
+    if baseline is not None:
+        report[args.ref] = baseline
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
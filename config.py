@@ -1,47 +1,128 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import List, Optional
 import logging
-from pythonjsonlogger import jsonlogger
 
 logger = logging.getLogger(__name__)
 
+# Async counterparts of the sync drivers DATABASE_URL may use
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
 class Settings(BaseSettings):
     DEBUG: bool = Field(False, description="Enable debug mode")
     LOG_LEVEL: str = Field("INFO", description="Logging level")
+    LOG_QUEUED: bool = Field(True, description="Hand log records to a background thread instead of writing them on the request thread")
+    LOG_QUEUE_SIZE: int = Field(10000, description="Log records buffered for the writer thread; more are dropped (and counted) rather than blocking")
+    LOG_SAMPLE_RATES: str = Field("", description='Fraction of DEBUG/INFO lines kept per logger, e.g. "api.submissions=0.01,core.scoring=0.1" (warnings and errors are always kept)')
     
     def configure_logging(self):
-        handler = logging.StreamHandler()
-        formatter = jsonlogger.JsonFormatter(
-            '%(asctime)s %(levelname)s %(name)s %(message)s'
+        from core.logs import configure, parse_sample_rates
+        configure(
+            self.LOG_LEVEL,
+            use_queue=self.LOG_QUEUED,
+            queue_size=self.LOG_QUEUE_SIZE,
+            sample_rates=parse_sample_rates(self.LOG_SAMPLE_RATES),
         )
-        handler.setFormatter(formatter)
-        
-        root_logger = logging.getLogger()
-        root_logger.setLevel(self.LOG_LEVEL)
-        root_logger.addHandler(handler)
         
         logger.info("Logging configured", extra={
             "log_level": self.LOG_LEVEL,
             "debug_mode": self.DEBUG
         })
     SUBMISSIONS_PER_TEAM: int = 5
+    SCORING_MODE: str = Field("inline", description="Where submissions are scored: inline, thread or process")
+    SCORING_WORKERS: Optional[int] = Field(None, description="Scoring pool size (defaults to the CPU count)")
+    SCORING_TIMEOUT: float = Field(5.0, description="Seconds one submission may spend in the scoring pool")
+    SCORING_MAX_PENDING: int = Field(64, description="Max submissions queued or running in the scoring pool before submits get 503")
+    SUBMIT_QUEUED: bool = Field(False, description="Return 202 from /api/submit and score submissions in background workers")
+    SUBMIT_WORKERS: int = Field(2, description="Queue worker tasks per process (queued mode)")
+    SUBMIT_QUEUE_PATH: str = Field("/tmp/submission-queue.db", description="SQLite file holding the durable submission queue")
+    SUBMIT_QUEUE_BATCH_SIZE: int = Field(50, description="Submissions scored and persisted per worker micro-batch")
+    SUBMIT_QUEUE_LEASE: float = Field(30.0, description="Seconds a claimed queue item stays invisible to other workers")
+    SUBMIT_QUEUE_MAX_ATTEMPTS: int = Field(3, description="Claims before a queued submission is marked failed")
+    SUBMIT_QUEUE_RECOVER_INTERVAL: float = Field(60.0, description="Seconds between sweeps re-enqueueing queued submissions missing from the queue (0 = only at startup)")
+    SUBMIT_BATCH_MAX_ITEMS: int = Field(1000, description="Max payloads accepted by one /api/submit/batch request")
     TEAM_KEY_PREFIX: str = Field("TM-", description="Prefix for team keys")
     SECRET_KEY: str = Field(..., description="Cryptographic secret key")
+    ADMIN_KEY: Optional[str] = Field(None, description="Key for /api/admin endpoints (defaults to SECRET_KEY)")
     TEAM_KEY_LENGTH: int = Field(32, description="Length of generated team keys")
+    AUTH_CACHE_SIZE: int = Field(1024, description="Max team keys held in the auth cache")
+    AUTH_CACHE_TTL: float = Field(300.0, description="Seconds a valid team key stays cached")
+    AUTH_NEGATIVE_TTL: float = Field(60.0, description="Seconds an invalid team key stays cached")
+    AUTH_INVALID_LOOKUPS_PER_SEC: float = Field(20.0, description="Rate of unknown-key lookups allowed to reach the database")
+    SCORE_CACHE_SIZE: int = Field(4096, description="Scores memoized per process by payload hash, cleared when the reference changes (0 disables)")
+    IDEMPOTENCY_TTL: float = Field(86400.0, description="Seconds a /submit response is replayed to retries carrying the same Idempotency-Key")
+    IDEMPOTENCY_PRUNE_INTERVAL: float = Field(600.0, description="Seconds between bulk deletes of expired Idempotency-Key responses (0 disables)")
     RDS_HOST: str = Field("localhost", description="Database host")
     RDS_PORT: int = Field(3306, description="Database port")
     RDS_DB_NAME: str = Field("hackathon", description="Database name")
     RDS_USERNAME: str = Field("root", description="Database username")
     RDS_PASSWORD: str = Field("password", description="Database password")
     DB_DRIVER: str = Field("mysql+pymysql", description="SQLAlchemy database driver")
+    DATABASE_URL_OVERRIDE: Optional[str] = Field(
+        None,
+        validation_alias="DATABASE_URL",
+        description="Full SQLAlchemy URL; when set it replaces the RDS_* settings"
+    )
+    DB_ECHO: bool = Field(False, description="Log every SQL statement (debugging only; slows the hot path)")
+    DB_POOL_SIZE: int = Field(20, description="Connections kept open per engine (one sync engine per process, plus the async one with DB_ASYNC)")
+    DB_MAX_OVERFLOW: int = Field(10, description="Extra connections opened beyond DB_POOL_SIZE under load")
+    DB_POOL_TIMEOUT: float = Field(30.0, description="Seconds to wait for a pooled connection before failing")
+    DB_POOL_RECYCLE: int = Field(3600, description="Seconds after which pooled connections are replaced")
+    DB_POOL_PRE_PING: bool = Field(True, description="Check connections for liveness on checkout")
+    DB_CONNECT_TIMEOUT: int = Field(5, description="Seconds to wait when opening a database connection (not SQLite)")
+    DB_STATEMENT_CACHE_SIZE: int = Field(1000, description="Compiled SQL statements cached per engine")
+    DB_CREATE_SCHEMA: bool = Field(True, description="Create missing tables at startup; turn off once the schema is managed with `alembic upgrade head`")
+    DB_REPLICA_URLS: str = Field("", description="Comma-separated read replica URLs for leaderboard, team-metrics and WebSocket reads (empty: all reads use the primary)")
+    DB_REPLICA_MAX_LAG: float = Field(2.0, description="Seconds a replica may trail the primary: a team's reads stay on the primary this long after it writes, and leaderboard snapshots younger than this are not cached")
+    DB_REPLICA_RETRY_INTERVAL: float = Field(10.0, description="Seconds a replica that failed a read is skipped before it is tried again")
+    DB_ASYNC: bool = Field(False, description="Serve /submit, /scores and /team-metrics through the async engine")
+    ASYNC_DB_DRIVER: Optional[str] = Field(None, description="Async SQLAlchemy driver (default derived from the sync one, e.g. mysql+aiomysql)")
+    WS_CLIENT_QUEUE_SIZE: int = Field(100, description="Max queued messages per WebSocket viewer before it is disconnected")
+    WS_SEND_TIMEOUT: float = Field(5.0, description="Seconds a single WebSocket send may take before the viewer is dropped")
+    WS_BROADCAST_DEBOUNCE: float = Field(0.1, description="Seconds of score events folded into one WebSocket update")
+    WS_RESYNC_INTERVAL: float = Field(30.0, description="Seconds between leaderboard resyncs from the database while viewers are connected (0 disables)")
+    LEADERBOARD_CACHE_BACKEND: str = Field("memory", description="Leaderboard cache backend: memory (single worker), sqlite (shared across workers) or none")
+    LEADERBOARD_CACHE_SIZE: int = Field(1024, description="Responses held by the leaderboard cache (memory: least recently used dropped first; sqlite: oldest written dropped first, all dropped on a bump)")
+    LEADERBOARD_CACHE_PATH: str = Field("/tmp/leaderboard-cache.db", description="SQLite file used by the sqlite leaderboard cache backend")
+    METRICS_ENABLED: bool = Field(True, description="Record request/DB/scoring/WebSocket metrics and serve them at /metrics")
+    ADMISSION_ENABLED: bool = Field(True, description="Turn /api requests away with 429/503 + Retry-After when the limits below are hit")
+    ADMISSION_SUBMIT_RATE: float = Field(200.0, description="Submits per second admitted per process across all teams (0 = unlimited)")
+    ADMISSION_READ_RATE: float = Field(2000.0, description="Leaderboard/team-metrics/status reads per second admitted per process (0 = unlimited)")
+    ADMISSION_BURST_SECONDS: float = Field(1.0, description="Seconds of ADMISSION_SUBMIT_RATE/ADMISSION_READ_RATE that may arrive at once")
+    ADMISSION_TEAM_RATE: float = Field(2.0, description="Submits per second per team key (0 = unlimited); reads such as /api/scores polling aren't charged")
+    ADMISSION_TEAM_BURST: float = Field(10.0, description="Submits a team may send at once before ADMISSION_TEAM_RATE applies")
+    ADMISSION_SUBMIT_CONCURRENCY: int = Field(20, description="Submits in progress per process (0 = unlimited)")
+    ADMISSION_READ_CONCURRENCY: int = Field(10, description="Reads in progress per process (0 = unlimited); keep it plus ADMISSION_SUBMIT_CONCURRENCY within DB_POOL_SIZE + DB_MAX_OVERFLOW so reads can't starve submits of connections")
+    ADMISSION_POOL_WAIT_THRESHOLD: float = Field(0.5, description="Seconds a pool checkout may wait before new /api requests are shed with 503 (0 disables)")
+    ADMISSION_RETRY_AFTER: float = Field(1.0, description="Retry-After seconds sent when shedding for pool wait or concurrency; also how long shedding lasts after a slow checkout")
     
     @property
     def DATABASE_URL(self) -> str:
+        if self.DATABASE_URL_OVERRIDE:
+            return self.DATABASE_URL_OVERRIDE
         # URL-encode password if it contains special characters
         from urllib.parse import quote_plus
         password = quote_plus(self.RDS_PASSWORD)
         return f"{self.DB_DRIVER}://{self.RDS_USERNAME}:{password}@{self.RDS_HOST}:{self.RDS_PORT}/{self.RDS_DB_NAME}?charset=utf8mb4"
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return self.async_url(self.DATABASE_URL)
+
+    @property
+    def REPLICA_URLS(self) -> List[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
+    def async_url(self, url: str) -> str:
+        """`url` with its driver swapped for the async counterpart"""
+        scheme, rest = url.split("://", 1)
+        driver = self.ASYNC_DB_DRIVER or ASYNC_DRIVERS.get(scheme, scheme)
+        return f"{driver}://{rest}"
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
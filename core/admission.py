@@ -0,0 +1,276 @@
+"""
+Admission control for the /api routes.
+
+Requests are admitted or turned away before they reach a handler (and
+before they wait for a database connection), so an overload shows up as
+quick 429/503 responses with Retry-After instead of every request queueing
+on the pool until DB_POOL_TIMEOUT:
+
+  * pool pressure: while a checkout has waited longer than
+    ADMISSION_POOL_WAIT_THRESHOLD (or did within the last Retry-After
+    seconds), new requests get 503
+  * concurrency: submits and reads have separate in-flight limits, so
+    leaderboard refreshes can't take the connections submits need (503)
+  * per-team token bucket on submits carrying a team key (429); reads
+    aren't charged, so a dashboard polling /api/scores with its key can't
+    use up the team's submits
+  * global token bucket per route class (503)
+
+Checks run in that order. A rejected request consumes no tokens: the
+buckets after the one that rejected it aren't charged, and a team token
+taken before a global rejection is given back. Limits are per process.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from core.auth import hash_team_key
+from core.codec import encode_json
+
+import logging
+logger = logging.getLogger(__name__)
+
+SUBMIT = "submit"
+READ = "read"
+
+# Path prefix -> route class; the first match wins, unmatched paths aren't limited
+ROUTE_CLASSES = (
+    ("/api/admin", None),
+    ("/api/submit", SUBMIT),
+    ("/api/", READ),
+)
+
+
+def route_class(path: str) -> Optional[str]:
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return None
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`; a rate of 0 means unlimited"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """0.0 if a token was taken, otherwise seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        """Give back a token taken by a request that was rejected later on"""
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+
+class TeamBuckets:
+    """Token bucket per team key, for the `max_size` most recently seen teams"""
+
+    def __init__(self, rate: float, burst: float, max_size: int = 4096):
+        self.rate = rate
+        self.burst = burst
+        self.max_size = max_size
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, team_key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        digest = hash_team_key(team_key)
+        bucket = self._buckets.get(digest)
+        if bucket is None:
+            bucket = self._buckets[digest] = TokenBucket(self.rate, self.burst)
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(digest)
+        return bucket.take()
+
+    def refund(self, team_key: str):
+        bucket = self._buckets.get(hash_team_key(team_key))
+        if bucket is not None:
+            bucket.refund()
+
+
+class PoolWaitMonitor:
+    """
+    Watches pool checkouts on the instrumented engines, through their
+    db.engine.CheckoutTimer. Overloaded while a checkout in progress has
+    waited longer than `threshold`, and for `hold` seconds after one that
+    did completes.
+    """
+
+    def __init__(self, threshold: float, hold: float):
+        self.threshold = threshold
+        self.hold = hold
+        self.slow_checkouts = 0
+        self._slow_until = 0.0
+        self._lock = threading.Lock()
+        self._timers = []
+
+    def instrument(self, engine):
+        """Watch the checkouts of a sync Engine (engine.sync_engine for an AsyncEngine)"""
+        from db.engine import checkout_timer
+        timer = checkout_timer(engine)
+        if self.threshold <= 0 or timer in self._timers:
+            return
+        self._timers.append(timer)
+        timer.listeners.append(self._checked_out)
+
+    def _checked_out(self, wait: float):
+        if wait > self.threshold:
+            with self._lock:
+                self.slow_checkouts += 1
+                self._slow_until = time.monotonic() + self.hold
+
+    def overloaded(self) -> bool:
+        if time.monotonic() < self._slow_until:
+            return True
+        return any(timer.oldest_wait() > self.threshold for timer in self._timers)
+
+
+class AdmissionController:
+    """The limits of one process and the counts of what they turned away"""
+
+    def __init__(self, enabled: bool = True, submit_rate: float = 0.0, read_rate: float = 0.0,
+                 burst_seconds: float = 1.0, team_rate: float = 0.0, team_burst: float = 10.0,
+                 submit_concurrency: int = 0, read_concurrency: int = 0,
+                 pool_wait_threshold: float = 0.0, retry_after: float = 1.0):
+        self.enabled = enabled
+        self.retry_after = retry_after
+        self.buckets = {
+            SUBMIT: TokenBucket(submit_rate, submit_rate * burst_seconds),
+            READ: TokenBucket(read_rate, read_rate * burst_seconds),
+        }
+        self.team_buckets = TeamBuckets(team_rate, team_burst)
+        self.concurrency = {SUBMIT: submit_concurrency, READ: read_concurrency}
+        self.in_flight = {SUBMIT: 0, READ: 0}
+        self.pool = PoolWaitMonitor(pool_wait_threshold, hold=retry_after)
+        self.admitted = {SUBMIT: 0, READ: 0}
+        self.rejected: Dict[tuple, int] = {}  # (route class, reason) -> count
+
+    def admit(self, route: str, team_key: Optional[str]) -> Optional[tuple]:
+        """
+        None if the request may proceed (release() it when done), else
+        (status, detail, retry after seconds). Called from the event loop
+        only, so the counters need no lock.
+        """
+        if self.pool.overloaded():
+            return self._reject(route, "pool_wait", 503, "Database is overloaded", self.retry_after)
+        limit = self.concurrency[route]
+        if limit and self.in_flight[route] >= limit:
+            return self._reject(route, "concurrency", 503, "Too many requests in progress", self.retry_after)
+        charge_team = bool(team_key) and route == SUBMIT
+        if charge_team:
+            wait = self.team_buckets.take(team_key)
+            if wait:
+                return self._reject(route, "team_rate", 429, "Too many requests for this team", wait)
+        wait = self.buckets[route].take()
+        if wait:
+            if charge_team:
+                self.team_buckets.refund(team_key)
+            return self._reject(route, "global_rate", 503, "Server is at capacity", wait)
+        self.in_flight[route] += 1
+        self.admitted[route] += 1
+        return None
+
+    def release(self, route: str):
+        self.in_flight[route] -= 1
+
+    def _reject(self, route: str, reason: str, status: int, detail: str, retry_after: float) -> tuple:
+        key = (route, reason)
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+        return status, f"{detail}. Please retry later.", retry_after
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pool_overloaded": self.pool.overloaded(),
+            "slow_checkouts": self.pool.slow_checkouts,
+            "routes": {
+                route: {
+                    "in_flight": self.in_flight[route],
+                    "max_in_flight": self.concurrency[route],
+                    "admitted": self.admitted[route],
+                    "rejected": {
+                        reason: count for (name, reason), count in self.rejected.items() if name == route
+                    },
+                }
+                for route in (SUBMIT, READ)
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """Plain ASGI middleware applying an AdmissionController to /api requests"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        route = route_class(scope["path"]) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        team_key = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                team_key = value.decode("latin-1")
+                break
+        rejection = self.controller.admit(route, team_key)
+        if rejection is not None:
+            await self._reject(send, *rejection)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route)
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str, retry_after: float):
+        body = encode_json({"detail": detail})
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_admission_controller() -> AdmissionController:
+    from config import settings
+    return AdmissionController(
+        enabled=settings.ADMISSION_ENABLED,
+        submit_rate=settings.ADMISSION_SUBMIT_RATE,
+        read_rate=settings.ADMISSION_READ_RATE,
+        burst_seconds=settings.ADMISSION_BURST_SECONDS,
+        team_rate=settings.ADMISSION_TEAM_RATE,
+        team_burst=settings.ADMISSION_TEAM_BURST,
+        submit_concurrency=settings.ADMISSION_SUBMIT_CONCURRENCY,
+        read_concurrency=settings.ADMISSION_READ_CONCURRENCY,
+        pool_wait_threshold=settings.ADMISSION_POOL_WAIT_THRESHOLD,
+        retry_after=settings.ADMISSION_RETRY_AFTER,
+    )
+
+
+admission = create_admission_controller()
@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def hash_team_key(team_key: str) -> str:
+    """Digest used in place of the raw key in caches"""
+    return hashlib.sha256(team_key.encode()).hexdigest()
+
+
+def mask_team_key(team_key: str) -> str:
+    """Loggable form of a team key: prefix plus the first few characters"""
+    return f"{team_key[:7]}..." if len(team_key) > 7 else "***"
+
+
+class TeamKeyCache:
+    """
+    Bounded LRU/TTL cache of hashed team keys.
+
+    Valid keys are remembered for `ttl` seconds and invalid ones for
+    `negative_ttl`, so repeated bad keys are rejected without a query. A
+    valid key also keeps the team's submission count as of its last quota
+    reservation, so a team already at its limit can be turned away before
+    its submission is scored. A refunded slot (a queued submission that
+    failed) lowers the real count: the worker that refunds it forgets the
+    key, other processes hold their count until it expires. Keys
+    not in the cache consume from a token bucket of `invalid_lookups_per_sec`
+    once they turn out to be invalid; while it is empty, unknown keys are
+    refused before reaching the database.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0, negative_ttl: float = 60.0,
+                 invalid_lookups_per_sec: float = 20.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.invalid_lookups_per_sec = invalid_lookups_per_sec
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # digest -> (valid, expires_at, used)
+        self._lock = threading.Lock()
+        self._tokens = invalid_lookups_per_sec
+        self._refilled_at = time.monotonic()
+
+    def lookup(self, team_key: str) -> Optional[bool]:
+        """True/False if the key's validity is cached, None if unknown"""
+        entry = self._get(team_key)
+        return None if entry is None else entry[0]
+
+    def submissions_used(self, team_key: str) -> int:
+        """The team's submission count at its last reservation, 0 if not cached"""
+        entry = self._get(team_key)
+        return 0 if entry is None else entry[2]
+
+    def _get(self, team_key: str) -> Optional[tuple]:
+        digest = hash_team_key(team_key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[1] < now:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry
+
+    def allow_unknown(self) -> bool:
+        """Whether an uncached key may be checked against the database right now"""
+        with self._lock:
+            self._refill()
+            return self._tokens >= 1
+
+    def remember(self, team_key: str, valid: bool, used: int = 0):
+        digest = hash_team_key(team_key)
+        expires_at = time.monotonic() + (self.ttl if valid else self.negative_ttl)
+        with self._lock:
+            if not valid:
+                self._refill()
+                self._tokens = max(0.0, self._tokens - 1)
+            self._entries[digest] = (valid, expires_at, used)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def forget(self, team_key: str):
+        with self._lock:
+            self._entries.pop(hash_team_key(team_key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.invalid_lookups_per_sec,
+            self._tokens + (now - self._refilled_at) * self.invalid_lookups_per_sec
+        )
+        self._refilled_at = now
+
+
+def create_team_key_cache() -> TeamKeyCache:
+    from config import settings
+    return TeamKeyCache(
+        max_size=settings.AUTH_CACHE_SIZE,
+        ttl=settings.AUTH_CACHE_TTL,
+        negative_ttl=settings.AUTH_NEGATIVE_TTL,
+        invalid_lookups_per_sec=settings.AUTH_INVALID_LOOKUPS_PER_SEC,
+    )
+
+
+team_key_cache = create_team_key_cache()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Optional
+from fastapi import WebSocket
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Message types where only the newest one matters; queued copies are replaced
+COALESCED_TYPES = {"scores_update"}
+
+
+class ClientQueue:
+    """Outgoing messages for one WebSocket, drained by its own writer task"""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, channel: str):
+        self.websocket = websocket
+        self.channel = channel
+        self.max_queue = max_queue
+        self.messages: deque = deque()
+        self.latest: Dict[str, str] = {}  # coalescing key -> newest serialized message
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self.messages) + len(self.latest)
+
+    def push(self, text: str, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a message without waiting; False if the client is too far behind"""
+        if coalesce_key is not None:
+            self.latest[coalesce_key] = text
+        elif len(self.messages) >= self.max_queue:
+            return False
+        else:
+            self.messages.append(text)
+        self.wakeup.set()
+        return True
+
+    def pop(self) -> Optional[str]:
+        if self.messages:
+            return self.messages.popleft()
+        if self.latest:
+            return self.latest.pop(next(iter(self.latest)))
+        return None
+
+
+class Broadcaster:
+    """
+    Fan-out of server messages to WebSocket viewers.
+
+    broadcast() serializes a message once and drops it into every client's
+    bounded queue without awaiting any socket, so a slow or dead viewer
+    never delays the others (or the submit path). Each connection has a
+    writer task; clients whose queue overflows or whose send exceeds
+    `send_timeout` are disconnected.
+    """
+
+    def __init__(self, max_queue: int = 100, send_timeout: float = 5.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.clients: Dict[WebSocket, ClientQueue] = {}
+        self.dropped_clients = 0
+
+    async def connect(self, websocket: WebSocket, channel: str = "default"):
+        await websocket.accept()
+        client = ClientQueue(websocket, self.max_queue, channel)
+        client.task = asyncio.create_task(self._drain(client))
+        self.clients[websocket] = client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client and client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    async def broadcast(self, message: dict):
+        self.publish(message)
+
+    def publish(self, message: dict, channel: Optional[str] = None, text: Optional[str] = None):
+        """Serialize once and enqueue for every connected client (on `channel`, if given)"""
+        if not self.clients:
+            return
+        if text is None:
+            text = json.dumps(message)
+        coalesce_key = message.get("type") if message.get("type") in COALESCED_TYPES else None
+        for websocket, client in list(self.clients.items()):
+            if channel is not None and client.channel != channel:
+                continue
+            if not client.push(text, coalesce_key):
+                logger.warning("Disconnecting WebSocket client that fell behind", extra={"queue_depth": client.depth})
+                self._drop(client, code=1013)
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for a single client, in order with later broadcasts"""
+        client = self.clients.get(websocket)
+        if client and not client.push(json.dumps(message)):
+            self._drop(client, code=1013)
+
+    def stats(self) -> dict:
+        depths = [client.depth for client in self.clients.values()]
+        return {
+            "connections": len(depths),
+            "queue_depth": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_clients": self.dropped_clients,
+        }
+
+    async def close(self):
+        for websocket in list(self.clients):
+            self.disconnect(websocket)
+
+    async def _drain(self, client: ClientQueue):
+        try:
+            while True:
+                await client.wakeup.wait()
+                client.wakeup.clear()
+                text = client.pop()
+                while text is not None:
+                    await asyncio.wait_for(client.websocket.send_text(text), self.send_timeout)
+                    text = client.pop()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning("Disconnecting WebSocket client after send timeout")
+            self._drop(client, code=1013)
+        except Exception as e:
+            logger.info(f"WebSocket send failed, dropping client: {e}")
+            self._drop(client)
+
+    def _drop(self, client: ClientQueue, code: int = 1011):
+        if self.clients.get(client.websocket) is not client:
+            return
+        self.dropped_clients += 1
+        self.disconnect(client.websocket)
+        asyncio.ensure_future(self._close_quietly(client.websocket, code))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+
+def create_broadcaster() -> Broadcaster:
+    from config import settings
+    return Broadcaster(max_queue=settings.WS_CLIENT_QUEUE_SIZE, send_timeout=settings.WS_SEND_TIMEOUT)
@@ -0,0 +1,321 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from core.codec import encode_json
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """A pre-serialized JSON body tied to the leaderboard version it was built from"""
+
+    __slots__ = ("version", "body", "etag", "last_modified")
+
+    def __init__(self, version: int, body: bytes, last_modified: float):
+        self.version = version
+        self.body = body
+        self.etag = f'"{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+        self.last_modified = last_modified
+
+
+class CacheBackend:
+    """Storage for leaderboard snapshots and the version counter that invalidates them"""
+
+    # Whether calls do I/O; async handlers then make them from the threadpool
+    blocking = False
+
+    def current_version(self) -> Tuple[int, float]:
+        """(version, unix time of the last bump)"""
+        raise NotImplementedError
+
+    def bump(self) -> int:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CachedResponse):
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """
+    Per-process cache; correct only when a single worker serves all writes.
+    Holds the `max_size` most recently used snapshots, since keys include
+    client-chosen query values (cursor, since, limit).
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._version = 0
+        self._modified = time.time()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def current_version(self) -> Tuple[int, float]:
+        return self._version, self._modified
+
+    def bump(self) -> int:
+        with self._lock:
+            self._version += 1
+            self._modified = time.time()
+            self._entries.clear()
+            return self._version
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CachedResponse):
+        with self._lock:
+            if entry.version == self._version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+
+class NullBackend(CacheBackend):
+    """Never stores anything; every request is built from the database"""
+
+    def current_version(self) -> Tuple[int, float]:
+        return 0, time.time()
+
+    def bump(self) -> int:
+        return 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return None
+
+    def set(self, key: str, entry: CachedResponse):
+        pass
+
+
+class SharedStore:
+    """Minimal key/value interface a multi-worker store has to provide"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes):
+        raise NotImplementedError
+
+    def incr(self, key: str) -> Tuple[int, float]:
+        """
+        Atomically increment a counter stored as b"<value>:<unix time>" and
+        stamp it with the current time; returns the new (value, time)
+        """
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str):
+        """Delete every key starting with `prefix`"""
+        raise NotImplementedError
+
+    def trim(self, prefix: str, max_keys: int):
+        """Delete the least recently written keys starting with `prefix` beyond the newest `max_keys`"""
+        raise NotImplementedError
+
+
+class SQLiteStore(SharedStore):
+    """Local stand-in for a shared store: one SQLite file shared by all workers on a host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v BLOB)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT v FROM kv WHERE k = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes):
+        self._conn().execute("INSERT OR REPLACE INTO kv (k, v) VALUES (?, ?)", (key, value))
+
+    def incr(self, key: str) -> Tuple[int, float]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT v FROM kv WHERE k = ?", (key,)).fetchone()
+            value = int(bytes(row[0]).split(b":", 1)[0]) + 1 if row else 1
+            now = time.time()
+            conn.execute("INSERT OR REPLACE INTO kv (k, v) VALUES (?, ?)", (key, f"{value}:{now}".encode()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value, now
+
+    def delete_prefix(self, prefix: str):
+        # A range over the primary key rather than LIKE, so the index is used
+        self._conn().execute("DELETE FROM kv WHERE k >= ? AND k < ?", (prefix, prefix + "\uffff"))
+
+    def trim(self, prefix: str, max_keys: int):
+        # INSERT OR REPLACE gives a rewritten key a new, higher rowid
+        self._conn().execute(
+            "DELETE FROM kv WHERE rowid IN (SELECT rowid FROM kv WHERE k >= ? AND k < ?"
+            " ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+            (prefix, prefix + "\uffff", max_keys)
+        )
+
+
+class SharedStoreBackend(CacheBackend):
+    """
+    Cache whose version counter and snapshots live in a SharedStore, so
+    every worker sees a bump. The counter row carries its own timestamp,
+    so the version readers see can never go backwards. Keys include
+    client-chosen query values, so a bump deletes the snapshots it
+    supersedes and at most `max_entries` are kept between bumps.
+    """
+
+    blocking = True
+    VERSION_KEY = "leaderboard:version"
+    ENTRY_PREFIX = "leaderboard:entry:"
+
+    def __init__(self, store: SharedStore, max_entries: int = 1024):
+        self.store = store
+        self.max_entries = max_entries
+
+    def current_version(self) -> Tuple[int, float]:
+        raw = self.store.get(self.VERSION_KEY)
+        if not raw:
+            return 0, 0.0
+        version, _, modified = bytes(raw).decode().partition(":")
+        return int(version), float(modified or 0.0)
+
+    def bump(self) -> int:
+        version, _ = self.store.incr(self.VERSION_KEY)
+        self.store.delete_prefix(self.ENTRY_PREFIX)
+        return version
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raw = self.store.get(self.ENTRY_PREFIX + key)
+        if not raw:
+            return None
+        header, body = raw.split(b"\n", 1)
+        version, modified = header.decode().split(":")
+        return CachedResponse(int(version), body, float(modified))
+
+    def set(self, key: str, entry: CachedResponse):
+        header = f"{entry.version}:{entry.last_modified}".encode()
+        self.store.set(self.ENTRY_PREFIX + key, header + b"\n" + entry.body)
+        self.store.trim(self.ENTRY_PREFIX, self.max_entries)
+
+
+class LeaderboardCache:
+    """Versioned snapshots of read-heavy responses, invalidated on every committed submit"""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def invalidate(self):
+        try:
+            version = self.backend.bump()
+            logger.debug("Leaderboard cache version bumped to %s", version)
+        except Exception as e:
+            logger.error(f"Failed to invalidate leaderboard cache: {e}")
+
+    async def invalidate_async(self):
+        if self.backend.blocking:
+            await run_in_threadpool(self.invalidate)
+        else:
+            self.invalidate()
+
+    def respond(self, request: Request, key: str, build: Callable[[], Any], max_lag: float = 0.0) -> Response:
+        """
+        Serve `key` from cache (or 304), building and storing it on a miss.
+        `max_lag` is how far the data `build` reads may trail the last
+        write (a replica); an entry built sooner than that after the last
+        bump is served but not stored, so a lagging read can't outlive it.
+        """
+        version, modified, entry = self._lookup(key)
+        if entry is None:
+            entry = self._store(key, version, modified, build(), max_lag)
+        return self._response(request, entry)
+
+    async def respond_async(self, request: Request, key: str, build: Callable[[], Awaitable[Any]],
+                            max_lag: float = 0.0) -> Response:
+        """respond() for an async builder"""
+        blocking = self.backend.blocking
+        version, modified, entry = await run_in_threadpool(self._lookup, key) if blocking else self._lookup(key)
+        if entry is None:
+            content = await build()
+            if blocking:
+                entry = await run_in_threadpool(self._store, key, version, modified, content, max_lag)
+            else:
+                entry = self._store(key, version, modified, content, max_lag)
+        return self._response(request, entry)
+
+    def _lookup(self, key: str) -> Tuple[int, float, Optional[CachedResponse]]:
+        version, modified = self.backend.current_version()
+        entry = self.backend.get(key)
+        if entry is not None and entry.version != version:
+            entry = None
+        return version, modified, entry
+
+    def _store(self, key: str, version: int, modified: float, content: Any, max_lag: float = 0.0) -> CachedResponse:
+        # Tag the entry with the version read *before* building, so a
+        # submit landing mid-build leaves it stale rather than wrong
+        entry = CachedResponse(version, encode_json(content), modified or time.time())
+        if not max_lag or time.time() - entry.last_modified >= max_lag:
+            self.backend.set(key, entry)
+        return entry
+
+    def _response(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {
+            "ETag": entry.etag,
+            "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if self._not_modified(request, entry):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    @staticmethod
+    def _not_modified(request: Request, entry: CachedResponse) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [t.strip() for t in if_none_match.split(",")]
+            return "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(entry.last_modified) <= since
+        return False
+
+
+def create_cache() -> LeaderboardCache:
+    from config import settings
+    if settings.LEADERBOARD_CACHE_BACKEND == "sqlite":
+        backend = SharedStoreBackend(
+            SQLiteStore(settings.LEADERBOARD_CACHE_PATH), max_entries=settings.LEADERBOARD_CACHE_SIZE
+        )
+    elif settings.LEADERBOARD_CACHE_BACKEND == "none":
+        backend = NullBackend()
+    else:
+        backend = InMemoryBackend(max_size=settings.LEADERBOARD_CACHE_SIZE)
+    return LeaderboardCache(backend)
+
+
+leaderboard_cache = create_cache()
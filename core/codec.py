@@ -0,0 +1,47 @@
+"""
+JSON encoding for responses, cached snapshots and stored payloads.
+
+Uses orjson when it is installed and the standard library otherwise; both
+produce the same compact UTF-8 output. Content orjson can't encode (e.g.
+non-string dict keys) falls back to the standard library, so the choice of
+backend never changes whether a response succeeds.
+"""
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def _encode_stdlib(content: Any) -> bytes:
+    """Serialize the way fastapi.responses.JSONResponse does"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+if orjson is not None:
+    def encode_json(content: Any) -> bytes:
+        try:
+            return orjson.dumps(content)
+        except TypeError:
+            return _encode_stdlib(content)
+
+    decode_json = orjson.loads
+else:
+    encode_json = _encode_stdlib
+    decode_json = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with encode_json; the app's default response class"""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
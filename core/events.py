@@ -0,0 +1,76 @@
+import asyncio
+from typing import List, NamedTuple, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ScoreEvent(NamedTuple):
+    """A committed submission; team_key None asks consumers for a full resync"""
+    team_key: Optional[str]
+    score: Optional[float] = None
+    timestamp: Optional[str] = None
+
+
+class EventBus:
+    """
+    In-process queue of score events between request handlers and the
+    WebSocket broadcaster task.
+
+    publish() is safe to call from sync handlers running in the threadpool
+    as well as from the event loop. Events published before start() (or
+    after stop()) are dropped, since nobody would consume them.
+    """
+
+    def __init__(self, max_pending: int = 10000):
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+
+    def stop(self):
+        self._loop = None
+
+    def publish(self, event: ScoreEvent):
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._put(event)
+        else:
+            loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: ScoreEvent):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Consumers resync from the database when they see this
+            logger.warning("Score event queue full, requesting resync")
+            self._queue.get_nowait()
+            self._queue.put_nowait(ScoreEvent(team_key=None))
+
+    async def next_batch(self, debounce: float, timeout: Optional[float] = None) -> List[ScoreEvent]:
+        """
+        Wait for an event, then collect everything else published within
+        `debounce` seconds. Returns an empty list if nothing arrives within
+        `timeout`.
+        """
+        try:
+            batch = [await asyncio.wait_for(self._queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        if debounce > 0:
+            await asyncio.sleep(debounce)
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+
+score_events = EventBus()
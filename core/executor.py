@@ -0,0 +1,246 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+SCORING_MODES = ("inline", "thread", "process")
+
+
+class ScoringBusy(Exception):
+    """The scoring queue is full"""
+
+
+class ScoringTimeout(Exception):
+    """A scoring call did not finish within the timeout"""
+
+
+def _warm_worker():
+    """Process pool initializer: compile the reference before the first submission arrives"""
+    from core.scoring import get_reference
+    get_reference()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _timed_call(fn: Callable, args: tuple, submitted_at: float) -> Tuple[Any, float, float]:
+    """Run fn in a worker; returns (result, seconds queued, seconds executing)"""
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+class Timing:
+    """Count, total and max of one duration, cheap enough to update on every call"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_sec": round(self.total / self.count, 6) if self.count else 0.0,
+            "max_sec": round(self.max, 6),
+            "total_sec": round(self.total, 6),
+        }
+
+
+class ScoringExecutor:
+    """
+    Where scoring runs: inline on the calling thread, on a thread pool, or
+    on a pool of warm worker processes that compile the reference once at
+    startup.
+
+    At most `max_pending` calls may be queued or running; beyond that
+    ScoringBusy is raised instead of piling up work. A call not done within
+    `timeout`, queue wait included, raises ScoringTimeout (pool modes
+    only; the worker still finishes it in the background and it keeps its
+    queue slot until then). Queue wait and execution time are recorded per call and
+    reported by stats().
+    """
+
+    def __init__(self, mode: str = "inline", workers: Optional[int] = None,
+                 timeout: float = 5.0, max_pending: int = 64):
+        if mode not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode {mode!r}, expected one of {SCORING_MODES}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._pool: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.queue_wait = Timing()
+        self.execution = Timing()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def start(self):
+        """Create the pool and warm every worker; called from the app lifespan (or lazily)"""
+        with self._lock:
+            if self._pool is not None or self.mode == "inline":
+                return
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="scoring")
+                return
+            # Only process mode pays for importing multiprocessing (~15ms at startup)
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        pids = {f.result() for f in [self._pool.submit(_ping) for _ in range(self.workers)]}
+        logger.info(f"Scoring process pool ready with {len(pids)} warm workers")
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """Call fn(*args) according to the mode and wait for the result"""
+        if self.mode == "inline":
+            return self._run_inline(fn, args)
+        future = self._submit(fn, args)
+        try:
+            return future.result(timeout or self.timeout)[0]
+        except FutureTimeout:
+            self._timed_out()
+
+    async def run_async(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """run() without blocking the event loop (except in inline mode)"""
+        if self.mode == "inline":
+            return self._run_inline(fn, args)
+        future = self._submit(fn, args)
+        try:
+            return (await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout or self.timeout
+            ))[0]
+        except asyncio.TimeoutError:
+            self._timed_out()
+
+    def score(self, metrics: Dict, digest: Optional[str] = None) -> float:
+        """
+        Score one submission. With the payload digest, a score cached for
+        the same metrics and reference is returned without scoring again.
+        """
+        from core.scoring import calculate_score, calculate_score_with_digest
+        from core.score_cache import score_cache
+        if digest is None or not score_cache.enabled:
+            return self.run(calculate_score, metrics)
+        score = score_cache.lookup(digest)
+        if score is None:
+            score, reference = self.run(calculate_score_with_digest, metrics)
+            score_cache.store(digest, score, reference)
+        return score
+
+    async def score_async(self, metrics: Dict, digest: Optional[str] = None) -> float:
+        from core.scoring import calculate_score, calculate_score_with_digest
+        from core.score_cache import score_cache
+        if digest is None or not score_cache.enabled:
+            return await self.run_async(calculate_score, metrics)
+        score = score_cache.lookup(digest)
+        if score is None:
+            score, reference = await self.run_async(calculate_score_with_digest, metrics)
+            score_cache.store(digest, score, reference)
+        return score
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": 1 if self.mode == "inline" else self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.as_dict(),
+            "execution": self.execution.as_dict(),
+        }
+
+    def _run_inline(self, fn: Callable, args: tuple):
+        started_at = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.completed += 1
+            self.queue_wait.observe(0.0)
+            self.execution.observe(time.perf_counter() - started_at)
+        return result
+
+    def _submit(self, fn: Callable, args: tuple) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ScoringBusy()
+        if self._pool is None:
+            self.start()
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self._pool.submit(_timed_call, fn, args, time.time())
+        except Exception:
+            self._finished(None)
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Optional[Future]):
+        self._slots.release()
+        with self._lock:
+            self.pending -= 1
+            if future is None or future.cancelled():
+                return
+            if future.exception() is not None:
+                self.failed += 1
+                return
+            _, waited, elapsed = future.result()
+            self.completed += 1
+            self.queue_wait.observe(max(waited, 0.0))
+            self.execution.observe(elapsed)
+
+    def _timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+        raise ScoringTimeout()
+
+
+def create_scoring_executor() -> ScoringExecutor:
+    from config import settings
+    return ScoringExecutor(
+        mode=settings.SCORING_MODE,
+        workers=settings.SCORING_WORKERS,
+        timeout=settings.SCORING_TIMEOUT,
+        max_pending=settings.SCORING_MAX_PENDING,
+    )
+
+
+scoring_executor = create_scoring_executor()
@@ -0,0 +1,180 @@
+"""
+Idempotency-Key support for /api/submit.
+
+A client retrying a submission with the same Idempotency-Key gets the
+first attempt's response back, without a second Submission row, quota slot
+or broadcast. The response is written to idempotency_keys in the same
+transaction as the submission, so it exists exactly when the submission
+does, whichever worker process the retry lands on. Keys are scoped to the
+team and honoured for IDEMPOTENCY_TTL seconds; expired rows are deleted
+in bulk every IDEMPOTENCY_PRUNE_INTERVAL seconds, since most keys are never
+seen again. Reusing a key with a different body is rejected with 422.
+Failed requests store nothing and may be retried with the same key.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy import delete, select
+from models.submissions import IdempotencyKey
+from db import SessionLocal
+
+import logging
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStats:
+    """What keyed submits turned into: replays, fresh requests, key reuse with another body, lost races"""
+
+    def __init__(self):
+        self.replayed = 0
+        self.misses = 0
+        self.mismatched = 0
+        self.conflicts = 0
+        self.pruned = 0
+
+    def stats(self) -> dict:
+        return {
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "mismatched": self.mismatched,
+            "conflicts": self.conflicts,
+            "pruned": self.pruned,
+        }
+
+
+idempotency_stats = IdempotencyStats()
+
+
+class IdempotentRequest:
+    """A team's Idempotency-Key and the body it came with"""
+
+    def __init__(self, team_key: str, key: str, body: bytes, ttl: float):
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"
+            )
+        self.team_key = team_key
+        self.key = key
+        self.request_hash = hashlib.sha256(body).hexdigest()
+        self.ttl = ttl
+
+    def _where(self, stmt):
+        return stmt\
+            .where(IdempotencyKey.team_key == self.team_key)\
+            .where(IdempotencyKey.idempotency_key == self.key)
+
+    @staticmethod
+    def _expired(record: IdempotencyKey) -> bool:
+        return record.expires_at < datetime.now()
+
+    def _replay(self, record: Optional[IdempotencyKey]) -> Optional[Response]:
+        if record is None:
+            idempotency_stats.misses += 1
+            return None
+        if record.request_hash != self.request_hash:
+            idempotency_stats.mismatched += 1
+            raise HTTPException(
+                status_code=422,
+                detail=f"{IDEMPOTENCY_HEADER} was already used for a different submission"
+            )
+        idempotency_stats.replayed += 1
+        return Response(
+            content=record.response,
+            status_code=record.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+    def find(self, db) -> Optional[Response]:
+        """The stored response to replay, or None if the request should run"""
+        record = db.execute(self._where(select(IdempotencyKey))).scalar_one_or_none()
+        if record is not None and self._expired(record):
+            db.execute(self._where(delete(IdempotencyKey)))
+            record = None
+        return self._replay(record)
+
+    async def find_async(self, db) -> Optional[Response]:
+        record = (await db.execute(self._where(select(IdempotencyKey)))).scalar_one_or_none()
+        if record is not None and self._expired(record):
+            await db.execute(self._where(delete(IdempotencyKey)))
+            record = None
+        return self._replay(record)
+
+    def remember(self, db, status_code: int, body: bytes):
+        """Add the response to the caller's transaction; a concurrent duplicate fails its commit"""
+        now = datetime.now()
+        db.add(IdempotencyKey(
+            team_key=self.team_key,
+            idempotency_key=self.key,
+            request_hash=self.request_hash,
+            status_code=status_code,
+            response=body.decode(),
+            created_at=now,
+            expires_at=now + timedelta(seconds=self.ttl),
+        ))
+
+    def after_conflict(self, db) -> Response:
+        """
+        Response for a request whose commit hit the primary key: another
+        request with the same key committed first (its transaction has been
+        rolled back by the caller).
+        """
+        idempotency_stats.conflicts += 1
+        replay = self.find(db)
+        if replay is None:
+            raise _in_progress()
+        return replay
+
+    async def after_conflict_async(self, db) -> Response:
+        idempotency_stats.conflicts += 1
+        replay = await self.find_async(db)
+        if replay is None:
+            raise _in_progress()
+        return replay
+
+
+def prune_expired(db) -> int:
+    """Delete every expired key in one statement (an index range on expires_at); returns how many"""
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now()))
+    return result.rowcount
+
+
+def _prune() -> int:
+    db = SessionLocal()
+    try:
+        pruned = prune_expired(db)
+        db.commit()
+    finally:
+        db.close()
+    idempotency_stats.pruned += pruned
+    return pruned
+
+
+async def prune_periodically(interval: float):
+    """Lifespan task: prune_expired() every `interval` seconds, off the event loop"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            pruned = await run_in_threadpool(_prune)
+            if pruned:
+                logger.info("Pruned %d expired idempotency keys", pruned)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Pruning idempotency keys failed: {e}", exc_info=True)
+
+
+def _in_progress() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail=f"A submission with this {IDEMPOTENCY_HEADER} is still being processed"
+    )
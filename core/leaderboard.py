@@ -0,0 +1,241 @@
+import secrets
+from collections import deque
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, List, Optional
+from sqlalchemy import and_, func, select
+from models.submissions import Submission, Team
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def leaderboard_query(limit: Optional[int] = None, since: Optional[datetime] = None):
+    """
+    One statement for the whole leaderboard: every team, outer-joined to its
+    all-time best score and to its submissions (newest first, numbered by a
+    window function), so the endpoint never issues per-team queries.
+    """
+    best = select(
+        Submission.team_key,
+        func.max(Submission.score).label("best_score"),
+    ).group_by(Submission.team_key).subquery()
+
+    ranked = select(
+        Submission.id,
+        Submission.team_key,
+        Submission.score,
+        Submission.status,
+        Submission.timestamp,
+        func.row_number().over(
+            partition_by=Submission.team_key,
+            order_by=(Submission.timestamp.desc(), Submission.id.desc())
+        ).label("rn"),
+    ).subquery()
+
+    join_on = [ranked.c.team_key == Team.team_key]
+    if limit is not None:
+        join_on.append(ranked.c.rn <= limit)
+    if since is not None:
+        join_on.append(ranked.c.timestamp >= since)
+
+    return select(
+        Team.team_key,
+        Team.team_name,
+        Team.avatar,
+        ranked.c.id,
+        ranked.c.score,
+        ranked.c.status,
+        ranked.c.timestamp,
+        best.c.best_score,
+    ).outerjoin(best, best.c.team_key == Team.team_key)\
+        .outerjoin(ranked, and_(*join_on))\
+        .order_by(Team.team_name, Team.team_key, ranked.c.rn)
+
+
+def build_leaderboard(db, limit: Optional[int] = None, since: Optional[datetime] = None) -> List[Dict]:
+    """
+    Leaderboard rows as served by GET /api/scores, sorted by best score.
+
+    `limit` caps the submissions listed per team and `since` drops older
+    ones; `best_score` is always the team's all-time best.
+    """
+    return format_leaderboard(db.execute(leaderboard_query(limit, since)).all())
+
+
+async def build_leaderboard_async(db, limit: Optional[int] = None, since: Optional[datetime] = None) -> List[Dict]:
+    """build_leaderboard() for an AsyncSession"""
+    result = await db.execute(leaderboard_query(limit, since))
+    return format_leaderboard(result.all())
+
+
+def format_leaderboard(rows) -> List[Dict]:
+    """Group leaderboard_query() rows into per-team entries, best score first"""
+    response = []
+    for team_key, team_rows in groupby(rows, key=lambda r: r.team_key):
+        team_rows = list(team_rows)
+        team = team_rows[0]
+        submissions = [r for r in team_rows if r.id is not None]
+        best_score = team.best_score
+
+        scores = []
+        trend = []
+        for sub in submissions:
+            scores.append({
+                "value": sub.score,
+                "is_best": sub.score == best_score,
+                "id": str(sub.id),
+                "timestamp": sub.timestamp.isoformat()
+            })
+            trend.append(sub.score)
+
+        response.append({
+            "team_key": team_key,
+            "team_name": team.team_name,
+            "avatar": team.avatar,
+            "scores": scores,
+            "best_score": best_score,
+            "trend": trend,
+            "latest_score": submissions[0].score if submissions else None,
+            "status": submissions[0].status if submissions else None,
+            "has_submissions": len(submissions) > 0
+        })
+
+    # Sort by best score descending
+    response.sort(key=lambda x: x["best_score"] or 0, reverse=True)
+    return response
+
+
+def feed_rows(leaderboard: List[Dict]) -> List[Dict]:
+    """Ranked WebSocket rows (teams with a score only) from a build_leaderboard() result"""
+    rows = []
+    for entry in leaderboard:
+        if entry["best_score"] is None:
+            continue
+        rows.append({
+            "team_key": entry["team_key"],
+            "team_name": entry["team_name"],
+            "best_score": entry["best_score"],
+            "last_submission": entry["scores"][0]["timestamp"] if entry["scores"] else None,
+            "rank": len(rows) + 1,
+        })
+    return rows
+
+
+def _rank_order(row: Dict):
+    # Same order as build_leaderboard(): best score desc, then team name/key
+    return (-(row["best_score"] or 0), row["team_name"] is not None, row["team_name"] or "", row["team_key"])
+
+
+class LeaderboardFeed:
+    """
+    Sequenced snapshot/delta stream of the leaderboard for /ws/scores.
+
+    update() resyncs from a full build_leaderboard() projection; apply()
+    folds committed score events into the current rows without touching
+    the database. Either way the result is diffed against the previous
+    rows and the changed rows are recorded under the next sequence number.
+    Viewers start from snapshot() and apply deltas in order; after a
+    reconnect, deltas_since(seq, epoch) replays what they missed, or returns
+    None when a new snapshot is needed. Sequence numbers are per process and
+    restart at 0, so every feed has a random `epoch` (sent in the snapshot);
+    a resume against another epoch, after a restart or on another worker,
+    always gets a snapshot.
+    """
+
+    def __init__(self, history: int = 256):
+        self.epoch = secrets.token_hex(8)
+        self.seq = 0
+        self.primed = False
+        self.rows: Dict[str, Dict] = {}
+        self.team_names: Dict[str, Optional[str]] = {}
+        self.history = deque(maxlen=history)
+
+    def snapshot(self) -> Dict:
+        return {
+            "type": "snapshot",
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "data": sorted(self.rows.values(), key=lambda r: r["rank"]),
+        }
+
+    def legacy_update(self) -> Dict:
+        """The pre-delta full scores_update message"""
+        return {
+            "type": "scores_update",
+            "data": [
+                {"team_key": r["team_key"], "best_score": r["best_score"], "last_submission": r["last_submission"]}
+                for r in sorted(self.rows.values(), key=lambda r: r["rank"])
+            ],
+        }
+
+    def update(self, leaderboard: List[Dict]) -> Optional[Dict]:
+        """Resync from a build_leaderboard() result; returns the delta message, or None if nothing changed"""
+        self.team_names = {entry["team_key"]: entry["team_name"] for entry in leaderboard}
+        self.primed = True
+        return self._commit({row["team_key"]: row for row in feed_rows(leaderboard)})
+
+    def apply(self, events) -> Optional[Dict]:
+        """
+        Fold ScoreEvents into the current rows; returns the delta message, or
+        None if nothing changed. Raises KeyError for a team the feed has never
+        seen, in which case the caller should resync with update().
+        """
+        rows = {team_key: dict(row) for team_key, row in self.rows.items()}
+        for event in events:
+            row = rows.get(event.team_key)
+            if row is None:
+                row = rows[event.team_key] = {
+                    "team_key": event.team_key,
+                    "team_name": self.team_names[event.team_key],
+                    "best_score": None,
+                    "last_submission": None,
+                    "rank": None,
+                }
+            if row["best_score"] is None or event.score > row["best_score"]:
+                row["best_score"] = event.score
+            row["last_submission"] = event.timestamp
+        for rank, row in enumerate(sorted(rows.values(), key=_rank_order), start=1):
+            row["rank"] = rank
+        return self._commit(rows)
+
+    def _commit(self, rows: Dict[str, Dict]) -> Optional[Dict]:
+        changes = []
+        for team_key, row in rows.items():
+            previous = self.rows.get(team_key)
+            if previous == row:
+                continue
+            change = {
+                "team_key": team_key,
+                "best_score": row["best_score"],
+                "rank": row["rank"],
+                "previous_rank": previous["rank"] if previous else None,
+            }
+            if previous is None or previous["team_name"] != row["team_name"]:
+                change["team_name"] = row["team_name"]
+            if previous is None or previous["last_submission"] != row["last_submission"]:
+                change["last_submission"] = row["last_submission"]
+            changes.append(change)
+        removed = [team_key for team_key in self.rows if team_key not in rows]
+
+        self.rows = rows
+        if not changes and not removed:
+            return None
+        self.seq += 1
+        delta = {"type": "scores_delta", "seq": self.seq, "changes": changes}
+        if removed:
+            delta["removed"] = removed
+        self.history.append(delta)
+        return delta
+
+    def deltas_since(self, seq: int, epoch: Optional[str]) -> Optional[List[Dict]]:
+        if epoch != self.epoch:
+            return None
+        if seq == self.seq:
+            return []
+        if seq > self.seq or not self.history or self.history[0]["seq"] > seq + 1:
+            return None
+        return [delta for delta in self.history if delta["seq"] > seq]
+
+
+leaderboard_feed = LeaderboardFeed()
@@ -0,0 +1,219 @@
+"""
+Log pipeline: request threads only enqueue records; a listener thread
+formats them as JSON and writes them out.
+
+Records are enqueued unformatted, so a message's %-arguments (and any
+Lazy() among them) are rendered on the listener thread, and only for
+records that survive the level check and sampling. Unlike the stdlib
+QueueHandler, which formats at enqueue time, a mutable argument could
+change before the listener renders it, so dict/list/set arguments are
+copied (shallowly) when the record is enqueued; anything else, Lazy()
+included, is rendered as it is at format time. A full queue drops
+records instead of blocking the caller; drops and sampled-out records
+are counted in log_stats().
+"""
+import atexit
+import copy
+import itertools
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional
+from pythonjsonlogger import jsonlogger
+
+import logging
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+MUTABLE_ARGS = (dict, list, set)
+
+
+class Lazy:
+    """Argument rendered only when the record is formatted: logger.debug("%s", Lazy(payload.json))"""
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn: Callable, *args):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
+
+    __repr__ = __str__
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """"api.submissions=0.01,core=0.1" -> {"api.submissions": 0.01, "core": 0.1}"""
+    rates = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fixed fraction of the records below WARNING from each
+    configured logger (and its children; the longest configured prefix
+    wins). Every 1/rate-th record is kept, so the kept lines are evenly
+    spread rather than random. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float], max_level: int = logging.INFO):
+        super().__init__()
+        self.rates = rates
+        self.max_level = max_level
+        self.sampled_out = 0
+        self._resolved: Dict[str, float] = {}
+        self._counters: Dict[str, itertools.count] = {}
+        self._lock = threading.Lock()
+
+    def rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, prefix = 1.0, name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        rate = self.rate(record.name)
+        if rate >= 1.0:
+            return True
+        counter = self._counters.get(record.name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(record.name, itertools.count(1))
+        n = next(counter)
+        if int(n * rate) > int((n - 1) * rate):
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that hands records over as they are and drops them when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener lives in this process, so the record needs no
+        # pickling-safe pre-formatting; formatting happens on its thread.
+        # Only containers the caller may still mutate are snapshotted.
+        args = record.args
+        if isinstance(args, dict):
+            record.args = dict(args)
+        elif args and any(isinstance(arg, MUTABLE_ARGS) for arg in args):
+            record.args = tuple(copy.copy(arg) if isinstance(arg, MUTABLE_ARGS) else arg for arg in args)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of raising queue.Full"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """The root handler installed by configure(), the listener behind it and the sampling filter"""
+
+    def __init__(self, handler: logging.Handler, output: logging.Handler,
+                 listener: Optional[QueueListener] = None, sampler: Optional[SamplingFilter] = None):
+        self.handler = handler
+        self.output = output
+        self.listener = listener
+        self.sampler = sampler
+        self.queue_handler = handler if isinstance(handler, NonBlockingQueueHandler) else None
+
+    def stop(self):
+        """
+        Flush what is queued and stop the listener thread. Records logged
+        afterwards are written directly rather than queued for nobody.
+        """
+        if self.listener is None:
+            return
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        self.listener.stop()
+        self.listener = None
+        if self.sampler is not None:
+            self.output.addFilter(self.sampler)
+        self.handler = self.output
+        root.addHandler(self.output)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue_handler.queue.qsize() if self.queue_handler is not None else 0,
+            "dropped": self.queue_handler.dropped if self.queue_handler is not None else 0,
+            "sampled_out": self.sampler.sampled_out if self.sampler is not None else 0,
+        }
+
+
+_pipeline: Optional[LogPipeline] = None
+_atexit_registered = False
+
+
+def configure(level: str = "INFO", use_queue: bool = True, queue_size: int = 10000,
+              sample_rates: Optional[Dict[str, float]] = None, stream=None) -> LogPipeline:
+    """
+    Install the JSON log pipeline on the root logger, replacing one
+    installed earlier. With use_queue=False records are written on the
+    calling thread, which is easier to follow when debugging. `stream`
+    defaults to stderr.
+    """
+    global _pipeline, _atexit_registered
+    root = logging.getLogger()
+    if _pipeline is not None:
+        _pipeline.stop()
+        root.removeHandler(_pipeline.handler)
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(jsonlogger.JsonFormatter(LOG_FORMAT))
+    sampler = SamplingFilter(sample_rates) if sample_rates else None
+
+    if use_queue:
+        handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        listener = DrainingQueueListener(handler.queue, output, respect_handler_level=True)
+        listener.start()
+        if not _atexit_registered:
+            atexit.register(shutdown)
+            _atexit_registered = True
+    else:
+        handler, listener = output, None
+    if sampler is not None:
+        handler.addFilter(sampler)
+
+    root.setLevel(level)
+    root.addHandler(handler)
+    _pipeline = LogPipeline(handler, output, listener, sampler)
+    return _pipeline
+
+
+def shutdown():
+    """Drain the queue; registered to run at exit so no lines are lost"""
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def log_stats() -> Dict[str, int]:
+    if _pipeline is None:
+        return {"queued": 0, "dropped": 0, "sampled_out": 0}
+    return _pipeline.stats()
@@ -0,0 +1,379 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import logging
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram per label set. Buckets are kept non-cumulative
+    so observe() is one bisect and two additions under a lock; they are
+    accumulated when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, List[float]] = {}  # label values -> bucket counts (+Inf last), sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(label_values, list(counts)) for label_values, counts in self._series.items()]
+        for label_values, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(float(bound))
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(counts[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+class Callback:
+    """
+    Value read at scrape time, for state other components already track.
+    `fn` returns a number, or a {label values: number} dict; summaries
+    return (count, sum) in place of a number.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, fn: Callable, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterator[str]:
+        value = self.fn()
+        series = value if isinstance(value, dict) else {(): value}
+        for label_values, value in series.items():
+            labels = _labels(self.labels, label_values)
+            if self.kind == "summary":
+                count, total = value
+                yield f"{self.name}_sum{labels} {_number(total)}"
+                yield f"{self.name}_count{labels} {_number(count)}"
+            else:
+                yield f"{self.name}{labels} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logger.warning(f"Could not collect metric {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    """Database work done on behalf of the current request"""
+
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Set by the middleware; sync handlers see the same object through the threadpool's copied context
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class AppMetrics:
+    """The application's instruments and the hooks that feed them"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.registry = Registry()
+        register = self.registry.register
+        self.request_duration = register(Histogram(
+            "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")))
+        self.request_queries = register(Histogram(
+            "http_request_db_queries", "Database queries per HTTP request", ("route",), COUNT_BUCKETS))
+        self.request_db_time = register(Histogram(
+            "http_request_db_seconds", "Database time per HTTP request", ("route",)))
+        self.query_duration = register(Histogram(
+            "db_query_duration_seconds", "Database statement execution time", ("engine",)))
+        self.query_errors = register(Counter(
+            "db_query_errors_total", "Database statements that raised", ("engine",)))
+        self.pool_wait = register(Histogram(
+            "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",)))
+        self.ws_fanout = register(Histogram(
+            "ws_broadcast_fanout_seconds", "Time to serialize and enqueue one broadcast for every viewer"))
+        self._engines: Dict[str, object] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        self.request_duration.observe(seconds, method, route, status)
+        self.request_queries.observe(stats.queries, route)
+        self.request_db_time.observe(stats.db_time, route)
+
+    def instrument_engine(self, engine, name: str = "primary"):
+        """
+        Time every statement (and add it to the current request's totals)
+        and every pool checkout on a sync Engine; pass engine.sync_engine
+        for an AsyncEngine. Pool size/checked-out gauges are read at scrape
+        time.
+        """
+        if not self.enabled or name in self._engines:
+            return
+        from sqlalchemy import event
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+            self.query_duration.observe(elapsed, name)
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.queries += 1
+                stats.db_time += elapsed
+
+        def handle_error(context):
+            starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+            if starts:
+                starts.pop()
+            self.query_errors.inc(name)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", handle_error)
+
+        from db.engine import checkout_timer
+        checkout_timer(engine).listeners.append(lambda wait: self.pool_wait.observe(wait, name))
+        if not self._engines:
+            self._register_pool_gauges()
+        self._engines[name] = engine
+
+    def _register_pool_gauges(self):
+        def pool_stat(method: str) -> Callable:
+            def read():
+                values = {}
+                for name, engine in self._engines.items():
+                    pool = engine.pool
+                    if method == "capacity":
+                        # QueuePool only; other pools have no fixed bound
+                        if hasattr(pool, "_max_overflow"):
+                            values[(name,)] = pool.size() + max(pool._max_overflow, 0)
+                        continue
+                    getter = getattr(pool, method, None)
+                    if getter is not None:
+                        values[(name,)] = getter()
+                return values
+            return read
+
+        register = self.registry.register
+        register(Callback("db_pool_size", "Connections kept in the pool", "gauge", pool_stat("size"), ("engine",)))
+        register(Callback("db_pool_capacity", "Most connections the pool will open (size + max_overflow)", "gauge",
+                          pool_stat("capacity"), ("engine",)))
+        register(Callback("db_pool_checked_out", "Connections currently checked out", "gauge",
+                          pool_stat("checkedout"), ("engine",)))
+        register(Callback("db_pool_checked_in", "Idle connections in the pool", "gauge",
+                          pool_stat("checkedin"), ("engine",)))
+
+    def watch_scoring(self, executor):
+        """Export ScoringExecutor.stats(), which it keeps anyway"""
+        register = self.registry.register
+        register(Callback("scoring_execution_seconds", "Time spent scoring submissions", "summary",
+                          lambda: (executor.execution.count, executor.execution.total)))
+        register(Callback("scoring_queue_wait_seconds", "Time submissions waited for a scoring worker", "summary",
+                          lambda: (executor.queue_wait.count, executor.queue_wait.total)))
+        register(Callback("scoring_pending", "Scoring calls queued or running", "gauge", lambda: executor.pending))
+        register(Callback("scoring_calls_total", "Scoring calls by outcome", "counter", lambda: {
+            ("completed",): executor.completed,
+            ("failed",): executor.failed,
+            ("timeout",): executor.timeouts,
+            ("rejected",): executor.rejected,
+        }, ("outcome",)))
+
+    def watch_score_cache(self, cache):
+        register = self.registry.register
+        register(Callback("score_cache_lookups_total", "Score cache lookups by result", "counter", lambda: {
+            ("hit",): cache.hits,
+            ("miss",): cache.misses,
+        }, ("result",)))
+        register(Callback("score_cache_size", "Scores held in the score cache", "gauge", lambda: cache.stats()["size"]))
+        register(Callback("score_cache_invalidations_total", "Times the score cache was emptied by a reference change",
+                          "counter", lambda: cache.invalidations))
+
+    def watch_idempotency(self, stats):
+        """Export core.idempotency.IdempotencyStats"""
+        register = self.registry.register
+        register(Callback("idempotent_submits_total", "Submits carrying an Idempotency-Key by outcome", "counter", lambda: {
+            ("replayed",): stats.replayed,
+            ("miss",): stats.misses,
+            ("mismatched",): stats.mismatched,
+            ("conflict",): stats.conflicts,
+        }, ("outcome",)))
+
+    def watch_admission(self, controller):
+        """Export core.admission.AdmissionController's counters"""
+        register = self.registry.register
+        register(Callback("admission_in_flight", "Admitted /api requests in progress by route class", "gauge",
+                          lambda: {(route,): count for route, count in controller.in_flight.items()}, ("route",)))
+        register(Callback("admission_admitted_total", "/api requests admitted by route class", "counter",
+                          lambda: {(route,): count for route, count in controller.admitted.items()}, ("route",)))
+        register(Callback("admission_rejected_total", "/api requests turned away by route class and reason", "counter",
+                          lambda: dict(controller.rejected), ("route", "reason")))
+        register(Callback("admission_slow_pool_checkouts_total",
+                          "Pool checkouts that waited longer than ADMISSION_POOL_WAIT_THRESHOLD", "counter",
+                          lambda: controller.pool.slow_checkouts))
+
+    def watch_broadcaster(self, broadcaster):
+        register = self.registry.register
+        register(Callback("ws_connections", "Connected WebSocket viewers", "gauge", lambda: len(broadcaster.clients)))
+        register(Callback("ws_queue_depth", "Messages queued for WebSocket viewers", "gauge",
+                          lambda: broadcaster.stats()["queue_depth"]))
+        register(Callback("ws_dropped_clients_total", "Viewers disconnected for falling behind", "counter",
+                          lambda: broadcaster.dropped_clients))
+
+    def watch_logging(self, stats: Callable[[], Dict[str, int]]):
+        """Export core.logs.log_stats()"""
+        register = self.registry.register
+        register(Callback("log_queue_depth", "Log records waiting for the writer thread", "gauge",
+                          lambda: stats()["queued"]))
+        register(Callback("log_records_dropped_total", "Log records dropped because the writer queue was full",
+                          "counter", lambda: stats()["dropped"]))
+        register(Callback("log_records_sampled_out_total", "DEBUG/INFO log records skipped by LOG_SAMPLE_RATES",
+                          "counter", lambda: stats()["sampled_out"]))
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+def route_template(scope) -> str:
+    """
+    "/api/team-metrics/{team_key}" for a request to /api/team-metrics/TM-...:
+    the matched path with its parameters put back, which keeps label
+    cardinality bounded and, unlike route.path, includes router prefixes.
+    """
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    params = scope.get("path_params")
+    if not params:
+        return scope["path"]
+    names = {str(value): name for name, value in params.items()}
+    segments = [f"{{{names[segment]}}}" if segment in names else segment for segment in scope["path"].split("/")]
+    if sum(segment.startswith("{") for segment in segments) < len(params):
+        # A parameter that isn't a whole segment; route.path is still bounded
+        return getattr(route, "path", UNMATCHED_ROUTE)
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task hop) recording
+    latency, status and database work per route template.
+    """
+
+    def __init__(self, app, metrics: AppMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            self.metrics.observe_request(scope["method"], route_template(scope), status, elapsed, stats)
+
+
+def create_metrics() -> AppMetrics:
+    from config import settings
+    return AppMetrics(enabled=settings.METRICS_ENABLED)
+
+
+metrics = create_metrics()
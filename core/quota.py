@@ -0,0 +1,180 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import case, func, select, update
+from models.submissions import Team
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(Exception):
+    """The team has no submissions left"""
+
+
+class UnknownTeam(Exception):
+    """No team exists for the key"""
+
+
+def _reserve_statement(team_key: str, limit: int):
+    return update(Team)\
+        .where(Team.team_key == team_key)\
+        .where(func.coalesce(Team.submission_count, 0) < limit)\
+        .values(submission_count=func.coalesce(Team.submission_count, 0) + 1)\
+        .execution_options(synchronize_session=False)
+
+
+def _reserve_many_statement(team_key: str, limit: int, wanted: int, current=None):
+    """Take `wanted` slots if they all fit (and, when given, the count is still `current`)"""
+    count = func.coalesce(Team.submission_count, 0)
+    stmt = update(Team).where(Team.team_key == team_key)
+    if current is None:
+        stmt = stmt.where(count + wanted <= limit)
+    else:
+        stmt = stmt.where(count == current)
+    return stmt.values(submission_count=count + wanted)\
+        .execution_options(synchronize_session=False)
+
+
+def _count_statement(team_key: str):
+    return select(func.coalesce(Team.submission_count, 0)).where(Team.team_key == team_key)
+
+
+def _record_statement(team_key: str, score: float, when: datetime):
+    return update(Team)\
+        .where(Team.team_key == team_key)\
+        .values(
+            last_submission=when,
+            best_score=case(
+                (Team.best_score.is_(None), score),
+                (Team.best_score < score, score),
+                else_=Team.best_score
+            )
+        )\
+        .execution_options(synchronize_session=False)
+
+
+def reserve_submission(db, team_key: str, limit: int, known_team: bool = False) -> int:
+    """
+    Atomically take one submission slot for a team and return its new count.
+
+    A single conditional UPDATE both checks and increments the counter, so
+    concurrent submits from the same team can never exceed `limit`. It is
+    the first statement of the transaction and takes the team row lock, so
+    every submit locks teams before submissions (no lock-order deadlocks).
+    The slot is released by rolling back the caller's transaction.
+
+    Raises QuotaExceeded, or UnknownTeam when the key doesn't exist (only
+    checked when `known_team` is False).
+    """
+    result = db.execute(_reserve_statement(team_key, limit))
+    if result.rowcount == 1:
+        return db.execute(
+            select(Team.submission_count).where(Team.team_key == team_key)
+        ).scalar_one()
+
+    if not known_team:
+        exists = db.execute(
+            select(Team.team_key).where(Team.team_key == team_key)
+        ).scalar_one_or_none()
+        if exists is None:
+            raise UnknownTeam(team_key)
+    raise QuotaExceeded(team_key)
+
+
+async def reserve_submission_async(db, team_key: str, limit: int, known_team: bool = False) -> int:
+    """reserve_submission() for an AsyncSession"""
+    result = await db.execute(_reserve_statement(team_key, limit))
+    if result.rowcount == 1:
+        return (await db.execute(
+            select(Team.submission_count).where(Team.team_key == team_key)
+        )).scalar_one()
+
+    if not known_team:
+        exists = (await db.execute(
+            select(Team.team_key).where(Team.team_key == team_key)
+        )).scalar_one_or_none()
+        if exists is None:
+            raise UnknownTeam(team_key)
+    raise QuotaExceeded(team_key)
+
+
+def submissions_left(db, team_key: str, limit: int) -> int:
+    """
+    Slots the team has left right now, read without reserving any, so a
+    batch can be cut to its quota before it is scored. Raises QuotaExceeded
+    when none are left, UnknownTeam for a bad key.
+    """
+    return _left(db.execute(_count_statement(team_key)).scalar_one_or_none(), team_key, limit)
+
+
+async def submissions_left_async(db, team_key: str, limit: int) -> int:
+    return _left((await db.execute(_count_statement(team_key))).scalar_one_or_none(), team_key, limit)
+
+
+def _left(current: Optional[int], team_key: str, limit: int) -> int:
+    if current is None:
+        raise UnknownTeam(team_key)
+    if current >= limit:
+        raise QuotaExceeded(team_key)
+    return limit - current
+
+
+def reserve_submissions(db, team_key: str, limit: int, wanted: int) -> Tuple[int, int]:
+    """
+    Atomically take up to `wanted` submission slots; returns (granted, new count).
+
+    The common case (everything fits) is one conditional UPDATE, exactly
+    like reserve_submission(). Otherwise the remaining quota is read and
+    claimed with a compare-and-set on the count, retried if another submit
+    got there first, so concurrent batches can never overshoot `limit`.
+
+    Raises QuotaExceeded when no slot is left, UnknownTeam for a bad key.
+    """
+    result = db.execute(_reserve_many_statement(team_key, limit, wanted))
+    while result.rowcount != 1:
+        current = db.execute(_count_statement(team_key)).scalar_one_or_none()
+        if current is None:
+            raise UnknownTeam(team_key)
+        granted = min(wanted, limit - current)
+        if granted <= 0:
+            raise QuotaExceeded(team_key)
+        result = db.execute(_reserve_many_statement(team_key, limit, granted, current=current))
+        if result.rowcount == 1:
+            return granted, current + granted
+    return wanted, db.execute(_count_statement(team_key)).scalar_one()
+
+
+async def reserve_submissions_async(db, team_key: str, limit: int, wanted: int) -> Tuple[int, int]:
+    """reserve_submissions() for an AsyncSession"""
+    result = await db.execute(_reserve_many_statement(team_key, limit, wanted))
+    while result.rowcount != 1:
+        current = (await db.execute(_count_statement(team_key))).scalar_one_or_none()
+        if current is None:
+            raise UnknownTeam(team_key)
+        granted = min(wanted, limit - current)
+        if granted <= 0:
+            raise QuotaExceeded(team_key)
+        result = await db.execute(_reserve_many_statement(team_key, limit, granted, current=current))
+        if result.rowcount == 1:
+            return granted, current + granted
+    return wanted, (await db.execute(_count_statement(team_key))).scalar_one()
+
+
+def release_submissions(db, team_key: str, count: int):
+    """Give back quota slots taken for submissions that were never scored"""
+    db.execute(
+        update(Team)
+        .where(Team.team_key == team_key)
+        .where(Team.submission_count >= count)
+        .values(submission_count=Team.submission_count - count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_score(db, team_key: str, score: float, when: datetime):
+    """Update last_submission and best_score in place, without reading the row first"""
+    db.execute(_record_statement(team_key, score, when))
+
+
+async def record_score_async(db, team_key: str, score: float, when: datetime):
+    await db.execute(_record_statement(team_key, score, when))
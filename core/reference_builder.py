@@ -0,0 +1,302 @@
+"""
+Builds perfect_evaluation.json from the raw hackathon dataset.
+
+Every input is streamed record by record (JSON arrays are decoded
+incrementally, NDJSON line by line), so memory is bounded by the number of
+distinct customers/products/carriers/reasons rather than by the number of
+orders. Orders are read once, aggregating customer spend and product
+revenue together, and the top entries are picked with a heap.
+
+NDJSON inputs can be split into byte ranges and aggregated in parallel;
+each worker returns a partial aggregate and the partials are merged in
+file order, so the output matches a single-process run.
+
+    python -m core.reference_builder --data-dir sample_data --output perfect_evaluation.json
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+TOP_K = 5
+READ_CHUNK_SIZE = 1 << 20
+INPUT_SUFFIXES = ('.ndjson', '.jsonl', '.json')
+DATASETS = ('orders', 'customers', 'products', 'shipments', 'returns')
+
+_decoder = json.JSONDecoder()
+
+
+def find_input(data_dir: Path, name: str) -> Path:
+    """<name>.ndjson, <name>.jsonl or <name>.json in data_dir, in that order of preference"""
+    for suffix in INPUT_SUFFIXES:
+        path = data_dir / f"{name}{suffix}"
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No {name} input in {data_dir} (tried {', '.join(INPUT_SUFFIXES)})")
+
+
+def is_json_array(path: Path) -> bool:
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64), b''):
+            stripped = chunk.lstrip()
+            if stripped:
+                return stripped[:1] == b'['
+    return False
+
+
+def iter_json_array(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict]:
+    """Decode the elements of a top-level JSON array without loading the whole file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} is not a JSON array")
+        pos = 1
+        eof = False
+        while True:
+            # Skip separators between elements
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+            if pos >= len(buffer):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if buffer[pos] == ']':
+                return
+            try:
+                record, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element runs past the buffer; read more and retry
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield record
+            pos = end
+            if pos > chunk_size:
+                buffer, pos = buffer[pos:], 0
+
+
+def iter_ndjson(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[Dict]:
+    """Records of an NDJSON file whose line starts fall in [start, end)"""
+    decode = _decoder.decode
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            # A line belongs to the range its first byte is in
+            if f.read(1) != b'\n':
+                f.readline()
+        position = f.tell()
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            if line.strip():
+                # json.loads(bytes) re-detects the encoding on every call
+                yield decode(line.decode('utf-8'))
+
+
+def iter_records(path: Path) -> Iterator[Dict]:
+    if is_json_array(path):
+        return iter_json_array(path)
+    return iter_ndjson(path)
+
+
+def ndjson_ranges(path: Path, parts: int) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path)
+    step = max(1, -(-size // parts))
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+class OrderTotals:
+    """Customer spend and product revenue, accumulated in one pass over orders"""
+
+    def __init__(self, prices: Dict):
+        self.prices = prices
+        self.customer_spend: Dict = defaultdict(float)
+        self.product_revenue: Dict = defaultdict(float)
+
+    def add(self, order: Dict):
+        amount = order['quantity'] * self.prices[order['product_id']]
+        self.customer_spend[order['customer_id']] += amount
+        self.product_revenue[order['product_id']] += amount
+
+    def merge(self, other: 'OrderTotals'):
+        for customer_id, spend in other.customer_spend.items():
+            self.customer_spend[customer_id] += spend
+        for product_id, revenue in other.product_revenue.items():
+            self.product_revenue[product_id] += revenue
+
+
+class CarrierTotals:
+    """Shipments and deliveries per carrier"""
+
+    def __init__(self):
+        self.shipments: Dict[str, List[int]] = {}
+
+    def add(self, shipment: Dict):
+        counts = self.shipments.setdefault(shipment['carrier'], [0, 0])
+        counts[0] += 1
+        if shipment['status'] == 'delivered':
+            counts[1] += 1
+
+    def merge(self, other: 'CarrierTotals'):
+        for carrier, (total, delivered) in other.shipments.items():
+            counts = self.shipments.setdefault(carrier, [0, 0])
+            counts[0] += total
+            counts[1] += delivered
+
+
+class ReturnTotals:
+    """Return count and refund total per reason"""
+
+    def __init__(self):
+        self.reasons: Dict[str, List[float]] = {}
+        self.count = 0
+
+    def add(self, ret: Dict):
+        totals = self.reasons.setdefault(ret['reason'], [0, 0.0])
+        totals[0] += 1
+        totals[1] += ret['refund']
+        self.count += 1
+
+    def merge(self, other: 'ReturnTotals'):
+        for reason, (count, refund) in other.reasons.items():
+            totals = self.reasons.setdefault(reason, [0, 0.0])
+            totals[0] += count
+            totals[1] += refund
+        self.count += other.count
+
+
+def _aggregate_range(path: Path, start: int, end: int, factory: Callable, args: tuple):
+    aggregate = factory(*args)
+    for record in iter_ndjson(path, start, end):
+        aggregate.add(record)
+    return aggregate
+
+
+def aggregate(path: Path, factory: Callable, *args, workers: int = 1):
+    """
+    Feed every record of `path` to factory(*args).add(). NDJSON input is
+    split across `workers` processes and the partials merged in file order.
+    """
+    if workers <= 1 or is_json_array(path):
+        result = factory(*args)
+        for record in iter_records(path):
+            result.add(record)
+        return result
+
+    ranges = ndjson_ranges(path, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(
+            _aggregate_range,
+            [path] * len(ranges), [start for start, _ in ranges], [end for _, end in ranges],
+            [factory] * len(ranges), [args] * len(ranges),
+        ))
+    result = partials[0]
+    for partial in partials[1:]:
+        result.merge(partial)
+    return result
+
+
+def top_k(totals: Dict, k: int = TOP_K) -> List[Tuple]:
+    """Largest k (key, value) pairs; ties keep first-seen order, as sorted(...)[:k] would"""
+    return heapq.nlargest(k, totals.items(), key=lambda item: item[1])
+
+
+def lookup(path: Path, keys, field: str) -> Dict:
+    """field of the records whose id is in keys, streaming the file once"""
+    wanted = set(keys)
+    found = {}
+    for record in iter_records(path):
+        if record['id'] in wanted:
+            found[record['id']] = record[field]
+            if len(found) == len(wanted):
+                break
+    return found
+
+
+def build_reference(data_dir: Path, workers: int = 1) -> Dict:
+    """The perfect_evaluation.json document for the dataset in data_dir"""
+    paths = {name: find_input(data_dir, name) for name in DATASETS}
+
+    prices = {product['id']: product['price'] for product in iter_records(paths['products'])}
+    orders = aggregate(paths['orders'], OrderTotals, prices, workers=workers)
+
+    top_customers = top_k(orders.customer_spend)
+    customer_names = lookup(paths['customers'], [cust_id for cust_id, _ in top_customers], 'name')
+    top_products = top_k(orders.product_revenue)
+    product_names = lookup(paths['products'], [prod_id for prod_id, _ in top_products], 'name')
+
+    carriers = aggregate(paths['shipments'], CarrierTotals, workers=workers)
+    returns = aggregate(paths['returns'], ReturnTotals, workers=workers)
+
+    return {
+        'top_5_customers_by_total_spend': [
+            {
+                'customer_id': cust_id,
+                'customer_name': customer_names[cust_id],
+                'total_spent': round(spend, 2)
+            }
+            for cust_id, spend in top_customers
+        ],
+        'top_5_products_by_revenue': [
+            {
+                'product_id': prod_id,
+                'product_name': product_names[prod_id],
+                'total_revenue': round(revenue, 2)
+            }
+            for prod_id, revenue in top_products
+        ],
+        'shipping_performance_by_carrier': [
+            {
+                'carrier': carrier,
+                'total_shipments': total,
+                'on_time_deliveries': delivered,
+                'on_time_percentage': round(delivered / total * 100, 1),
+                'problem_issues': []  # The dataset has no issue fields yet
+            }
+            for carrier, (total, delivered) in carriers.shipments.items()
+        ],
+        'return_reason_analysis': [
+            {
+                'reason': reason,
+                'total_returns': count,
+                'return_percentage': round(count / returns.count * 100, 1),
+                'average_refund_amount': round(refund / count, 2)
+            }
+            for reason, (count, refund) in returns.reasons.items()
+        ]
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate perfect_evaluation.json from a dataset")
+    parser.add_argument("--data-dir", type=Path, default=Path("sample_data"),
+                        help="directory with orders/customers/products/shipments/returns (.json or .ndjson)")
+    parser.add_argument("--output", type=Path, default=Path("perfect_evaluation.json"))
+    parser.add_argument("--workers", type=int, default=1, help="processes for NDJSON inputs")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    reference = build_reference(args.data_dir, workers=args.workers)
+    with open(args.output, 'w') as f:
+        json.dump(reference, f, indent=2)
+    print(f"Generated {args.output} from {args.data_dir} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
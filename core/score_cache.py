@@ -0,0 +1,143 @@
+"""
+Memoized scores, keyed on a hash of the canonical business metrics.
+
+Teams often resubmit metrics they already sent, and a score only depends on
+the metrics and the reference benchmark. The key is the SHA-256 of the JSON
+stored in Submission.metrics, which pydantic dumps from the validated model:
+field order, whitespace, int/float spelling and unknown fields in the request
+don't change it. Entries belong to one reference digest; the cache empties
+itself the first time it is used after the reference changes.
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def payload_digest(metrics_json: str) -> str:
+    """Cache key for the canonical metrics JSON (DecodedSubmission.metrics_json)"""
+    return hashlib.sha256(metrics_json.encode()).hexdigest()
+
+
+def _current_reference() -> str:
+    from core.scoring import get_reference
+    return get_reference().digest
+
+
+class ScoreCache:
+    """
+    Bounded LRU of payload digest -> score for the current reference.
+
+    store() takes the digest of the reference the score was actually
+    computed against (calculate_score_with_digest / score_batch_with_digest)
+    and drops it unless that is still the current reference. A reload while a
+    submission is being scored, or a process-mode worker that hasn't noticed
+    the reload yet, can't leave a stale entry.
+    """
+
+    def __init__(self, max_size: int = 4096, current_reference: Callable[[], str] = _current_reference):
+        self.max_size = max_size
+        self.current_reference = current_reference
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._reference: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def lookup(self, digest: str) -> Optional[float]:
+        """The cached score for the current reference, or None"""
+        reference = self.current_reference()
+        with self._lock:
+            if reference != self._reference:
+                self._reset(reference)
+            score = self._entries.get(digest)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return score
+
+    def store(self, digest: str, score: float, reference: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            if reference != self._reference:
+                return
+            self._entries[digest] = score
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Forget every score (the reference was reloaded)"""
+        with self._lock:
+            self._reset(None)
+
+    def _reset(self, reference: Optional[str]):
+        if self._entries:
+            self.invalidations += 1
+            logger.info("Score cache cleared after a reference change (%d entries)", len(self._entries))
+        self._entries.clear()
+        self._reference = reference
+
+    def score_many(self, digests: List[str], metrics_list: List[Dict],
+                   score_batch: Callable[[List[Dict]], Tuple[List[float], str]]) -> List[float]:
+        """
+        Scores aligned with metrics_list: cached ones looked up, the rest
+        computed with one score_batch call, which returns (scores, reference
+        digest) like score_batch_with_digest. NaN (invalid) results aren't cached.
+        """
+        if not self.enabled:
+            return list(score_batch(metrics_list)[0])
+        scores, missing = self._lookup_many(digests)
+        if missing:
+            self._store_many(scores, missing, digests, *score_batch([metrics_list[i] for i in missing]))
+        return scores
+
+    async def score_many_async(self, digests: List[str], metrics_list: List[Dict],
+                               score_batch: Callable[[List[Dict]], Awaitable[Tuple[List[float], str]]]) -> List[float]:
+        """score_many() with a coroutine function computing the misses"""
+        if not self.enabled:
+            return list((await score_batch(metrics_list))[0])
+        scores, missing = self._lookup_many(digests)
+        if missing:
+            self._store_many(scores, missing, digests, *await score_batch([metrics_list[i] for i in missing]))
+        return scores
+
+    def _lookup_many(self, digests: List[str]) -> Tuple[List[Optional[float]], List[int]]:
+        scores = [self.lookup(digest) for digest in digests]
+        return scores, [i for i, score in enumerate(scores) if score is None]
+
+    def _store_many(self, scores: List[Optional[float]], missing: List[int], digests: List[str],
+                    computed: List[float], reference: str):
+        for i, score in zip(missing, computed):
+            scores[i] = score
+            if not math.isnan(score):
+                self.store(digests[i], score, reference)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def create_score_cache() -> ScoreCache:
+    from config import settings
+    return ScoreCache(max_size=settings.SCORE_CACHE_SIZE)
+
+
+score_cache = create_score_cache()
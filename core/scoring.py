@@ -1,102 +1,357 @@
+import hashlib
 import json
+import math
+import operator
+import os
+import threading
 import time
+from array import array
+from itertools import repeat
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
-def load_perfect_metrics() -> Dict:
-    """Load the perfect evaluation metrics from JSON"""
+PERFECT_METRICS_PATH = Path(__file__).parent.parent / 'perfect_evaluation.json'
+
+# How often (seconds) get_reference() is allowed to stat the benchmark file
+REFERENCE_CHECK_INTERVAL = 2.0
+
+REQUIRED_SECTIONS = [
+    'top_5_customers_by_total_spend',
+    'top_5_products_by_revenue',
+    'shipping_performance_by_carrier',
+    'return_reason_analysis'
+]
+
+CUSTOMER_KEYS = ['customer_id', 'total_spent', 'customer_name']
+PRODUCT_KEYS = ['product_id', 'total_revenue', 'product_name']
+
+
+class ReferenceBenchmark:
+    """Compiled, read-only view of perfect_evaluation.json used for scoring"""
+
+    def __init__(self, raw: Dict, mtime: float = 0.0, digest: str = ""):
+        for section in REQUIRED_SECTIONS:
+            if not isinstance(raw.get(section), list):
+                raise ValueError(f"Benchmark is missing section: {section}")
+
+        self.raw = raw
+        self.mtime = mtime
+        self.digest = digest
+
+        # Ranked sections: one (position_key, value, name) tuple per position
+        self.customers: List[Tuple] = [
+            tuple(c.get(k) for k in CUSTOMER_KEYS)
+            for c in raw['top_5_customers_by_total_spend']
+        ]
+        self.products: List[Tuple] = [
+            tuple(p.get(k) for k in PRODUCT_KEYS)
+            for p in raw['top_5_products_by_revenue']
+        ]
+
+        # Keyed sections: carrier -> (on_time_percentage, problem_issues)
+        self.shipping_by_carrier: Dict[str, Tuple[float, frozenset]] = {
+            s['carrier']: (s['on_time_percentage'], frozenset(s['problem_issues']))
+            for s in raw['shipping_performance_by_carrier']
+        }
+        # reason -> (return_percentage, average_refund_amount)
+        self.returns_by_reason: Dict[str, Tuple[float, float]] = {
+            r['reason']: (r['return_percentage'], r['average_refund_amount'])
+            for r in raw['return_reason_analysis']
+        }
+
+    @classmethod
+    def from_file(cls, path: Path = PERFECT_METRICS_PATH) -> "ReferenceBenchmark":
+        """Read, hash and compile a benchmark file"""
+        mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            data = f.read()
+        raw = json.loads(data)
+        return cls(raw, mtime=mtime, digest=hashlib.sha256(data).hexdigest())
+
+    def score_ranked(self, participant_list: List[Dict], perfect: List[Tuple], keys: List[str]) -> float:
+        """Score a ranked section position by position (6 id / 3 value / 1 name)"""
+        score = 0
+        for p, (position, value, name) in zip(participant_list, perfect):
+            if p.get(keys[0]) == position:
+                score += 6
+            if p.get(keys[1]) == value:
+                score += 3
+            if p.get(keys[2]) == name:
+                score += 1
+        return score
+
+    def score_shipping(self, participant_list: List[Dict]) -> float:
+        score = 0
+        for s in participant_list:
+            perfect = self.shipping_by_carrier.get(s['carrier'])
+            if not perfect:
+                continue
+            on_time = s.get('on_time_deliveries', 0) / s['total_shipments'] * 100
+            if on_time == perfect[0]:
+                score += 10
+            if set(s.get('problem_issues', [])) == perfect[1]:
+                score += 10
+        return score
+
+    def score_returns(self, participant_list: List[Dict]) -> float:
+        score = 0
+        for r in participant_list:
+            perfect = self.returns_by_reason.get(r['reason'])
+            if not perfect:
+                continue
+            if r['total_returns'] == perfect[0]:
+                score += 10
+            if r['total_refund_amount'] == perfect[1]:
+                score += 10
+        return score
+
+
+_reference: Optional[ReferenceBenchmark] = None
+_reference_checked_at = 0.0
+_reference_lock = threading.Lock()
+
+
+def load_reference(path: Path = PERFECT_METRICS_PATH) -> ReferenceBenchmark:
+    """Compile the benchmark and install it as the active reference.
+
+    Raises ValueError if the file is missing or malformed, so callers at
+    startup fail fast instead of serving 500s later.
+    """
+    global _reference, _reference_checked_at
     try:
-        with open(Path(__file__).parent.parent / 'perfect_evaluation.json') as f:
-            return json.load(f)
+        reference = ReferenceBenchmark.from_file(path)
     except Exception as e:
         logger.error(f"Error loading perfect metrics: {e}")
-        raise ValueError("Could not load evaluation benchmarks")
+        raise ValueError("Could not load evaluation benchmarks") from e
+
+    with _reference_lock:
+        _reference = reference
+        _reference_checked_at = time.monotonic()
+    logger.info("Reference benchmark loaded", extra={"digest": reference.digest})
+    return reference
+
+
+def reload_reference(force: bool = False, path: Path = PERFECT_METRICS_PATH) -> ReferenceBenchmark:
+    """Recompile the reference if the file changed (or unconditionally with force).
+
+    An unchanged content hash keeps the current compiled object. A broken file
+    leaves the previous reference in place and raises ValueError.
+    """
+    global _reference_checked_at
+    current = _reference
+    if current is None or force:
+        return load_reference(path)
+
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError as e:
+        logger.error(f"Benchmark file unavailable, keeping cached reference: {e}")
+        return current
+    if mtime == current.mtime:
+        _reference_checked_at = time.monotonic()
+        return current
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    if digest == current.digest:
+        current.mtime = mtime
+        _reference_checked_at = time.monotonic()
+        return current
+    return load_reference(path)
+
+
+def get_reference() -> ReferenceBenchmark:
+    """Return the compiled reference, re-checking the file at most every few seconds"""
+    current = _reference
+    if current is None:
+        return load_reference()
+    if time.monotonic() - _reference_checked_at < REFERENCE_CHECK_INTERVAL:
+        return current
+    try:
+        return reload_reference()
+    except ValueError:
+        # Keep scoring against the last good benchmark
+        return current
+
+
+def load_perfect_metrics() -> Dict:
+    """Load the perfect evaluation metrics from JSON"""
+    return get_reference().raw
 
 def is_match(a: Dict, b: Dict, keys: list) -> bool:
     """Check if specified keys match between two dicts"""
     return all(a.get(k) == b.get(k) for k in keys)
 
-def score_exact_match_list(participant_list, perfect_list, keys) -> float:
-    """Score exact match on list elements with corresponding position"""
-    score = 0
-    for p, perfect in zip(participant_list, perfect_list):
-        if p.get(keys[0]) == perfect.get(keys[0]):  # Position match
-            score += 6
-        if p.get(keys[1]) == perfect.get(keys[1]):  # Value match
-            score += 3
-        if p.get(keys[2]) == perfect.get(keys[2]):  # Name match
-            score += 1
-    return score
-
-def calculate_score(participant_metrics: Dict) -> float:
+def calculate_score(participant_metrics: Dict, reference: Optional[ReferenceBenchmark] = None) -> float:
     """
     Calculate score (0-100) by comparing participant metrics with perfect benchmarks.
     Scoring Breakdown:
         - Customers (30 points): ranking, amounts, details
-        - Products (30 points): ranking, revenue, details  
+        - Products (30 points): ranking, revenue, details
         - Shipping (20 points): performance metrics
         - Returns (20 points): analysis accuracy
     """
-    start_time = time.time()
-    perfect_metrics = load_perfect_metrics()
+    reference = reference or get_reference()
     score = 0.0
 
-    required_sections = [
-        'top_5_customers_by_total_spend',
-        'top_5_products_by_revenue',
-        'shipping_performance_by_carrier',
-        'return_reason_analysis'
-    ]
-    for section in required_sections:
+    for section in REQUIRED_SECTIONS:
         if section not in participant_metrics:
             raise ValueError(f"Missing required metrics section: {section}")
 
     try:
         # Customers (30 points)
-        score += score_exact_match_list(
+        score += reference.score_ranked(
             participant_metrics['top_5_customers_by_total_spend'],
-            perfect_metrics['top_5_customers_by_total_spend'],
-            ['customer_id', 'total_spent', 'customer_name']
+            reference.customers,
+            CUSTOMER_KEYS
         )
 
         # Products (30 points)
-        score += score_exact_match_list(
+        score += reference.score_ranked(
             participant_metrics['top_5_products_by_revenue'],
-            perfect_metrics['top_5_products_by_revenue'],
-            ['product_id', 'total_revenue', 'product_name']
+            reference.products,
+            PRODUCT_KEYS
         )
 
         # Shipping (20 points)
-        perfect_shipping = {s['carrier']: s for s in perfect_metrics['shipping_performance_by_carrier']}
-        for s in participant_metrics['shipping_performance_by_carrier']:
-            perfect = perfect_shipping.get(s['carrier'])
-            if not perfect:
-                continue
-            on_time = s.get('on_time_deliveries', 0) / s['total_shipments'] * 100
-            if on_time == perfect['on_time_percentage']:
-                score += 10
-            if set(s.get('problem_issues', [])) == set(perfect['problem_issues']):
-                score += 10
+        score += reference.score_shipping(participant_metrics['shipping_performance_by_carrier'])
 
         # Returns (20 points)
-        perfect_returns = {r['reason']: r for r in perfect_metrics['return_reason_analysis']}
-        for r in participant_metrics['return_reason_analysis']:
-            perfect = perfect_returns.get(r['reason'])
-            if not perfect:
-                continue
-            if r['total_returns'] == perfect['return_percentage']:
-                score += 10
-            if r['total_refund_amount'] == perfect['average_refund_amount']:
-                score += 10
+        score += reference.score_returns(participant_metrics['return_reason_analysis'])
 
     except Exception as e:
         logger.error(f"Error calculating score: {e}")
         raise ValueError("Invalid metrics format") from e
 
-    exec_time = time.time() - start_time
-    logger.info(f"Execution Time (not scored): {exec_time:.4f} seconds")
-
     return min(100.0, round(score, 2))
+
+
+BATCH_SECTIONS = ['customers', 'products', 'shipping', 'returns']
+RANKED_WEIGHTS = (6, 3, 1)  # id / value / name, as in ReferenceBenchmark.score_ranked
+
+# Pads ranked positions the participant didn't submit (zip() stops early in
+# the scalar scorer, so padding must never compare equal to anything)
+_ABSENT = object()
+
+
+def _flatten_ranked(participant_list: List[Dict], width: int, keys: List[str]) -> List:
+    """One ranked section as a flat, fixed-width row: id, value, name per position"""
+    row = [p.get(k) for p in participant_list[:width] for k in keys]
+    row.extend([_ABSENT] * (3 * width - len(row)))
+    return row
+
+
+def _score_columns(rows: List[List], expected: List, weights: List[int], n: int) -> List[float]:
+    """Transpose rows into columns and award each column's weight where it equals the reference"""
+    scores = [0] * n
+    if not rows or not expected:
+        return scores
+    for column, value, weight in zip(zip(*rows), expected, weights):
+        hits = map(operator.eq, column, repeat(value))
+        scores = list(map(operator.add, scores, map(operator.mul, hits, repeat(weight))))
+    return scores
+
+
+def _score_keyed(cells: List[Tuple], index: Dict[str, Tuple], n: int) -> List[float]:
+    """Score flattened (row, key, a, b) cells against a keyed reference index, 10 points per field"""
+    scores = [0] * n
+    for row, key, a, b in cells:
+        perfect = index.get(key)
+        if not perfect:
+            continue
+        scores[row] += (10 if a == perfect[0] else 0) + (10 if b == perfect[1] else 0)
+    return scores
+
+
+def score_batch_sections(metrics_list: List[Dict],
+                         reference: Optional[ReferenceBenchmark] = None) -> Dict[str, array]:
+    """
+    Score many submissions at once, column by column.
+
+    Returns one array('d') per section plus 'total', each aligned with
+    metrics_list. Totals match calculate_score(); rows calculate_score would
+    reject get NaN in every column.
+    """
+    reference = reference or get_reference()
+    customer_width = len(reference.customers)
+    product_width = len(reference.products)
+    carriers = reference.shipping_by_carrier
+    reasons = reference.returns_by_reason
+
+    valid_rows: List[int] = []
+    customer_rows: List[List] = []
+    product_rows: List[List] = []
+    # Keyed sections are flattened to (valid row, key, compared value, compared value)
+    shipping_cells: List[Tuple] = []
+    return_cells: List[Tuple] = []
+
+    for i, metrics in enumerate(metrics_list):
+        row = len(valid_rows)
+        try:
+            for section in REQUIRED_SECTIONS:
+                if section not in metrics:
+                    raise ValueError(f"Missing required metrics section: {section}")
+            customers = _flatten_ranked(metrics['top_5_customers_by_total_spend'], customer_width, CUSTOMER_KEYS)
+            products = _flatten_ranked(metrics['top_5_products_by_revenue'], product_width, PRODUCT_KEYS)
+            shipping = []
+            for s in metrics['shipping_performance_by_carrier']:
+                if s['carrier'] in carriers:
+                    on_time = s.get('on_time_deliveries', 0) / s['total_shipments'] * 100
+                    shipping.append((row, s['carrier'], on_time, set(s.get('problem_issues', []))))
+            returns = [
+                (row, r['reason'], r['total_returns'], r['total_refund_amount'])
+                for r in metrics['return_reason_analysis'] if r['reason'] in reasons
+            ]
+        except Exception as e:
+            logger.debug("Batch row %d rejected: %s", i, e)
+            continue
+        valid_rows.append(i)
+        customer_rows.append(customers)
+        product_rows.append(products)
+        shipping_cells.extend(shipping)
+        return_cells.extend(returns)
+
+    n = len(valid_rows)
+    scored = {
+        'customers': _score_columns(
+            customer_rows, [v for ref in reference.customers for v in ref], RANKED_WEIGHTS * customer_width, n),
+        'products': _score_columns(
+            product_rows, [v for ref in reference.products for v in ref], RANKED_WEIGHTS * product_width, n),
+        'shipping': _score_keyed(shipping_cells, carriers, n),
+        'returns': _score_keyed(return_cells, reasons, n),
+    }
+
+    sections = {name: array('d', [math.nan]) * len(metrics_list) for name in BATCH_SECTIONS + ['total']}
+    totals = sections['total']
+    for row, i in enumerate(valid_rows):
+        score = 0.0
+        for name in BATCH_SECTIONS:
+            value = scored[name][row]
+            sections[name][i] = value
+            score += value
+        totals[i] = min(100.0, round(score, 2))
+    return sections
+
+
+def score_batch(metrics_list: List[Dict]) -> array:
+    """Score many submissions at once; NaN marks rows calculate_score would reject"""
+    return score_batch_sections(metrics_list)['total']
+
+
+def calculate_score_with_digest(participant_metrics: Dict) -> Tuple[float, str]:
+    """
+    calculate_score() plus the digest of the reference it used. In process
+    mode a worker can still hold the previous benchmark for a moment after a
+    reload, so the score cache checks this digest rather than its own.
+    """
+    reference = get_reference()
+    return calculate_score(participant_metrics, reference), reference.digest
+
+
+def score_batch_with_digest(metrics_list: List[Dict]) -> Tuple[array, str]:
+    """score_batch() plus the digest of the reference it used"""
+    reference = get_reference()
+    return score_batch_sections(metrics_list, reference)['total'], reference.digest
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, select
+from models.submissions import Submission
+from db import SessionLocal, replica_router
+from core.scoring import score_batch_with_digest
+from core.quota import record_score, release_submissions
+from core.cache import leaderboard_cache
+from core.auth import team_key_cache
+from core.score_cache import score_cache, payload_digest
+from core.executor import scoring_executor
+from core.events import score_events, ScoreEvent
+
+import logging
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class QueuedSubmission(NamedTuple):
+    submission_id: int
+    team_key: str
+    metrics: str  # JSON, as stored in Submission.metrics
+    attempts: int
+
+
+class SubmissionQueue:
+    """
+    Durable work list of submissions waiting to be scored, kept in a local
+    SQLite file so queued work survives a restart (a stand-in for a real
+    broker). Items are claimed under a lease and deleted once processed; a
+    worker that dies mid-batch leaves its items to be reclaimed after
+    `lease` seconds.
+    """
+
+    def __init__(self, path: str, lease: float = 30.0):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS submission_queue ("
+            " submission_id INTEGER PRIMARY KEY, team_key TEXT NOT NULL, metrics TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL, claimed_until REAL NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, items: List[tuple]) -> int:
+        """
+        Enqueue (submission_id, team_key, metrics JSON) tuples; re-adding an
+        id is a no-op. Returns the number of items actually added.
+        """
+        now = time.time()
+        return self._conn().executemany(
+            "INSERT OR IGNORE INTO submission_queue (submission_id, team_key, metrics, enqueued_at)"
+            " VALUES (?, ?, ?, ?)",
+            [(submission_id, team_key, metrics, now) for submission_id, team_key, metrics in items]
+        ).rowcount
+
+    def claim(self, limit: int) -> List[QueuedSubmission]:
+        """Lease up to `limit` of the oldest unclaimed (or expired) items"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT submission_id, team_key, metrics, attempts FROM submission_queue"
+                " WHERE claimed_until < ? ORDER BY enqueued_at, submission_id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE submission_queue SET claimed_until = ?, attempts = attempts + 1 WHERE submission_id = ?",
+                [(now + self.lease, row[0]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [QueuedSubmission(row[0], row[1], row[2], row[3] + 1) for row in rows]
+
+    def ack(self, submission_ids: List[int]):
+        self._conn().executemany(
+            "DELETE FROM submission_queue WHERE submission_id = ?",
+            [(submission_id,) for submission_id in submission_ids]
+        )
+
+    def depth(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM submission_queue").fetchone()[0]
+
+
+def recover_queued(queue: SubmissionQueue) -> int:
+    """
+    Re-enqueue submissions still marked queued in the database but missing
+    from the queue (e.g. lost between commit and put); returns how many.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(Submission.id, Submission.team_key, Submission.metrics)
+            .where(Submission.status == QUEUED)
+        ).all()
+    finally:
+        db.close()
+    return queue.put([tuple(row) for row in rows])
+
+
+def process_batch(queue: SubmissionQueue, batch_size: int, max_attempts: int) -> int:
+    """
+    Claim, score and persist one micro-batch; returns the number of items
+    claimed. Runs in a worker thread.
+
+    Scores are written with one executemany UPDATE and each team's counters
+    with one statement. Only rows still marked queued are touched, so a
+    batch reclaimed after a crash is never applied twice. A submission that
+    can't be scored is marked failed and its quota slot given back, since
+    the inline path never takes one for invalid metrics.
+    """
+    claimed = queue.claim(batch_size)
+    if not claimed:
+        return 0
+
+    now = datetime.now()
+    best: Dict[str, float] = {}
+    db = SessionLocal()
+    try:
+        pending = set(db.execute(
+            select(Submission.id)
+            .where(Submission.id.in_([item.submission_id for item in claimed]))
+            .where(Submission.status == QUEUED)
+        ).scalars())
+        items = [item for item in claimed if item.submission_id in pending]
+        scorable = [item for item in items if item.attempts <= max_attempts]
+
+        metrics_list = []
+        for item in scorable:
+            try:
+                metrics_list.append(json.loads(item.metrics))
+            except ValueError:
+                metrics_list.append({})
+        digests = [payload_digest(item.metrics or "") for item in scorable]
+        scores = dict(zip(
+            (item.submission_id for item in scorable),
+            score_cache.score_many(digests, metrics_list, lambda metrics_list: scoring_executor.run(
+                score_batch_with_digest, metrics_list,
+                timeout=scoring_executor.timeout * max(1, len(metrics_list))
+            ))
+        ))
+
+        results = []
+        failed: Dict[str, int] = {}
+        for item in items:
+            score = scores.get(item.submission_id, math.nan)
+            if math.isnan(score):
+                if item.submission_id not in scores:
+                    logger.error(f"Giving up on submission {item.submission_id} after {max_attempts} attempts")
+                results.append({"_id": item.submission_id, "_score": None, "_status": FAILED})
+                failed[item.team_key] = failed.get(item.team_key, 0) + 1
+            else:
+                results.append({"_id": item.submission_id, "_score": score, "_status": COMPLETED})
+                best[item.team_key] = max(score, best.get(item.team_key, score))
+
+        if results:
+            submissions = Submission.__table__
+            db.execute(
+                submissions.update()
+                .where(submissions.c.id == bindparam("_id"))
+                .values(score=bindparam("_score"), status=bindparam("_status")),
+                results
+            )
+        for team_key, score in best.items():
+            record_score(db, team_key, score, now)
+        for team_key, count in failed.items():
+            release_submissions(db, team_key, count)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    queue.ack([item.submission_id for item in claimed])
+    for team_key in failed:
+        # The refund lowered the count check_quota() may have cached
+        team_key_cache.forget(team_key)
+    if best:
+        leaderboard_cache.invalidate()
+        for team_key, score in best.items():
+            replica_router.note_write(team_key)
+            score_events.publish(ScoreEvent(team_key, score, now.isoformat()))
+    return len(claimed)
+
+
+class SubmissionWorkers:
+    """
+    Pool of asyncio tasks draining the submission queue. Each task runs
+    process_batch() in the threadpool, then sleeps until woken by a new
+    submission or `poll_interval` passes (other processes may enqueue too).
+    One more task runs recover_queued() every `recover_interval` seconds, for
+    submissions committed whose enqueue failed.
+    """
+
+    def __init__(self, poll_interval: float = 0.5):
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self.recovered = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self, queue: SubmissionQueue, workers: int, batch_size: int, max_attempts: int,
+              recover_interval: float = 60.0):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._recover(queue)
+        self._tasks = [
+            asyncio.create_task(self._run(worker, queue, batch_size, max_attempts))
+            for worker in range(workers)
+        ]
+        if recover_interval > 0:
+            self._tasks.append(asyncio.create_task(self._sweep(queue, recover_interval)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def wake(self):
+        """Safe to call from request threads"""
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _recover(self, queue: SubmissionQueue) -> int:
+        recovered = recover_queued(queue)
+        if recovered:
+            self.recovered += recovered
+            logger.info(f"Recovered {recovered} queued submissions")
+        return recovered
+
+    async def _sweep(self, queue: SubmissionQueue, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await run_in_threadpool(self._recover, queue):
+                    self.wake()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Queued submission recovery failed: {e}", exc_info=True)
+
+    async def _run(self, worker: int, queue: SubmissionQueue, batch_size: int, max_attempts: int):
+        while True:
+            try:
+                claimed = await run_in_threadpool(process_batch, queue, batch_size, max_attempts)
+                self.processed += claimed
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Submission worker {worker} failed: {e}", exc_info=True)
+                claimed = 0
+            if claimed:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+_submission_queue: Optional[SubmissionQueue] = None
+
+
+def get_submission_queue() -> SubmissionQueue:
+    """The configured queue, opened on first use so inline deployments never create the file"""
+    global _submission_queue
+    if _submission_queue is None:
+        from config import settings
+        _submission_queue = SubmissionQueue(settings.SUBMIT_QUEUE_PATH, lease=settings.SUBMIT_QUEUE_LEASE)
+    return _submission_queue
+
+
+def enqueue_submission(submission_id: int, team_key: str, metrics: str):
+    """
+    Hand a committed, queued submission to the workers. The row is already
+    stored and has its quota slot, so a failure here is only logged: the
+    client still gets its 202 and the recovery sweep enqueues the row later.
+    """
+    try:
+        get_submission_queue().put([(submission_id, team_key, metrics)])
+    except Exception as e:
+        logger.error(f"Could not enqueue submission {submission_id}, leaving it to recovery: {e}")
+        return
+    submission_workers.wake()
+
+
+def start_submission_workers():
+    from config import settings
+    submission_workers.start(
+        get_submission_queue(),
+        workers=settings.SUBMIT_WORKERS,
+        batch_size=settings.SUBMIT_QUEUE_BATCH_SIZE,
+        max_attempts=settings.SUBMIT_QUEUE_MAX_ATTEMPTS,
+        recover_interval=settings.SUBMIT_QUEUE_RECOVER_INTERVAL,
+    )
+
+
+submission_workers = SubmissionWorkers()
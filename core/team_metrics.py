@@ -0,0 +1,148 @@
+import base64
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, case, func, or_, select
+from models.submissions import Submission, Team
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Performance fields reported per submission and aggregated per team
+PERF_FIELDS = ("cpu_avg", "memory_avg", "duration_sec")
+PERCENTILE = 0.95
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def perf_metric(field: str):
+    """Typed Submission column for a PerformanceMetrics field"""
+    return getattr(Submission, field)
+
+
+def encode_cursor(timestamp: datetime, submission_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{submission_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for anything encode_cursor() didn't produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, submission_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(submission_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def team_query(team_key: str):
+    return select(Team.team_key, Team.team_name).where(Team.team_key == team_key)
+
+
+def aggregates_query(team_key: str):
+    """Submission counts plus avg/min/max of score and every perf field, in one row"""
+    columns = [
+        func.count(Submission.id).label("submissions"),
+        func.count(perf_metric(PERF_FIELDS[0])).label("with_metrics"),
+        func.avg(case((perf_metric(PERF_FIELDS[0]).isnot(None), Submission.score))).label("score_avg"),
+    ]
+    for field in PERF_FIELDS:
+        value = perf_metric(field)
+        columns += [
+            func.avg(value).label(f"{field}_avg"),
+            func.min(value).label(f"{field}_min"),
+            func.max(value).label(f"{field}_max"),
+        ]
+    return select(*columns).where(Submission.team_key == team_key)
+
+
+def percentile_query(team_key: str, count: int, fraction: float = PERCENTILE):
+    """
+    Nearest-rank percentile of every perf field as scalar subqueries. `count`
+    comes from aggregates_query(), so the offset is fixed up front and only
+    one value per field leaves the database.
+    """
+    offset = max(math.ceil(fraction * count) - 1, 0)
+    columns = []
+    for field in PERF_FIELDS:
+        value = perf_metric(field)
+        columns.append(
+            select(value)
+            .where(Submission.team_key == team_key)
+            .where(value.isnot(None))
+            .order_by(value)
+            .offset(offset)
+            .limit(1)
+            .scalar_subquery()
+            .label(field)
+        )
+    return select(*columns)
+
+
+def page_query(team_key: str, after: Optional[Tuple[datetime, int]] = None, limit: Optional[int] = None):
+    """Submissions with perf metrics, oldest first, keyset-paginated on (timestamp, id)"""
+    stmt = select(
+        Submission.id,
+        Submission.timestamp,
+        Submission.score,
+        *[perf_metric(field).label(field) for field in PERF_FIELDS],
+    ).where(Submission.team_key == team_key)\
+        .where(perf_metric(PERF_FIELDS[0]).isnot(None))
+    if after is not None:
+        timestamp, submission_id = after
+        stmt = stmt.where(or_(
+            Submission.timestamp > timestamp,
+            and_(Submission.timestamp == timestamp, Submission.id > submission_id),
+        ))
+    stmt = stmt.order_by(Submission.timestamp.asc(), Submission.id.asc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def metric_row(row) -> Dict:
+    return {
+        "id": str(row.id),
+        "timestamp": row.timestamp.isoformat(),
+        "score": row.score,
+        **{field: getattr(row, field) for field in PERF_FIELDS},
+    }
+
+
+def _rounded(value, digits: int = 1):
+    return round(value, digits) if value is not None else None
+
+
+def format_aggregates(totals, percentiles) -> Dict:
+    aggregates = {"count": totals.with_metrics}
+    for field in PERF_FIELDS:
+        aggregates[field] = {
+            "avg": _rounded(getattr(totals, f"{field}_avg"), 2),
+            "p95": getattr(percentiles, field) if percentiles is not None else None,
+            "min": getattr(totals, f"{field}_min"),
+            "max": getattr(totals, f"{field}_max"),
+        }
+    return aggregates
+
+
+def format_team_metrics(team, totals, percentiles, rows: List, limit: int) -> Dict:
+    """
+    Response for GET /api/team-metrics/{team_key}. `rows` holds up to
+    limit + 1 page_query() rows; the extra one only signals another page.
+    """
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1].timestamp, page[-1].id)
+    return {
+        "team_key": team.team_key,
+        "team_name": team.team_name,
+        "metrics": [metric_row(row) for row in page],
+        "overall_avg": {
+            "cpu": _rounded(totals.cpu_avg_avg),
+            "memory": round(totals.memory_avg_avg) if totals.memory_avg_avg is not None else None,
+            "score": _rounded(totals.score_avg),
+        },
+        "aggregates": format_aggregates(totals, percentiles),
+        "next_cursor": next_cursor,
+    }
@@ -1,28 +1,9 @@
 import secrets
-import string
 import hashlib
-from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Float
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from models.submissions import Base, Team
+from db import engine, SessionLocal
 from config import settings
 
-Base = declarative_base()
-
-class Team(Base):
-    __tablename__ = 'teams'
-    team_key = Column(String(35), primary_key=True)  # TM- + 32 chars
-    team_name = Column(String(100))
-    avatar = Column(String(255))
-    submission_count = Column(Integer, default=0)
-    last_submission = Column(DateTime)
-    best_score = Column(Float)
-
-# Database setup
-engine = create_engine(settings.DATABASE_URL)
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-
 def generate_team_key():
     """Generate cryptographically secure team key using SECRET_KEY"""
     if not settings.SECRET_KEY or settings.SECRET_KEY == 'your-secret-key-here':
@@ -44,7 +25,8 @@ def create_teams(num_teams=5):
     """Create teams with secure random keys"""
     if num_teams < 1 or num_teams > 100:
         raise ValueError("Number of teams must be between 1 and 100")
-    session = Session()
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
     
     try:
         # Clear existing teams
@@ -0,0 +1,2 @@
+from .engine import engine, SessionLocal, get_db, get_async_engine, get_async_db, async_session, db_stats
+from .replicas import replica_router, run_read, run_read_async, read_session, read_session_async
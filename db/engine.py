@@ -0,0 +1,201 @@
+"""
+The process's database engines and session factories.
+
+There is one sync engine per process, built from the DB_* settings at
+import. The async engine is built the same way on first use, so sync-only
+deployments never load the async driver. Code that talks to the database
+takes its sessions from here rather than calling create_engine itself, so
+each worker holds a single pool.
+"""
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from config import settings
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """create_engine() keyword arguments for `url` from the DB_* settings"""
+    from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+    options = dict(
+        echo=settings.DB_ECHO,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        # Compiled form of each distinct statement shape, reused across calls
+        query_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+    )
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url.split("://", 1)[1] in ("", "/"):
+            # In-memory databases keep SQLAlchemy's single-connection pool
+            return options
+        # SQLAlchemy 1.4 defaults file databases to NullPool; size them like any other
+        options["poolclass"] = AsyncAdaptedQueuePool if is_async else QueuePool
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["connect_args"] = {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+class PoolCounters:
+    """Connections opened and checkouts served by one pool, for pool_status()"""
+
+    __slots__ = ("connects", "checkouts")
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+
+
+_counters: Dict[int, PoolCounters] = {}
+
+
+def _track(engine):
+    counters = _counters[id(engine)] = PoolCounters()
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        counters.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters.checkouts += 1
+
+
+class CheckoutTimer:
+    """
+    Times the checkouts of one pool, including those still waiting for a
+    connection. Listeners are called with the wait in seconds once a
+    checkout completes (or times out), on the thread that waited.
+    """
+
+    def __init__(self):
+        self.listeners: List[Callable[[float], None]] = []
+        self._waiting: Dict[int, float] = {}  # checkout id -> start
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def oldest_wait(self) -> float:
+        """Seconds the longest checkout in progress has been waiting, 0.0 if none"""
+        with self._lock:
+            if not self._waiting:
+                return 0.0
+            oldest = min(self._waiting.values())
+        return time.perf_counter() - oldest
+
+    def wrap(self, do_get: Callable) -> Callable:
+        def timed_do_get():
+            with self._lock:
+                checkout = next(self._ids)
+                start = self._waiting[checkout] = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                wait = time.perf_counter() - start
+                with self._lock:
+                    del self._waiting[checkout]
+                for listener in self.listeners:
+                    listener(wait)
+
+        return timed_do_get
+
+
+_timers: Dict[int, CheckoutTimer] = {}
+
+
+def checkout_timer(sync_engine) -> CheckoutTimer:
+    """
+    The CheckoutTimer of an engine's pool (engine.sync_engine for an
+    AsyncEngine), installed on first use. The pool has no "before checkout"
+    event, so this is the one place that wraps its getter; metrics and
+    admission control add listeners rather than wrapping it again.
+    """
+    timer = _timers.get(id(sync_engine))
+    if timer is None:
+        timer = _timers[id(sync_engine)] = CheckoutTimer()
+        pool = sync_engine.pool
+        pool._do_get = timer.wrap(pool._do_get)
+    return timer
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+_track(engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    """Async engine, created on first use so sync-only deployments never need the async driver"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        url = settings.ASYNC_DATABASE_URL
+        _async_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        _track(_async_engine.sync_engine)
+        _AsyncSessionLocal = sessionmaker(
+            _async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def async_session():
+    """A new AsyncSession, for code that manages its own session outside a request dependency"""
+    get_async_engine()
+    return _AsyncSessionLocal()
+
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
+
+def pool_status(sync_engine) -> dict:
+    """Pool occupancy, lifetime counters and compiled-statement cache size of one engine"""
+    pool = sync_engine.pool
+    status = {"pool": type(pool).__name__, "echo": bool(sync_engine.echo)}
+    for name in ("size", "checkedout", "checkedin", "overflow"):
+        getter = getattr(pool, name, None)
+        if getter is not None:
+            status[name] = getter()
+    if "overflow" in status:
+        # QueuePool counts up from -pool_size; report connections beyond the pool only
+        status["overflow"] = max(status["overflow"], 0)
+    if hasattr(pool, "_max_overflow"):
+        status["capacity"] = pool.size() + max(pool._max_overflow, 0)
+        status["timeout"] = pool.timeout()
+    counters = _counters.get(id(sync_engine))
+    if counters is not None:
+        status["connections_opened"] = counters.connects
+        status["checkouts"] = counters.checkouts
+    cache = getattr(sync_engine, "_compiled_cache", None)
+    if cache is not None:
+        status["compiled_cache"] = {"entries": len(cache), "capacity": getattr(cache, "capacity", None)}
+    return status
+
+
+def db_stats() -> Dict[str, Optional[dict]]:
+    from .replicas import replica_stats
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(_async_engine.sync_engine) if _async_engine is not None else None,
+        "replicas": replica_stats(),
+    }
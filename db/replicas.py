@@ -0,0 +1,242 @@
+"""
+Read replicas for the read-heavy endpoints.
+
+Reads that tolerate a little lag (the leaderboard, team metrics, periodic
+WebSocket resyncs) go round robin to the DB_REPLICA_URLS engines. Writes,
+and reads by a team that wrote within the last DB_REPLICA_MAX_LAG seconds,
+go to the primary so a team always sees its own submission. A replica that
+fails a read is skipped for DB_REPLICA_RETRY_INTERVAL seconds and the read
+is repeated on the primary, so an unhealthy replica costs one failed
+attempt rather than an error. Recent writers are tracked per process.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, List, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from config import settings
+from core.auth import hash_team_key
+from .engine import SessionLocal, async_session, engine_options, pool_status, _track
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Errors that say the replica (not the query) is the problem: refused or
+# dropped connections, missing schema, locked files
+REPLICA_ERRORS = (OperationalError, InterfaceError)
+
+
+class ReplicaRouter:
+    """
+    Which replica, if any, serves a read. Holds no engines, only replica
+    health and the teams that wrote recently.
+    """
+
+    def __init__(self, count: int, max_lag: float = 2.0, retry_interval: float = 10.0, max_tracked: int = 4096):
+        self.count = count
+        self.max_lag = max_lag
+        self.retry_interval = retry_interval
+        self.max_tracked = max_tracked
+        self._down_until = [0.0] * count
+        self._failures = [0] * count
+        self._reads = [0] * count
+        self._primary_reads = 0
+        self._writers: "OrderedDict[str, float]" = OrderedDict()  # team key digest -> monotonic write time
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.count > 0
+
+    @property
+    def staleness(self) -> float:
+        """How far a routed read may trail the primary (LeaderboardCache's max_lag)"""
+        return self.max_lag if self.enabled else 0.0
+
+    def note_write(self, team_key: str):
+        """Keep `team_key`'s reads on the primary until replicas have caught up"""
+        if not self.enabled:
+            return
+        digest = hash_team_key(team_key)
+        with self._lock:
+            self._writers[digest] = time.monotonic()
+            self._writers.move_to_end(digest)
+            while len(self._writers) > self.max_tracked:
+                self._writers.popitem(last=False)
+
+    def recently_wrote(self, team_key: Optional[str]) -> bool:
+        if not team_key or not self._writers:
+            return False
+        digest = hash_team_key(team_key)
+        with self._lock:
+            written_at = self._writers.get(digest)
+            if written_at is None:
+                return False
+            if time.monotonic() - written_at < self.max_lag:
+                return True
+            del self._writers[digest]
+            return False
+
+    def pick(self, team_key: Optional[str] = None) -> Optional[int]:
+        """Index of the replica to read from, or None for the primary"""
+        if not self.enabled or self.recently_wrote(team_key):
+            self._primary_reads += 1
+            return None
+        now = time.monotonic()
+        start = next(self._next)
+        for offset in range(self.count):
+            index = (start + offset) % self.count
+            if self._down_until[index] <= now:
+                self._reads[index] += 1
+                return index
+        self._primary_reads += 1
+        return None
+
+    def mark_down(self, index: int, error: Exception):
+        self._failures[index] += 1
+        self._down_until[index] = time.monotonic() + self.retry_interval
+        logger.warning(f"Replica {index} failed a read, using the primary for {self.retry_interval}s: {error}")
+
+    def healthy(self, index: int) -> bool:
+        return self._down_until[index] <= time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "primary_reads": self._primary_reads,
+            "recent_writers": len(self._writers),
+            "replicas": [
+                {"healthy": self.healthy(i), "reads": self._reads[i], "failures": self._failures[i]}
+                for i in range(self.count)
+            ],
+        }
+
+
+def create_replica_router() -> ReplicaRouter:
+    return ReplicaRouter(
+        len(settings.REPLICA_URLS),
+        max_lag=settings.DB_REPLICA_MAX_LAG,
+        retry_interval=settings.DB_REPLICA_RETRY_INTERVAL,
+    )
+
+
+replica_router = create_replica_router()
+
+_engines: Optional[list] = None
+_sessions: List[sessionmaker] = []
+_async_engines: Optional[list] = None
+_async_sessions: List[sessionmaker] = []
+
+
+def replica_engines() -> list:
+    """Sync replica engines, created on first use (connections open lazily)"""
+    global _engines, _sessions
+    if _engines is None:
+        engines = []
+        for url in settings.REPLICA_URLS:
+            replica = create_engine(url, **engine_options(url))
+            _track(replica)
+            engines.append(replica)
+        _sessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in engines]
+        _engines = engines
+    return _engines
+
+
+def async_replica_engines() -> list:
+    global _async_engines, _async_sessions
+    if _async_engines is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        engines = []
+        for url in settings.REPLICA_URLS:
+            url = settings.async_url(url)
+            replica = create_async_engine(url, **engine_options(url, is_async=True))
+            _track(replica.sync_engine)
+            engines.append(replica)
+        _async_sessions = [
+            sessionmaker(e, class_=AsyncSession, autoflush=False, expire_on_commit=False) for e in engines
+        ]
+        _async_engines = engines
+    return _async_engines
+
+
+def run_read(fn: Callable[[Session], Any], team_key: Optional[str] = None) -> Any:
+    """fn(session) on a replica, or on the primary for recent writers and when the replica fails"""
+    index = replica_router.pick(team_key)
+    if index is not None:
+        replica_engines()
+        try:
+            with _sessions[index]() as db:
+                return fn(db)
+        except REPLICA_ERRORS as e:
+            replica_router.mark_down(index, e)
+    with SessionLocal() as db:
+        return fn(db)
+
+
+async def run_read_async(fn: Callable[[Any], Awaitable[Any]], team_key: Optional[str] = None) -> Any:
+    """run_read() for an async fn(AsyncSession)"""
+    index = replica_router.pick(team_key)
+    if index is not None:
+        async_replica_engines()
+        try:
+            async with _async_sessions[index]() as db:
+                return await fn(db)
+        except REPLICA_ERRORS as e:
+            replica_router.mark_down(index, e)
+    async with async_session() as db:
+        return await fn(db)
+
+
+@contextmanager
+def read_session(team_key: Optional[str] = None):
+    """
+    A session for a long read that can't simply be repeated (a streamed
+    response). A replica failure marks it down for later reads but is
+    raised to this one.
+    """
+    index = replica_router.pick(team_key)
+    if index is not None:
+        replica_engines()
+    db = _sessions[index]() if index is not None else SessionLocal()
+    try:
+        yield db
+    except REPLICA_ERRORS as e:
+        if index is not None:
+            replica_router.mark_down(index, e)
+        raise
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def read_session_async(team_key: Optional[str] = None):
+    """read_session() for an AsyncSession"""
+    index = replica_router.pick(team_key)
+    if index is not None:
+        async_replica_engines()
+    db = _async_sessions[index]() if index is not None else async_session()
+    try:
+        yield db
+    except REPLICA_ERRORS as e:
+        if index is not None:
+            replica_router.mark_down(index, e)
+        raise
+    finally:
+        await db.close()
+
+
+def replica_stats() -> Optional[dict]:
+    if not replica_router.enabled:
+        return None
+    stats = replica_router.stats()
+    if _engines is not None:
+        for status, replica in zip(stats["replicas"], _engines):
+            status["sync"] = pool_status(replica)
+    if _async_engines is not None:
+        for status, replica in zip(stats["replicas"], _async_engines):
+            status["async"] = pool_status(replica.sync_engine)
+    return stats
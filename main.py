@@ -1,13 +1,27 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import time
 from models.submissions import Base
-from api.submissions import router as submissions_router
-import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from typing import List
-import json
+from db import engine, SessionLocal, db_stats, run_read
+from api.admin import router as admin_router
+from core.scoring import load_reference
+from core.broadcast import create_broadcaster
+from core.executor import scoring_executor
+from core.score_cache import score_cache
+from core.idempotency import idempotency_stats, prune_periodically
+from core.admission import admission, AdmissionMiddleware
+from core.leaderboard import build_leaderboard, leaderboard_feed
+from core.events import score_events
+from core.metrics import metrics, MetricsMiddleware, CONTENT_TYPE
+from core.logs import log_stats
+from core.codec import FastJSONResponse
+from core.submission_queue import start_submission_workers, submission_workers
+from typing import Optional
+from sqlalchemy import text
 
 import logging
 from config import settings
@@ -19,32 +33,69 @@ from config import settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Compile the scoring benchmark up front so a bad file fails the boot
+    load_reference()
+    scoring_executor.start()
+
     # Essential database connection check
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
         logger.info("Database connection verified")
     
-    # Initialize tables
-    Base.metadata.create_all(bind=engine)
+    # Initialize tables (a no-op that still reflects every table, so it can be switched off)
+    if settings.DB_CREATE_SCHEMA:
+        Base.metadata.create_all(bind=engine)
+
+    if admission.enabled:
+        admission.pool.instrument(engine)
+        if settings.DB_ASYNC:
+            from db import get_async_engine
+            admission.pool.instrument(get_async_engine().sync_engine)
+
+    if metrics.enabled:
+        metrics.instrument_engine(engine)
+        if settings.DB_ASYNC:
+            from db import get_async_engine
+            metrics.instrument_engine(get_async_engine().sync_engine, name="async")
+        if settings.REPLICA_URLS:
+            from db.replicas import replica_engines, async_replica_engines
+            for index, replica in enumerate(replica_engines()):
+                metrics.instrument_engine(replica, name=f"replica{index}")
+            if settings.DB_ASYNC:
+                for index, replica in enumerate(async_replica_engines()):
+                    metrics.instrument_engine(replica.sync_engine, name=f"replica{index}-async")
+
+    # Seed the WebSocket feed so the first viewer gets a snapshot straight away
+    refresh_leaderboard_feed()
+    score_events.start()
+    broadcast_task = asyncio.create_task(score_broadcast_worker())
+    if settings.SUBMIT_QUEUED:
+        start_submission_workers()
+    prune_task = None
+    if settings.IDEMPOTENCY_PRUNE_INTERVAL > 0:
+        prune_task = asyncio.create_task(prune_periodically(settings.IDEMPOTENCY_PRUNE_INTERVAL))
     yield
-    
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    connect_args={
-        "connect_timeout": 5
-    }
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if prune_task is not None:
+        prune_task.cancel()
+    await submission_workers.stop()
+    broadcast_task.cancel()
+    score_events.stop()
+    await manager.close()
+    scoring_executor.shutdown()
 
 app = FastAPI(
     lifespan=lifespan,
     title="Hackathon Evaluator API",
     description="API for evaluating and tracking team submissions",
-    version="1.0"
+    version="1.0",
+    default_response_class=FastJSONResponse,
 )
 
+# Shed overload before it queues on the connection pool. Added first so it
+# runs inside CORS (browsers can read the 429/503) and MetricsMiddleware
+if admission.enabled:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -53,26 +104,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# WebSocket manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+# WebSocket fan-out
+manager = create_broadcaster()
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_text(json.dumps(message))
-
-manager = ConnectionManager()
+if metrics.enabled:
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    metrics.watch_scoring(scoring_executor)
+    metrics.watch_score_cache(score_cache)
+    metrics.watch_idempotency(idempotency_stats)
+    metrics.watch_admission(admission)
+    metrics.watch_broadcaster(manager)
+    metrics.watch_logging(log_stats)
 
 # Include routers
+if settings.DB_ASYNC:
+    from api.submissions_async import router as submissions_router
+else:
+    from api.submissions import router as submissions_router
 app.include_router(submissions_router, prefix="/api")
+app.include_router(admin_router, prefix="/api/admin")
 
 @app.get("/")
 async def root():
@@ -83,28 +133,115 @@ async def health_check():
     return {"status": "ok"}
 
 @app.websocket("/ws/scores")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, since: Optional[int] = None, epoch: Optional[str] = None,
+                             protocol: Optional[str] = None):
+    """
+    Live scores. By default every change pushes a full `scores_update`.
+    With ?protocol=delta the client gets a `snapshot` (with `seq`) followed
+    by `scores_delta` messages holding only changed rows; reconnecting with
+    ?since=<last seq>&epoch=<snapshot epoch> replays missed deltas, or sends
+    a fresh snapshot if they are no longer available or the sequence is
+    another one (the server restarted, or this is another worker).
+    """
+    delta_mode = protocol == "delta" or since is not None
+    if delta_mode and not leaderboard_feed.primed:
+        await run_in_threadpool(refresh_leaderboard_feed)
+
+    await manager.connect(websocket, channel="delta" if delta_mode else "legacy")
+    if delta_mode:
+        missed = leaderboard_feed.deltas_since(since, epoch) if since is not None else None
+        if missed is None:
+            manager.send(websocket, leaderboard_feed.snapshot())
+        else:
+            for delta in missed:
+                manager.send(websocket, delta)
     try:
         while True:
             # Keep connection open
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
-# Function to broadcast score updates
-async def broadcast_scores(db):
-    teams = db.query(Team).all()
-    scores = [
-        {
-            "team_key": t.team_key,
-            "best_score": t.best_score,
-            "last_submission": t.last_submission.isoformat() if t.last_submission else None
-        }
-        for t in teams
-        if t.best_score is not None  # Only include teams with actual scores
-    ]
-    await manager.broadcast({"type": "scores_update", "data": scores})
-
-# Import Team model after manager is defined
-from models.submissions import Team
+@app.get("/ws/stats")
+async def websocket_stats():
+    """Connected viewers and outgoing queue depth"""
+    return manager.stats()
+
+@app.get("/db/stats")
+async def database_stats():
+    """Connection pool occupancy, connections opened and compiled-statement cache per engine"""
+    return db_stats()
+
+@app.get("/scoring/stats")
+async def scoring_stats():
+    """Scoring mode, queue depth, queue wait and execution times, score cache and Idempotency-Key hits"""
+    return dict(scoring_executor.stats(), cache=score_cache.stats(), idempotency=idempotency_stats.stats())
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """In-flight /api requests per route class and what admission control turned away"""
+    return admission.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus text exposition of the in-process metrics"""
+    if not metrics.enabled:
+        return Response(status_code=404)
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+def refresh_leaderboard_feed(fresh: bool = True):
+    """
+    Resync the WebSocket feed from the database; returns the resulting
+    delta, if any. Resyncs that merely guard against drift (fresh=False)
+    may read from a replica; ones triggered by a write read the primary.
+    """
+    try:
+        if fresh:
+            db = SessionLocal()
+            try:
+                return leaderboard_feed.update(build_leaderboard(db, limit=1))
+            finally:
+                db.close()
+        return leaderboard_feed.update(run_read(lambda db: build_leaderboard(db, limit=1)))
+    except Exception as e:
+        logger.error(f"Could not refresh leaderboard feed: {e}")
+        return None
+
+def push_delta(delta):
+    if delta is None:
+        return
+    start = time.perf_counter()
+    manager.publish(delta, channel="delta")
+    manager.publish(leaderboard_feed.legacy_update(), channel="legacy")
+    metrics.ws_fanout.observe(time.perf_counter() - start)
+
+async def score_broadcast_worker():
+    """
+    Single consumer of score events: folds each debounced burst into the
+    in-memory leaderboard feed and fans the change out to viewers. The
+    database is only read for resyncs (unknown team, explicit request, or
+    every WS_RESYNC_INTERVAL seconds while someone is watching).
+    """
+    while True:
+        try:
+            events = await score_events.next_batch(
+                settings.WS_BROADCAST_DEBOUNCE, timeout=settings.WS_RESYNC_INTERVAL or None
+            )
+            if not events and not manager.clients:
+                continue
+            resync = not events or any(event.team_key is None for event in events)
+            delta = None
+            if not resync:
+                try:
+                    delta = leaderboard_feed.apply(events)
+                except KeyError:
+                    resync = True
+            if resync:
+                delta = await run_in_threadpool(refresh_leaderboard_feed, bool(events))
+            push_delta(delta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Score broadcast failed: {e}", exc_info=True)
@@ -0,0 +1,41 @@
+"""Create the teams and submissions tables
+
+Revision ID: 202504010000
+Revises: 
+Create Date: 2025-04-01 00:00:00.000000
+
+Databases whose tables were made by create_all at startup already have
+the full schema: run `alembic stamp head` on them once instead of
+upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202504010000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'teams',
+        sa.Column('team_key', sa.String(35), primary_key=True),
+        sa.Column('team_name', sa.String(100)),
+        sa.Column('avatar', sa.String(255)),
+        sa.Column('submission_count', sa.Integer),
+        sa.Column('last_submission', sa.DateTime),
+        sa.Column('best_score', sa.Float),
+    )
+    op.create_table(
+        'submissions',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('team_key', sa.String(35)),
+        sa.Column('metrics', sa.String(2000)),
+        sa.Column('score', sa.Float),
+        sa.Column('status', sa.String(50)),
+    )
+
+def downgrade():
+    op.drop_table('submissions')
+    op.drop_table('teams')
@@ -1,7 +1,7 @@
 """Add performance metrics columns
 
 Revision ID: 202504070126
-Revises: 
+Revises: 202504010000
 Create Date: 2025-04-07 01:26:00.000000
 
 """
@@ -11,7 +11,7 @@ from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision = '202504070126'
-down_revision = None
+down_revision = '202504010000'
 branch_labels = None
 depends_on = None
 
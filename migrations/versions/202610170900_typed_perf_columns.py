@@ -0,0 +1,96 @@
+"""Promote performance metrics into typed, indexed columns
+
+Revision ID: 202610170900
+Revises: 202504070126
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610170900'
+down_revision = '202504070126'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+PERF_COLUMNS = (
+    ('duration_sec', sa.Float),
+    ('cpu_avg', sa.Float),
+    ('memory_avg', sa.Float),
+    ('sample_count', sa.Integer),
+)
+
+submissions = sa.table(
+    'submissions',
+    sa.column('id', sa.Integer),
+    sa.column('performance_metrics', sa.Text),
+    sa.column('perf_status', sa.String),
+    *[sa.column(name, type_) for name, type_ in PERF_COLUMNS]
+)
+
+
+def parse_perf(raw):
+    """PerformanceMetrics dict from a stored value (JSON object, or JSON-encoded string of one)"""
+    value = raw
+    while isinstance(value, (str, bytes)):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, dict) else None
+
+
+def backfill(bind, batch_size=BACKFILL_BATCH_SIZE):
+    """Copy performance_metrics into the typed columns, batch_size rows per statement"""
+    update = submissions.update()\
+        .where(submissions.c.id == sa.bindparam('_id'))\
+        .values(
+            perf_status=sa.bindparam('_status'),
+            **{name: sa.bindparam(f'_{name}') for name, _ in PERF_COLUMNS}
+        )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(submissions.c.id, submissions.c.performance_metrics)
+            .where(submissions.c.id > last_id)
+            .where(submissions.c.performance_metrics.isnot(None))
+            .order_by(submissions.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        params = []
+        for row in rows:
+            perf = parse_perf(row.performance_metrics)
+            if not perf:
+                continue
+            item = {'_id': row.id, '_status': perf.get('status')}
+            for name, _ in PERF_COLUMNS:
+                item[f'_{name}'] = perf.get(name)
+            params.append(item)
+        if params:
+            bind.execute(update, params)
+
+
+def upgrade():
+    for name, type_ in PERF_COLUMNS:
+        op.add_column('submissions', sa.Column(name, type_))
+    op.add_column('submissions', sa.Column('perf_status', sa.String(20)))
+    op.create_index('ix_submissions_team_timestamp', 'submissions', ['team_key', 'timestamp'])
+    op.create_index('ix_submissions_team_score', 'submissions', ['team_key', 'score'])
+    backfill(op.get_bind())
+
+
+def downgrade():
+    op.drop_index('ix_submissions_team_score', table_name='submissions')
+    op.drop_index('ix_submissions_team_timestamp', table_name='submissions')
+    with op.batch_alter_table('submissions') as batch:
+        batch.drop_column('perf_status')
+        for name, _ in reversed(PERF_COLUMNS):
+            batch.drop_column(name)
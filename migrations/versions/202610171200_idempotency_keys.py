@@ -0,0 +1,29 @@
+"""Store /submit responses by Idempotency-Key
+
+Revision ID: 202610171200
+Revises: 202610170900
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610171200'
+down_revision = '202610170900'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('team_key', sa.String(35), primary_key=True),
+        sa.Column('idempotency_key', sa.String(255), primary_key=True),
+        sa.Column('request_hash', sa.String(64), nullable=False),
+        sa.Column('status_code', sa.Integer, nullable=False),
+        sa.Column('response', sa.Text, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+    )
+
+def downgrade():
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,33 @@
+"""Give submissions.timestamp the model's type and server default
+
+Revision ID: 202610171300
+Revises: 202610171200
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610171300'
+down_revision = '202610171200'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('submissions') as batch:
+        batch.alter_column(
+            'timestamp',
+            existing_type=sa.DateTime(),
+            type_=sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+        )
+
+def downgrade():
+    with op.batch_alter_table('submissions') as batch:
+        batch.alter_column(
+            'timestamp',
+            existing_type=sa.DateTime(timezone=True),
+            type_=sa.DateTime(),
+            server_default=None,
+        )
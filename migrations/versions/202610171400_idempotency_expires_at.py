@@ -0,0 +1,55 @@
+"""Store when each Idempotency-Key expires, indexed for bulk pruning
+
+Revision ID: 202610171400
+Revises: 202610171300
+Create Date: 2026-10-17 14:00:00.000000
+
+Existing rows expire DEFAULT_TTL after they were created (the
+IDEMPOTENCY_TTL default).
+"""
+from datetime import timedelta
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '202610171400'
+down_revision = '202610171300'
+branch_labels = None
+depends_on = None
+
+DEFAULT_TTL = 86400
+
+idempotency_keys = sa.table(
+    'idempotency_keys',
+    sa.column('team_key', sa.String),
+    sa.column('idempotency_key', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('expires_at', sa.DateTime),
+)
+
+def upgrade():
+    op.add_column('idempotency_keys', sa.Column('expires_at', sa.DateTime))
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(
+        idempotency_keys.c.team_key, idempotency_keys.c.idempotency_key, idempotency_keys.c.created_at
+    )).all()
+    if rows:
+        bind.execute(
+            idempotency_keys.update()
+            .where(idempotency_keys.c.team_key == sa.bindparam('_team_key'))
+            .where(idempotency_keys.c.idempotency_key == sa.bindparam('_key'))
+            .values(expires_at=sa.bindparam('_expires_at')),
+            [
+                {'_team_key': row.team_key, '_key': row.idempotency_key,
+                 '_expires_at': row.created_at + timedelta(seconds=DEFAULT_TTL)}
+                for row in rows
+            ]
+        )
+    with op.batch_alter_table('idempotency_keys') as batch:
+        batch.alter_column('expires_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+
+def downgrade():
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='idempotency_keys')
+    with op.batch_alter_table('idempotency_keys') as batch:
+        batch.drop_column('expires_at')
@@ -1,17 +1,5 @@
-from sqlalchemy import Column, String, Integer, DateTime, Float, func, JSON, create_engine
+from sqlalchemy import Column, String, Integer, DateTime, Float, Index, Text, func, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
-
-from config import settings
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_size=20,
-    max_overflow=10,
-    echo=True,
-    pool_pre_ping=True
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -35,10 +23,42 @@ class Submission(Base):
     status = Column(String(50))
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     performance_metrics = Column(JSON)  # Stores performance metrics JSON
+    # Typed copies of the PerformanceMetrics fields, so reads can filter/sort/aggregate in SQL
+    duration_sec = Column(Float)
+    cpu_avg = Column(Float)
+    memory_avg = Column(Float)
+    sample_count = Column(Integer)
+    perf_status = Column(String(20))
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    __table_args__ = (
+        Index('ix_submissions_team_timestamp', 'team_key', 'timestamp'),
+        Index('ix_submissions_team_score', 'team_key', 'score'),
+    )
+
+class IdempotencyKey(Base):
+    """Stored /submit response for a team's Idempotency-Key, replayed to retries"""
+    __tablename__ = 'idempotency_keys'
+
+    team_key = Column(String(35), primary_key=True)
+    idempotency_key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)  # JSON body as sent
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)  # created_at + IDEMPOTENCY_TTL
+
+    __table_args__ = (
+        Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+def perf_columns(perf_metrics) -> dict:
+    """Submission column values for a PerformanceMetrics (all None without one)"""
+    if perf_metrics is None:
+        return dict(duration_sec=None, cpu_avg=None, memory_avg=None, sample_count=None, perf_status=None)
+    return dict(
+        duration_sec=perf_metrics.duration_sec,
+        cpu_avg=perf_metrics.cpu_avg,
+        memory_avg=perf_metrics.memory_avg,
+        sample_count=perf_metrics.sample_count,
+        perf_status=perf_metrics.status,
+    )
@@ -0,0 +1,35 @@
+"""
+Test settings: every test runs against a throwaway SQLite file, never the
+configured DATABASE_URL, since fixtures drop and recreate the schema.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}"
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+
+
+@pytest.fixture
+def make_teams():
+    """Recreate the schema and insert teams with no submissions; returns their keys"""
+    from config import settings
+    from core.auth import team_key_cache
+    from db import SessionLocal, engine
+    from models.submissions import Base, Team
+
+    def make(count: int):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        team_key_cache.clear()
+        keys = [f"{settings.TEAM_KEY_PREFIX}test{i:04d}" for i in range(count)]
+        session = SessionLocal()
+        session.add_all([Team(team_key=key, team_name=key, avatar="t", submission_count=0) for key in keys])
+        session.commit()
+        session.close()
+        return keys
+
+    return make
@@ -0,0 +1,99 @@
+"""Concurrent submits must never take more than SUBMISSIONS_PER_TEAM slots"""
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from config import settings
+from core.quota import QuotaExceeded, reserve_submission, reserve_submissions
+from db import SessionLocal
+from models.submissions import Team
+
+CLIENTS = 16
+
+
+def stored_counts(keys):
+    session = SessionLocal()
+    try:
+        return {team.team_key: team.submission_count for team in session.query(Team).filter(Team.team_key.in_(keys))}
+    finally:
+        session.close()
+
+
+def run_together(fn, jobs):
+    """Call fn(job) for every job from CLIENTS threads, all released at the same moment"""
+    start = threading.Event()
+
+    def call(job):
+        start.wait()
+        return fn(job)
+
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        futures = [pool.submit(call, job) for job in jobs]
+        start.set()
+        return [future.result() for future in futures]
+
+
+def test_concurrent_reservations_never_exceed_limit(make_teams):
+    (key,) = make_teams(1)
+    limit = settings.SUBMISSIONS_PER_TEAM
+
+    def reserve(_):
+        db = SessionLocal()
+        try:
+            count = reserve_submission(db, key, limit, known_team=True)
+            db.commit()
+            return count
+        except QuotaExceeded:
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    counts = [count for count in run_together(reserve, range(limit * 4)) if count is not None]
+
+    assert sorted(counts) == list(range(1, limit + 1))
+    assert stored_counts([key]) == {key: limit}
+
+
+def test_concurrent_batch_reservations_never_exceed_limit(make_teams):
+    (key,) = make_teams(1)
+    limit = settings.SUBMISSIONS_PER_TEAM
+
+    def reserve(_):
+        db = SessionLocal()
+        try:
+            granted, _ = reserve_submissions(db, key, limit, 2)
+            db.commit()
+            return granted
+        except QuotaExceeded:
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+    assert sum(run_together(reserve, range(limit * 2))) == limit
+    assert stored_counts([key]) == {key: limit}
+
+
+def test_concurrent_submits_never_exceed_limit(make_teams):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.submissions import router
+    from benchmarks.common import sample_payload
+
+    keys = make_teams(3)
+    limit = settings.SUBMISSIONS_PER_TEAM
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    payload = sample_payload()
+
+    with TestClient(app) as client:
+        def submit(key):
+            return key, client.post("/api/submit", json=payload, headers={"Authorization": key}).status_code
+
+        results = run_together(submit, [key for key in keys for _ in range(limit * 3)])
+
+    assert Counter(status for _, status in results).keys() <= {200, 429}
+    admitted = Counter(key for key, status in results if status == 200)
+    assert admitted == {key: limit for key in keys}
+    assert stored_counts(keys) == {key: limit for key in keys}